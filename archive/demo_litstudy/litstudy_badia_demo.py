@@ -12,9 +12,17 @@ This script demonstrates how to use the litstudy Python package to:
 """
 
 import os
+import re
 import sys
 from datetime import datetime
 
+# The archived demo has no package of its own; the section index lives with the lab1
+# reference extraction scripts, so their directory is added to the import path
+LAB1_DEMO = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, 'lab1', 'demo')
+if LAB1_DEMO not in sys.path:
+    sys.path.append(LAB1_DEMO)
+from section_index import SectionIndex
+
 # Create a mock litstudy module implementation (we'll override if the real package is available)
 class MockCollection:
     def __init__(self):
@@ -73,52 +81,57 @@ def parse_paper_markdown(file_path):
     print(f"\nParsing paper: {file_path}")
     
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        # Extract paper sections
+        section_patterns = [
+            "Introduction",
+            "Inference of GRNs",
+            "From transcriptomics data",
+            "From TF binding data or chromatin accessibility"
+        ]
         
-        # Extract title (first line after 'title,authors,year,venue,abstract,keywords\n' in the example format)
-        title_start = "article\n"
-        title_end = "\nDownload PDF"
-        if title_start in content and title_end in content:
-            title = content.split(title_start)[1].split(title_end)[0].strip()
-        else:
-            title = "Gene regulatory network inference in the era of single-cell multi-omics"
+        # Sections come from the shared offset index instead of splitting the full text;
+        # persist=False leaves no .sections.json next to the paper
+        with SectionIndex(file_path, persist=False) as index:
+            front_lines = [line.strip() for line in index.front_lines()]
+            abstract_lines = [line.strip() for line in index.lines("Abstract") if line.strip()]
+            # A section counts when its name occurs anywhere in the paper, headings or text
+            section_texts = ["\n".join(front_lines)] + [index.text(name) for name in index.names()]
+            sections = [section for section in section_patterns
+                        if any(section in text for text in section_texts)]
+        
+        # Extract title (the line(s) between 'article' and 'Download PDF' in the page header)
+        title = "Gene regulatory network inference in the era of single-cell multi-omics"
+        if "article" in front_lines and "Download PDF" in front_lines:
+            title_start = front_lines.index("article") + 1
+            title_end = front_lines.index("Download PDF", title_start)
+            if title_end > title_start:
+                title = " ".join(front_lines[title_start:title_end])
         
         # Extract authors
-        authors_start = "Pau Badia-i-Mompel, Lorna Wessels, Sophia Müller-Dott, Rémi Trimbour, Ricardo O. Ramirez Flores, Ricard Argelaguet & Julio Saez-Rodriguez\n"
-        if authors_start in content:
-            authors_line = authors_start.strip()
+        authors_start = "Pau Badia-i-Mompel, Lorna Wessels, Sophia Müller-Dott, Rémi Trimbour, Ricardo O. Ramirez Flores, Ricard Argelaguet & Julio Saez-Rodriguez"
+        if authors_start in front_lines:
             # Replace '&' with ',' for consistency
-            authors_line = authors_line.replace(' & ', ', ')
+            authors_line = authors_start.replace(' & ', ', ')
             authors = [author.strip() for author in authors_line.split(',')]
         else:
             authors = ["Pau Badia-i-Mompel", "Lorna Wessels", "Sophia Müller-Dott", "Rémi Trimbour", 
                       "Ricardo O. Ramirez Flores", "Ricard Argelaguet", "Julio Saez-Rodriguez"]
         
         # Extract year from "Published: 26 June 2023"
-        year_start = "Published: "
-        year_end = "\nGene regulatory network inference"
-        if year_start in content and year_end in content:
-            date_str = content.split(year_start)[1].split(year_end)[0].strip()
-            # Extract the last 4 digits as year
-            import re
-            year_match = re.search(r'(\d{4})', date_str)
-            year = int(year_match.group(1)) if year_match else 2023
-        else:
-            year = 2023
+        year = 2023
+        for line in front_lines:
+            if line.startswith("Published: "):
+                year_match = re.search(r'(\d{4})', line)
+                if year_match:
+                    year = int(year_match.group(1))
+                break
         
         # Extract journal
-        journal_start = "nature  \nnature reviews genetics  \n"
-        if journal_start in content:
-            journal = "Nature Reviews Genetics"
-        else:
-            journal = "Nature Reviews Genetics"
+        journal = "Nature Reviews Genetics"
         
-        # Extract abstract
-        abstract_start = "Abstract\n"
-        abstract_end = "\nSimilar content being viewed by others"
-        if abstract_start in content and abstract_end in content:
-            abstract = content.split(abstract_start)[1].split(abstract_end)[0].strip()
+        # Extract abstract (first paragraph of the Abstract section)
+        if abstract_lines:
+            abstract = abstract_lines[0]
         else:
             abstract = "The interplay between chromatin, transcription factors and genes generates complex regulatory circuits that can be represented as gene regulatory networks (GRNs). The study of GRNs is useful to understand how cellular identity is established, maintained and disrupted in disease. GRNs can be inferred from experimental data — historically, bulk omics data — and/or from the literature. The advent of single-cell multi-omics technologies has led to the development of novel computational methods that leverage genomic, transcriptomic and chromatin accessibility information to infer GRNs at an unprecedented resolution. Here, we review the key principles of inferring GRNs that encompass transcription factor–gene interactions from transcriptomics and chromatin accessibility data. We focus on the comparison and classification of methods that use single-cell multimodal data. We highlight challenges in GRN inference, in particular with respect to benchmarking, and potential further developments using additional data modalities."
         
@@ -129,19 +142,6 @@ def parse_paper_markdown(file_path):
             "ATAC-seq", "ChIP-seq", "systematic review"
         ]
         
-        # Extract paper sections
-        sections = []
-        section_patterns = [
-            "Introduction",
-            "Inference of GRNs",
-            "From transcriptomics data",
-            "From TF binding data or chromatin accessibility"
-        ]
-        
-        for section in section_patterns:
-            if section in content:
-                sections.append(section)
-        
         metadata = {
             "title": title,
             "authors": authors,
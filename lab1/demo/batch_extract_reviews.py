@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Extract review articles from every paper markdown under a directory tree.
+
+Papers are grouped into chunks and parsed on a process pool, then the results
+are merged into a single review table. A review cited by several papers is
+listed once, with all citing papers in its source_paper column. Papers whose
+content was already extracted (see extraction_cache.py) are not parsed again,
+and identical copies of a paper are parsed only once.
+
+Usage:
+    python batch_extract_reviews.py [CORPUS_DIR] [-o OUTPUT.csv|OUTPUT.parquet] [--workers N] [--chunk-size N]
+                                    [--cache CACHE_DB | --no-cache]
+"""
+
+import argparse
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from extract_reviews import CACHE_FILE, FIELDNAMES, extract_paper, write_reviews
+from extraction_cache import ExtractionCache, hash_file
+from reference_record import ReferenceRecord
+
+# Configuration
+CORPUS_DIR = "/Users/simonwang/Documents/Usage/AIagent4bio"
+OUTPUT_FILE = "/Users/simonwang/Documents/Usage/AIagent4bio/lab1/demo/review_articles_corpus.csv"
+CHUNK_SIZE = 32  # papers per work unit sent to a worker
+
+BATCH_FIELDNAMES = FIELDNAMES + ['source_paper']
+
+
+def find_papers(corpus_dir):
+    """Return the paper markdown files under a directory tree, in a stable order."""
+    papers = []
+    for dirpath, dirnames, filenames in os.walk(corpus_dir):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+        for filename in sorted(filenames):
+            if filename.endswith('.md'):
+                papers.append(os.path.join(dirpath, filename))
+    return papers
+
+
+def extract_chunk(paths):
+    """Worker entry point: extract a chunk of papers and return (path, rows) pairs."""
+    results = []
+    for path in paths:
+        try:
+            # Same References section lookup as single-paper runs, which share the cache entries
+            results.append((path, extract_paper(path) or []))
+        except OSError as e:
+            print(f"  Error reading {path}: {e}")
+            results.append((path, []))
+    return results
+
+
+def review_key(article):
+    """Key identifying the same review article cited from different papers."""
+    title = re.sub(r'\W+', ' ', article['title']).strip().lower()
+    if title:
+        return (title, article['year'])
+    return (re.sub(r'\s+', ' ', article['full_citation']).strip().lower(),)
+
+
+def merge_reviews(paper_rows):
+    """Merge (source_paper, rows) pairs into one deduplicated list, joining the source papers."""
+    merged = {}
+    for source_paper, rows in paper_rows:
+        for article in rows:
+            key = review_key(article)
+            existing = merged.get(key)
+            if existing is None:
+                merged[key] = ReferenceRecord(**article)
+                merged[key]['source_paper'] = source_paper
+            elif source_paper not in existing['source_paper'].split('; '):
+                existing['source_paper'] += '; ' + source_paper
+    return list(merged.values())
+
+
+def batch_extract(corpus_dir, workers=None, chunk_size=CHUNK_SIZE, cache=None):
+    """
+    Extract and merge the review articles of every paper under corpus_dir.
+
+    Args:
+        corpus_dir: Root of the directory tree holding paper markdown files
+        workers: Number of worker processes (defaults to the CPU count)
+        chunk_size: Number of papers per work unit
+        cache: Optional ExtractionCache holding rows of already extracted papers
+
+    Returns:
+        Tuple of (number of papers, number of papers parsed, deduplicated review rows)
+    """
+    papers = find_papers(corpus_dir)
+
+    # Only one copy of each distinct, not yet cached paper needs parsing
+    hashes = {}
+    rows_by_hash = {}
+    pending = {}
+    for path in papers:
+        content_hash = cache.content_hash(path) if cache else hash_file(path)
+        hashes[path] = content_hash
+        if content_hash in rows_by_hash or content_hash in pending:
+            continue
+        rows = cache.get(content_hash) if cache else None
+        if rows is None:
+            pending[content_hash] = path
+        else:
+            rows_by_hash[content_hash] = rows
+
+    to_parse = list(pending.values())
+    chunks = [to_parse[i:i + chunk_size] for i in range(0, len(to_parse), chunk_size)]
+    if chunks:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for results in executor.map(extract_chunk, chunks):
+                for path, rows in results:
+                    rows_by_hash[hashes[path]] = rows
+                    if cache:
+                        cache.put(hashes[path], rows)
+
+    # Merge in directory order, so the table is the same on every run
+    paper_rows = ((os.path.relpath(path, corpus_dir), rows_by_hash[hashes[path]]) for path in papers)
+    return len(papers), len(to_parse), merge_reviews(paper_rows)
+
+
+def main():
+    """Run the batch extraction from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('corpus_dir', nargs='?', default=CORPUS_DIR,
+                        help="directory tree of paper markdown files")
+    parser.add_argument('-o', '--output', default=OUTPUT_FILE,
+                        help="merged review table to write (.csv, or .parquet for typed columnar output)")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="papers per work unit")
+    parser.add_argument('--cache', default=CACHE_FILE, help="extraction cache database")
+    parser.add_argument('--no-cache', action='store_true', help="parse every paper from scratch")
+    args = parser.parse_args()
+
+    cache = None if args.no_cache else ExtractionCache(args.cache)
+    try:
+        paper_count, parsed_count, reviews = batch_extract(args.corpus_dir, args.workers, args.chunk_size, cache)
+    finally:
+        if cache:
+            cache.close()
+    write_reviews(reviews, args.output, BATCH_FIELDNAMES)
+
+    print(f"Scanned {paper_count} papers ({parsed_count} parsed, {paper_count - parsed_count} reused)")
+    print(f"Found {len(reviews)} unique review articles")
+    print(f"Output saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
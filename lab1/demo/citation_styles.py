@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Publisher citation styles for reference lists.
+
+Each style knows how its reference list is laid out: which line starts a new
+reference, which lines are publisher noise, and how the fields of one
+reference are split. ``detect_style`` reads the first lines of a reference
+section, counts the lines that only one style produces, and picks that style,
+so the rest of the section is parsed by a single specialised splitter instead
+of trying every heuristic on every line.
+
+Styles:
+    nature     Kim, S. & Wysocka, J. Title. Mol. Cell 83, 373–392 (2023).
+               (one reference per line, followed by CAS / PubMed lines)
+    cell       "1." on its own line, then authors, title and
+               "Nat. Genet. 2015; 47:8-12" on separate lines (Cell, Trends)
+    apa        Author-date: Beckwith J (2011) Title. J Mol Biol 409 (1), 7–13.
+               Smith, J. (2019). Title. Journal, 20(3), 437–455.
+    vancouver  1. Smith J, Doe A. Title. J Mol Biol. 2011;409(1):7-13.
+"""
+
+import re
+from abc import ABC, abstractmethod
+
+from citation_tagger import tag_citation
+
+SAMPLE_REFERENCES = 5  # signature lines one style needs before the sample stops
+SAMPLE_LINES = 200     # most lines read while detecting the style
+
+# Lines inserted by the publisher page between references
+METADATA_LINES = {'Article', 'CAS', 'PubMed', 'Google Scholar', 'References'}
+
+# Citation counts and other numeric-only lines end the current reference
+COUNT_LINE = re.compile(r'^\d+[,\d]*$')
+
+# Pattern: LastName, FirstInitial. & LastName, FirstInitial.  /  LastName et al.
+REFERENCE_START = re.compile(r'^[A-Z][a-z]+.*,.*[A-Z]\.|^[A-Z][a-z]+.*et al\.')
+
+# "1. ", "[1] ", "* **1.**" (PMC markdown) in front of a numbered reference
+NUMBER = r'(?:[*+-]\s+)?(?:\*\*)?\[?\d+[.)\]](?:\*\*)?\s*'
+NUMBER_PREFIX = re.compile('^' + NUMBER)
+
+# Markdown links (DOI, PubMed, Google Scholar) trailing a PMC reference, and bare DOI/URL tails
+LINK_TAIL = re.compile(r'\s*\[\[.*$')
+URL_TAIL = re.compile(r'\s+(?:https?://|doi:\s*)\S+\s*$')
+
+CELL_SOURCE = re.compile(r'^(?P<journal>.+?)\.?\s+(?P<year>\d{4});\s*(?:(?P<volume>[^:,\s]+)[:,]\s*(?P<pages>\S+))?\s*$')
+AUTHOR_YEAR = re.compile(r'^(?P<authors>.+?)\s*\((?P<year>\d{4})[a-z]?\)\.?\s+(?P<rest>.*)$')
+APA_SOURCE = re.compile(
+    r'(?:^|(?<=[.?!]))\s*(?P<journal>[^.?!]+?),?\s+(?P<volume>\d+)\s*(?:\([^)]*\))?'
+    r'(?:,\s*(?P<pages>[A-Za-z]?\d+(?:\s*[–-]\s*[A-Za-z]?\d+)?(?:\s+e\d+)?))?\.?\s*$'
+)
+VANCOUVER = re.compile(
+    r'^(?P<authors>[^.]+?)\.\s+(?P<title>.+?[.?!])\s+(?P<journal>[^.?!]+?)\.?\s+'
+    r'(?P<year>\d{4})(?:\s+[A-Z][a-z]{2}(?:\s+\d{1,2})?)?;\s*(?P<volume>[^(:;]*)(?:\([^)]*\))?'
+    r'(?::\s*(?P<pages>[A-Za-z]?\d+(?:[–-][A-Za-z]?\d+)?))?'
+)
+
+
+def _strip_period(text):
+    """Drop a trailing period that is not part of "et al." or an ellipsis."""
+    if text.endswith('.') and not text.endswith(('et al.', '...')):
+        return text[:-1]
+    return text
+
+
+def _fields(full_citation, **values):
+    """Return a citation dictionary in the layout of ``tag_citation``."""
+    fields = {'authors': '', 'title': '', 'journal': '', 'volume': '', 'pages': '', 'year': ''}
+    for name, value in values.items():
+        fields[name] = (value or '').strip()
+    fields['full_citation'] = full_citation
+    return fields
+
+
+class CitationStyle(ABC):
+    """
+    Base class of a reference-list layout.
+
+    ``signature`` matches lines that only this style produces and is used by
+    ``detect_style``; ``split`` groups the lines of a section into references
+    (lists of lines) and ``tag`` splits one reference into its fields.
+    """
+
+    name = None
+    signature = None
+
+    @abstractmethod
+    def split(self, lines):
+        """Yield the lines of each reference from the non-blank lines of a section."""
+
+    @abstractmethod
+    def tag(self, parts):
+        """Return the fields of one reference given its lines."""
+
+
+class NatureStyle(CitationStyle):
+    """Nature: one line per reference, separated by metadata and citation-count lines."""
+
+    name = 'nature'
+    signature = re.compile(r'^[A-Z].*\d\s\(\d{4}\)\.(?:\s|$)')
+
+    def split(self, lines):
+        parts = []
+        for line in lines:
+            if line in METADATA_LINES:
+                continue
+
+            if COUNT_LINE.match(line) or line.startswith('Download references'):
+                if parts:
+                    yield parts
+                    parts = []
+                continue
+
+            # Check if this looks like the start of a reference
+            if REFERENCE_START.match(line):
+                if parts:
+                    yield parts
+                parts = [line]
+            elif parts:
+                parts.append(line)
+
+        # Add the last one
+        if parts:
+            yield parts
+
+    def tag(self, parts):
+        return tag_citation(' '.join(parts))
+
+
+class CellStyle(CitationStyle):
+    """Cell Press / Trends: number, authors, title and source each on their own line."""
+
+    name = 'cell'
+    signature = re.compile(r'^\d+\.$')
+
+    def split(self, lines):
+        parts = []
+        complete = True  # no reference open until the first number line
+        for line in lines:
+            if self.signature.match(line):
+                if parts:
+                    yield parts
+                parts = []
+                complete = False
+            elif not complete:
+                parts.append(line)
+                # Crossref / Scopus / PubMed links follow the source line
+                complete = len(parts) > 2 and CELL_SOURCE.match(line) is not None
+        if parts:
+            yield parts
+
+    def tag(self, parts):
+        full_citation = ' '.join(parts)
+        source = CELL_SOURCE.match(parts[-1]) if len(parts) > 2 else None
+        if source is None:
+            return _fields(full_citation, authors=_strip_period(parts[0]), title=' '.join(parts[1:]))
+        return _fields(full_citation, authors=_strip_period(parts[0]), title=' '.join(parts[1:-1]),
+                       journal=source.group('journal'), volume=source.group('volume'),
+                       pages=source.group('pages'), year=source.group('year'))
+
+
+class NumberedStyle(CitationStyle):
+    """Base of the styles whose references start on a numbered (or author) line."""
+
+    # Pattern of an unnumbered line that starts a reference
+    start = None
+
+    def split(self, lines):
+        parts = []
+        for line in lines:
+            if line in METADATA_LINES:
+                continue
+            number = NUMBER_PREFIX.match(line)
+            if number or (self.start is not None and self.start.match(line)):
+                if parts:
+                    yield parts
+                parts = []
+                if number:
+                    line = line[number.end():]
+                if not line:
+                    continue
+            parts.append(line)
+        if parts:
+            yield parts
+
+    def _text(self, parts):
+        """Return the citation text without trailing links."""
+        return URL_TAIL.sub('', LINK_TAIL.sub('', ' '.join(parts)))
+
+
+class APAStyle(NumberedStyle):
+    """Author-date (APA and PMC): "Author (2011) Title. Journal 409 (1), 7–13."."""
+
+    name = 'apa'
+    signature = re.compile(f'^(?:{NUMBER})?' + r'[^()\d]+\(\d{4}[a-z]?\)')
+    start = re.compile(r'^[A-Z][^()\d]+\(\d{4}[a-z]?\)')
+
+    def tag(self, parts):
+        full_citation = ' '.join(parts)
+        match = AUTHOR_YEAR.match(self._text(parts))
+        if match is None:
+            return _fields(full_citation)
+        rest = match.group('rest')
+        source = APA_SOURCE.search(rest)
+        if source is None:
+            return _fields(full_citation, authors=_strip_period(match.group('authors')),
+                           title=_strip_period(rest), year=match.group('year'))
+        return _fields(full_citation, authors=_strip_period(match.group('authors')),
+                       title=_strip_period(rest[:source.start()].strip()), journal=source.group('journal'),
+                       volume=source.group('volume'), pages=source.group('pages'), year=match.group('year'))
+
+
+class VancouverStyle(NumberedStyle):
+    """Vancouver / NLM: "1. Smith J, Doe A. Title. J Mol Biol. 2011;409(1):7-13."."""
+
+    name = 'vancouver'
+    signature = re.compile('^' + NUMBER + r'\S.*\b\d{4}(?:\s[A-Z][a-z]{2}(?:\s\d{1,2})?)?;\s?\d')
+    # Unnumbered Vancouver lists have no reliable start line
+    start = None
+
+    def tag(self, parts):
+        full_citation = ' '.join(parts)
+        match = VANCOUVER.match(self._text(parts))
+        if match is None:
+            return _fields(full_citation)
+        return _fields(full_citation, authors=match.group('authors'), title=_strip_period(match.group('title')),
+                       journal=match.group('journal'), volume=match.group('volume'),
+                       pages=match.group('pages'), year=match.group('year'))
+
+
+STYLES = [NatureStyle(), CellStyle(), APAStyle(), VancouverStyle()]
+DEFAULT_STYLE = STYLES[0]
+
+
+def detect_style(lines, styles=STYLES, sample_references=SAMPLE_REFERENCES, max_lines=SAMPLE_LINES):
+    """
+    Pick the citation style of a reference section from its opening lines.
+
+    Args:
+        lines: Iterator over the non-blank lines of the section; only the sample is consumed
+        styles: Candidate CitationStyle instances, the first one being the default
+        sample_references: Signature lines after which one style is taken as detected
+        max_lines: Most lines to read before deciding on the best style seen so far
+
+    Returns:
+        Tuple of (chosen style, list of the sampled lines, to be parsed before the rest)
+    """
+    counts = [0] * len(styles)
+    sample = []
+    for line in lines:
+        sample.append(line)
+        for index, style in enumerate(styles):
+            if style.signature.match(line):
+                counts[index] += 1
+        if max(counts) >= sample_references or len(sample) >= max_lines:
+            break
+    best = max(range(len(styles)), key=lambda index: counts[index])
+    return (styles[best] if counts[best] else styles[0]), sample
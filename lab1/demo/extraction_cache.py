@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Persistent cache of extracted review rows, keyed by paper content.
+
+Rows are stored per SHA-256 of the paper file plus the extractor version (a
+hash of the parser and rule-set sources), so a paper is parsed again only when
+its content or the extraction code changes. Identical copies of a paper in
+different folders share one entry. The size and mtime of every file seen are
+remembered too, so an unchanged file is not even re-hashed on the next run.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+
+from reference_record import ReferenceRecord
+
+# Sources whose changes invalidate cached rows
+SOURCE_MODULES = ('citation_tagger.py', 'citation_styles.py', 'reference_parser.py', 'reference_record.py',
+                  'review_rules.py', 'extract_reviews.py', 'section_index.py')
+
+
+def extractor_version():
+    """Return a short hash of the parser and rule-set sources."""
+    digest = hashlib.sha256()
+    module_dir = os.path.dirname(os.path.abspath(__file__))
+    for name in SOURCE_MODULES:
+        with open(os.path.join(module_dir, name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def hash_file(path, block_size=1 << 20):
+    """Return the SHA-256 hex digest of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """SQLite store of extracted rows per (content hash, extractor version)."""
+
+    def __init__(self, path, version=None):
+        self.path = path
+        self.version = version or extractor_version()
+        self.hits = 0
+        self.misses = 0
+
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS papers (
+                content_hash TEXT NOT NULL,
+                version TEXT NOT NULL,
+                rows TEXT NOT NULL,
+                PRIMARY KEY (content_hash, version)
+            );
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                content_hash TEXT NOT NULL
+            );
+        """)
+
+    def content_hash(self, path):
+        """Return a file's content hash, re-hashing only if its size or mtime changed."""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        known = self.conn.execute(
+            "SELECT size, mtime_ns, content_hash FROM files WHERE path = ?", (path,)
+        ).fetchone()
+        if known and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+            return known[2]
+
+        content_hash = hash_file(path)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO files (path, size, mtime_ns, content_hash) VALUES (?, ?, ?, ?)",
+            (path, stat.st_size, stat.st_mtime_ns, content_hash),
+        )
+        return content_hash
+
+    def get(self, content_hash):
+        """Return the cached ReferenceRecord rows for a content hash, or None if not cached."""
+        found = self.conn.execute(
+            "SELECT rows FROM papers WHERE content_hash = ? AND version = ?", (content_hash, self.version)
+        ).fetchone()
+        if found is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [ReferenceRecord(**row) for row in json.loads(found[0])]
+
+    def put(self, content_hash, rows):
+        """Store the extracted rows of a paper."""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO papers (content_hash, version, rows) VALUES (?, ?, ?)",
+            (content_hash, self.version, json.dumps([dict(row) for row in rows], ensure_ascii=False)),
+        )
+
+    def close(self):
+        """Commit pending writes and close the database."""
+        self.conn.commit()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,530 @@
+#!/usr/bin/env python3
+"""
+Ingest PMC open access bulk packages instead of crawling article pages.
+
+NCBI publishes the PMC Open Access Subset as bulk tar.gz archives of JATS XML
+(oa_comm_xml.*.tar.gz, oa_noncomm_xml.*.tar.gz, ...). The archives are read as
+streams, so nothing is unpacked to disk. Every article is:
+
+    converted into the PMC markdown layout of lab3/data/Carthew.md (title,
+    authors, PMCID/PMID line, abstract, sections, figure captions and a
+    "## References" list), written under the archive member's own path
+    tagged reference by reference from its <ref> elements into the fields the
+    markdown parser produces, and classified with the review rules. So its
+    references reach the review table without being parsed back out of the
+    markdown
+
+The parent process decompresses the archives and hands chunks of articles to
+a process pool, keeping at most two chunks per worker in flight. Workers
+parse with iterparse and clear every paragraph, list, figure and reference
+once it is written, so memory stays flat however long an article is.
+
+Usage:
+    python pmc_ingest.py [ARCHIVE_OR_DIR ...] [-o OUTPUT.csv|OUTPUT.parquet] [--markdown-dir DIR]
+                         [--workers N] [--chunk-size N]
+"""
+
+import argparse
+import io
+import os
+import re
+import tarfile
+import time
+import xml.etree.ElementTree as ET
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from urllib.parse import quote
+
+from batch_extract_reviews import BATCH_FIELDNAMES, merge_reviews
+from citation_styles import DEFAULT_STYLE, STYLES
+from extract_reviews import write_reviews
+from reference_record import ReferenceRecord
+from review_rules import ReviewClassifier
+
+# Configuration
+ARCHIVE_DIR = "/Users/simonwang/Documents/Usage/AIagent4bio/lab1/data/pmc_oa"  # *.tar.gz from the PMC OA bulk FTP
+MARKDOWN_DIR = "/Users/simonwang/Documents/Usage/AIagent4bio/lab1/data/pmc"
+OUTPUT_FILE = "/Users/simonwang/Documents/Usage/AIagent4bio/lab1/demo/review_articles_pmc.csv"
+CHUNK_SIZE = 64  # articles per work unit sent to a worker
+
+XLINK_HREF = '{http://www.w3.org/1999/xlink}href'
+PMC_ARTICLE_URL = "https://pmc.ncbi.nlm.nih.gov/articles/"
+PUBMED_URL = "https://pubmed.ncbi.nlm.nih.gov/"
+
+# Elements whose content is left out of the markdown
+SKIPPED = {'sub-article', 'table', 'fn-group', 'glossary', 'tex-math', 'graphic', 'media', 'supplementary-material'}
+SKIPPED_ABSTRACTS = {'graphical', 'teaser', 'toc', 'web-summary'}
+# Elements that nest headings: a top-level body section gets "##"
+SECTIONS = {'sec', 'abstract', 'ack', 'app', 'boxed-text'}
+# Containers that write their paragraphs themselves
+BLOCK_OWNERS = {'list-item', 'fig', 'table-wrap', 'caption', 'ref', 'def', 'fn', 'table'}
+INLINE_MARKS = {'italic': '*', 'bold': '**', 'sup': '^', 'sub': '~'}
+CITATION_TAGS = ('element-citation', 'mixed-citation', 'nlm-citation', 'citation')
+FREE_TEXT_YEAR = re.compile(r'\b(?:19|20)\d{2}\b')
+
+
+def _text(value):
+    """Collapse the whitespace of a text."""
+    return ' '.join(value.split())
+
+
+def _inline(elem):
+    """Render the mixed content of an element as one line of markdown."""
+    parts = [elem.text or '']
+    for child in elem:
+        tag = child.tag
+        if tag in INLINE_MARKS:
+            inner = _text(_inline(child))
+            if inner:
+                parts.append(f"{INLINE_MARKS[tag]}{inner}{INLINE_MARKS[tag]}")
+        elif tag in ('ext-link', 'uri'):
+            label, href = _text(_inline(child)), child.get(XLINK_HREF)
+            parts.append(f"[{label}]({href})" if href and label else label or href or '')
+        elif tag not in SKIPPED and tag not in ('fig', 'table-wrap', 'fn'):
+            parts.append(_inline(child))
+        parts.append(child.tail or '')
+    return ''.join(parts)
+
+
+def _done(elem):
+    """Free a written element, keeping the text that follows it in its parent."""
+    tail = elem.tail
+    elem.clear()
+    elem.tail = tail
+
+
+def _initials(given):
+    """PubMed-style initials of given names ("Richard W" -> "RW"; "RW" stays)."""
+    if given.isupper() and len(given.replace(' ', '').replace('.', '')) <= 3:
+        return given.replace(' ', '').replace('.', '')
+    return ''.join(part[0] for part in re.split(r'[\s.\-]+', given) if part)
+
+
+def _person(name):
+    """Return (surname, given names) of a <name> or <string-name>."""
+    surname = _text(''.join(name.find('surname').itertext())) if name.find('surname') is not None else ''
+    given = _text(''.join(name.find('given-names').itertext())) if name.find('given-names') is not None else ''
+    if not surname:
+        surname = _text(''.join(name.itertext()))
+    return surname, given
+
+
+def _pmcid(value):
+    value = value.strip().upper()
+    return value if value.startswith('PMC') else f"PMC{value}"
+
+
+def _author_link(surname, given):
+    """Markdown link of an author to their PubMed author search, as on PMC pages."""
+    term = f'"{surname} {_initials(given)}'.strip() + '"[Author]'
+    return f"[{f'{given} {surname}'.strip()}]({PUBMED_URL}?term={quote(term)})"
+
+
+def _cited_authors(citation):
+    """PMC-style author list of a citation: "A", "A and B" or "A et al."."""
+    groups = [group for group in citation.findall('person-group')
+              if group.get('person-group-type', 'author') == 'author']
+    holders = groups or [citation]
+    names, etal = [], False
+    for holder in holders:
+        for child in holder:
+            if child.tag in ('name', 'string-name'):
+                surname, given = _person(child)
+                names.append(f"{surname} {_initials(given)}".strip())
+            elif child.tag == 'collab':
+                names.append(_text(''.join(child.itertext())))
+            elif child.tag == 'etal':
+                etal = True
+    if not names:
+        return ''
+    if len(names) == 1 and not etal:
+        return names[0]
+    if len(names) == 2 and not etal:
+        return f"{names[0]} and {names[1]}"
+    return f"{names[0]} et al."
+
+
+def tag_free_text(text):
+    """
+    Tag an unstructured <mixed-citation> with the citation style parsers.
+
+    The style whose signature matches is tried first, then the others (an
+    unnumbered Vancouver citation has no signature), and the first result with
+    a year wins. Layouts no style parses, such as books, keep the authors and
+    title of the default style and take their year from the text; their
+    journal stays empty.
+
+    Returns:
+        Fields dictionary as produced by citation_styles
+    """
+    styles = sorted(STYLES, key=lambda style: not style.signature.match(text))
+    tagged = [style.tag([text]) for style in styles]
+    fields = next((fields for fields in tagged if fields['year']), None)
+    if fields is None:
+        fields = next((fields for fields in tagged if fields['title']), DEFAULT_STYLE.tag([text]))
+        year = FREE_TEXT_YEAR.search(text)
+        fields['year'] = year.group(0) if year else ''
+    return fields
+
+
+def reference_fields(ref):
+    """
+    Tag one JATS <ref> into the fields of citation_styles, plus its markdown line.
+
+    Args:
+        ref: <ref> element
+
+    Returns:
+        Tuple of (label, fields dictionary with 'authors', 'title', 'journal',
+        'volume', 'pages', 'year' and 'full_citation'), or None without a citation
+    """
+    citation = next((elem for elem in ref.iter() if elem.tag in CITATION_TAGS), None)
+    if citation is None:
+        return None
+    label = _text(ref.findtext('label') or '').rstrip('.')
+
+    def field(tag):
+        found = citation.find(tag)
+        return _text(_inline(found)) if found is not None else ''
+
+    ids = {pub_id.get('pub-id-type'): _text(pub_id.text or '') for pub_id in citation.iter('pub-id')}
+    links = []
+    if ids.get('doi'):
+        links.append(f"[[DOI](https://doi.org/{ids['doi']})]")
+    if ids.get('pmcid') or ids.get('pmc'):
+        links.append(f"[[PMC free article]({PMC_ARTICLE_URL}{_pmcid(ids.get('pmcid') or ids['pmc'])}/)]")
+    if ids.get('pmid'):
+        links.append(f"[[PubMed]({PUBMED_URL}{ids['pmid']}/)]")
+    tail = (' ' + ' '.join(links)) if links else ''
+
+    authors, year, source = _cited_authors(citation), field('year')[:4], field('source')
+    title = field('article-title') or field('chapter-title')
+    if not (authors or year or source or title):
+        fields = tag_free_text(_text(_inline(citation)))
+        fields['full_citation'] += tail
+        return label, fields
+
+    if not title:
+        title, source = source, ''  # a book: its source is the title
+    fpage, lpage = field('fpage'), field('lpage')
+    pages = f"{fpage}–{lpage}" if fpage and lpage else fpage or field('elocation-id')
+    volume, issue = field('volume'), field('issue')
+    text = authors
+    if year:
+        text += f" ({year})"
+    if title:
+        text += f" {title}" + ('' if title.endswith(('.', '?', '!')) else '.')
+    where = source + (f" {volume}" if volume else '') + (f" ({issue})" if issue else '') + \
+        (f", {pages}" if pages else '')
+    if where:
+        text += f" {where.strip()}."
+    fields = {'authors': authors, 'title': title.rstrip('.'), 'journal': source, 'volume': volume,
+              'pages': pages, 'year': year, 'full_citation': text.strip() + tail}
+    return label, fields
+
+
+class JatsConverter:
+    """
+    Streaming conversion of one JATS article into PMC markdown.
+
+    Args:
+        out: Text stream the markdown is written to
+    """
+
+    def __init__(self, out):
+        self.out = out
+        self.meta = {'title': '', 'authors': [], 'journal': '', 'pmcid': None, 'pmid': None, 'doi': None}
+        self.references = []       # fields dictionaries, in list order
+        self.reference_lines = []  # written last, so the References section ends the file
+        self.header_written = False
+        self.pending_heading = None
+
+    def _write(self, block):
+        """Write a block of markdown, after the header and a pending section heading."""
+        if not self.header_written:
+            self._write_header()
+        if self.pending_heading:
+            self.out.write(f"## {self.pending_heading}\n\n")
+            self.pending_heading = None
+        self.out.write(block + '\n\n')
+
+    def _write_header(self):
+        meta = self.meta
+        self.header_written = True
+        self.out.write(f"# {meta['title']}\n\n")
+        if meta['authors']:
+            self.out.write(', '.join(_author_link(surname, given) for surname, given in meta['authors']) + '\n\n')
+        ids = []
+        if meta['pmcid']:
+            ids.append(f"PMCID: {meta['pmcid']}")
+        if meta['pmid']:
+            ids.append(f"PMID: [{meta['pmid']}]({PUBMED_URL}{meta['pmid']}/)")
+        if ids:
+            self.out.write('  '.join(ids) + '\n\n')
+        if meta['doi']:
+            self.out.write(f"The publisher's version of this article is available at "
+                           f"[{meta['journal'] or 'the publisher'}](https://doi.org/{meta['doi']})\n\n")
+
+    def _front(self, elem, parent, open_tags):
+        """Collect article metadata from the front matter."""
+        tag = elem.tag
+        if tag == 'journal-meta':
+            meta_journal = elem.find("journal-id[@journal-id-type='nlm-ta']")
+            if meta_journal is None:
+                meta_journal = elem.find('.//journal-title')
+            self.meta['journal'] = _text(''.join(meta_journal.itertext())) if meta_journal is not None else ''
+        elif not open_tags['article-meta'] or open_tags['related-article']:
+            return
+        elif tag == 'article-id':
+            kind, value = elem.get('pub-id-type'), _text(elem.text or '')
+            if kind in ('pmc', 'pmcid'):
+                self.meta['pmcid'] = _pmcid(value)
+            elif kind in ('pmid', 'doi'):
+                self.meta[kind] = value
+        elif tag == 'article-title' and parent == 'title-group':
+            self.meta['title'] = _text(_inline(elem))
+        elif tag == 'contrib' and elem.get('contrib-type', 'author') == 'author':
+            name = elem.find('name')
+            if name is not None:
+                self.meta['authors'].append(_person(name))
+        elif tag == 'kwd-group':
+            keywords = [_text(_inline(kwd)) for kwd in elem.iter('kwd')]
+            if keywords:
+                self._write(f"**Keywords:** {', '.join(keywords)}")
+
+    def convert(self, source):
+        """
+        Convert the article read from source (a binary file object).
+
+        Returns:
+            List of reference fields dictionaries
+        """
+        stack, open_tags, skip = [], Counter(), 0
+        for event, elem in ET.iterparse(source, events=('start', 'end')):
+            tag = elem.tag
+            if event == 'start':
+                skipped = tag in SKIPPED or (tag == 'abstract' and elem.get('abstract-type') in SKIPPED_ABSTRACTS)
+                skip += skipped
+                stack.append((tag, skipped))
+                open_tags[tag] += 1
+                if not skip and tag == 'abstract':
+                    self.pending_heading = 'Abstract' if not elem.get('abstract-type') else None
+                elif not skip and tag == 'ack':
+                    self.pending_heading = 'Acknowledgements'
+                elif tag in ('body', 'back') and not self.header_written:
+                    self._write_header()
+                continue
+
+            skipped = stack.pop()[1]
+            open_tags[tag] -= 1
+            parent = stack[-1][0] if stack else None
+            if skip:
+                skip -= skipped
+                if skipped and not skip:
+                    _done(elem)
+                continue
+            if open_tags['front']:
+                self._front(elem, parent, open_tags)
+                if tag not in ('p', 'title', 'list', 'abstract'):
+                    continue
+            if tag == 'title':
+                if parent in ('abstract', 'ack'):
+                    self.pending_heading = _text(_inline(elem)) or self.pending_heading
+                elif parent in ('sec', 'app', 'boxed-text') or (parent == 'caption' and len(stack) > 1
+                                                                 and stack[-2][0] == 'boxed-text'):
+                    level = 1 + sum(open_tags[section] for section in SECTIONS)
+                    self._write(f"{'#' * min(level, 6)} {_text(_inline(elem))}")
+            elif tag == 'p':
+                if not any(open_tags[owner] for owner in BLOCK_OWNERS) and not open_tags['list']:
+                    text = _text(_inline(elem))
+                    if text:
+                        self._write(text)
+                    _done(elem)
+            elif tag == 'list':
+                if not any(open_tags[owner] for owner in BLOCK_OWNERS) and not open_tags['list']:
+                    items = [f"* {_text(_inline(item))}" for item in elem.iter('list-item')
+                             if item.find('list') is None]
+                    if items:
+                        self._write('\n'.join(items))
+                    _done(elem)
+            elif tag in ('fig', 'table-wrap'):
+                label = _text(elem.findtext('label') or '').rstrip('.')
+                caption = elem.find('caption')
+                title = caption.find('title') if caption is not None else None
+                heading = '. '.join(part for part in (label, _text(_inline(title)) if title is not None else '')
+                                    if part)
+                if heading:
+                    self._write(f"### {heading}")
+                for paragraph in (caption.findall('p') if caption is not None else []):
+                    text = _text(_inline(paragraph))
+                    if text:
+                        self._write(text)
+                _done(elem)
+            elif tag in ('abstract', 'ack'):
+                self.pending_heading = None
+            elif tag == 'ref':
+                found = reference_fields(elem)
+                if found:
+                    label, fields = found
+                    self.references.append(fields)
+                    self.reference_lines.append(f"* **{label or len(self.references)}.**{fields['full_citation']}")
+                _done(elem)
+            elif tag == 'sec' and not open_tags['sec']:
+                _done(elem)
+        if not self.header_written:
+            self._write_header()
+        if self.reference_lines:
+            self.out.write("## References\n\n" + '\n'.join(self.reference_lines) + '\n')
+        return self.references
+
+
+def markdown_path(member_name):
+    """Relative markdown path of an archive member, e.g. PMC008xxxxxx/PMC8012345.md."""
+    parts = [part for part in re.split(r'[\\/]+', member_name) if part not in ('', '.', '..')]
+    return os.path.join(*parts[:-1], os.path.splitext(parts[-1])[0] + '.md')
+
+
+def ingest_chunk(job):
+    """
+    Worker entry point: convert a chunk of articles and extract their reviews.
+
+    Args:
+        job: Tuple of (markdown directory, list of (member name, XML bytes))
+
+    Returns:
+        List of (markdown path relative to the markdown directory, review rows,
+        number of references, error or None) per article
+    """
+    markdown_dir, articles = job
+    classifier = ReviewClassifier()
+    results = []
+    for member_name, data in articles:
+        relative, temp = member_name, None
+        try:
+            relative = markdown_path(member_name)
+            path = os.path.join(markdown_dir, relative)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp = path + '.part'
+            with open(temp, 'w', encoding='utf-8') as out:
+                references = JatsConverter(out).convert(io.BytesIO(data))
+            os.replace(temp, path)
+            rows = []
+            for fields in references:
+                review_reason = classifier.classify(fields['full_citation'])
+                if review_reason:
+                    rows.append(ReferenceRecord(**fields, review_reason=review_reason))
+        except Exception as e:
+            # One malformed article (bad XML, encoding, unexpected structure) must not stop the ingest
+            if temp and os.path.exists(temp):
+                os.remove(temp)
+            results.append((relative, [], 0, f"{member_name}: {type(e).__name__}: {e}"))
+            continue
+        results.append((relative, rows, len(references), None))
+    return results
+
+
+def find_archives(paths):
+    """Return the tar archives given directly or found in the given directories."""
+    archives = []
+    for path in paths:
+        if os.path.isdir(path):
+            archives.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                            if name.endswith(('.tar.gz', '.tgz', '.tar')))
+        else:
+            archives.append(path)
+    return archives
+
+
+def iter_articles(archives):
+    """Yield (member name, XML bytes) of every article in the archives, streaming each archive once."""
+    for archive in archives:
+        # "r|*" reads the (possibly compressed) archive as a stream: no seeking, no temporary files
+        with tarfile.open(archive, 'r|*') as tar:
+            for member in tar:
+                if member.isfile() and member.name.endswith(('.xml', '.nxml')):
+                    yield member.name, tar.extractfile(member).read()
+
+
+def ingest(archives, markdown_dir, workers=None, chunk_size=CHUNK_SIZE):
+    """
+    Convert every article of the archives and collect their review references.
+
+    Args:
+        archives: List of PMC OA tar(.gz) archives
+        markdown_dir: Directory the markdown files are written under
+        workers: Number of worker processes (defaults to the CPU count)
+        chunk_size: Number of articles per work unit
+
+    Returns:
+        Tuple of (number of articles, number of references, list of errors,
+        deduplicated review rows)
+    """
+    workers = workers or os.cpu_count() or 1
+    paper_rows, errors = [], []
+    articles = references = 0
+    start = time.perf_counter()
+
+    def collect(done):
+        nonlocal articles, references
+        for future in done:
+            for relative, rows, count, error in future.result():
+                articles += 1
+                references += count
+                if error:
+                    errors.append(error)
+                else:
+                    paper_rows.append((relative, rows))
+        if articles and articles % (chunk_size * workers * 4) < chunk_size * len(done):
+            print(f"  {articles:,} articles, {articles / (time.perf_counter() - start):.0f}/s")
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = set()
+        chunk = []
+        for article in iter_articles(archives):
+            chunk.append(article)
+            if len(chunk) < chunk_size:
+                continue
+            # Bounded read-ahead: the archive is not decompressed faster than the workers convert it
+            if len(in_flight) >= 2 * workers:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+            in_flight.add(executor.submit(ingest_chunk, (markdown_dir, chunk)))
+            chunk = []
+        if chunk:
+            in_flight.add(executor.submit(ingest_chunk, (markdown_dir, chunk)))
+        collect(wait(in_flight).done)
+
+    # Merge in member order, so the table is the same on every run
+    paper_rows.sort(key=lambda pair: pair[0])
+    return articles, references, errors, merge_reviews(paper_rows)
+
+
+def main():
+    """Run the ingestion from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('archives', nargs='*', default=[ARCHIVE_DIR],
+                        help="PMC OA bulk archives, or directories holding them")
+    parser.add_argument('-o', '--output', default=OUTPUT_FILE,
+                        help="merged review table to write (.csv, or .parquet for typed columnar output)")
+    parser.add_argument('--markdown-dir', default=MARKDOWN_DIR, help="directory for the article markdown files")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="articles per work unit")
+    args = parser.parse_args()
+
+    archives = find_archives(args.archives)
+    print(f"Ingesting {len(archives)} archives into {args.markdown_dir}")
+    start = time.perf_counter()
+    articles, references, errors, reviews = ingest(archives, args.markdown_dir, args.workers, args.chunk_size)
+    elapsed = time.perf_counter() - start
+    write_reviews(reviews, args.output, BATCH_FIELDNAMES)
+
+    print(f"Converted {articles - len(errors):,} of {articles:,} articles in {elapsed:.1f} s "
+          f"({articles / elapsed * 3600 if elapsed else 0:,.0f} articles/hour), {references:,} references")
+    for error in errors[:10]:
+        print(f"  Not converted: {error}")
+    print(f"Found {len(reviews)} unique review articles")
+    print(f"Output saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
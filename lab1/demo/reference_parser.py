@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Streaming parser for the References section of a paper markdown file.
+
+The parser walks the lines of a paper exactly once and yields one reference
+at a time, so memory use is bounded by the longest citation rather than by
+the size of the paper (or of a publisher dump holding many papers). The
+citation style of the section (Nature, Cell/Trends, APA, Vancouver) is detected
+from its first references and only that style's splitter runs over the rest.
+"""
+
+import itertools
+
+from citation_styles import detect_style
+
+
+def _is_heading(line, heading):
+    """Return True if a stripped line is the heading, with or without markdown '#' markers."""
+    return line.lstrip('#').strip() == heading
+
+
+class ReferenceParser:
+    """
+    Single-pass reference extractor over a file handle or any iterator of lines.
+
+    Lines before the ``start_heading`` line are skipped (pass ``start_heading=None``
+    when the lines already start inside the section, e.g. from a SectionIndex),
+    and parsing stops at the ``end_heading`` line. Within the section every
+    reference is yielded as soon as the next one starts, so only the reference
+    being assembled is held in memory.
+
+    Unless a ``style`` (see citation_styles.py) is given, the style is detected
+    from the first references of the section and is available as
+    ``detected_style`` once parsing has started.
+    """
+
+    def __init__(self, start_heading="References", end_heading="Acknowledgements", style=None):
+        self.start_heading = start_heading
+        self.end_heading = end_heading
+        self.style = style
+        self.detected_style = style
+        self.section_found = False
+
+    def _section_lines(self, lines):
+        """Yield the stripped, non-blank lines of the References section."""
+        in_section = self.section_found = self.start_heading is None
+        for line in lines:
+            line = line.strip()
+
+            if not in_section:
+                in_section = self.section_found = _is_heading(line, self.start_heading)
+                continue
+            if _is_heading(line, self.end_heading):
+                break
+
+            if line:
+                yield line
+
+    def iter_parts(self, lines):
+        """Yield the lines of each reference in the References section."""
+        section = self._section_lines(lines)
+        style = self.style
+        if style is None:
+            # The sampled lines are parsed too, so the section is still read once
+            style, sample = detect_style(section)
+            section = itertools.chain(sample, section)
+        self.detected_style = style
+        yield from style.split(section)
+
+    def iter_citations(self, lines):
+        """Yield the full text of each reference in the References section."""
+        for parts in self.iter_parts(lines):
+            yield ' '.join(parts)
+
+    def tag(self, parts):
+        """Split the lines of one reference into fields with the detected style."""
+        return self.detected_style.tag(parts)
+
+    def parse(self, lines):
+        """Yield one structured reference (see ``CitationStyle.tag``) per citation."""
+        for parts in self.iter_parts(lines):
+            yield self.tag(parts)
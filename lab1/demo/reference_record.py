@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Compact record type for extracted references.
+
+A ReferenceRecord keeps its fields in ``__slots__`` instead of a per-row dict,
+stores numeric years and volumes as small ints, and interns journal names and review
+reasons so the thousands of rows from the same journal share one string. It
+behaves like a read/write mapping (``row['title']``, ``row.get(...)``,
+``dict(row)``), so csv.DictWriter, the Parquet writer and the batch merge take
+records and dicts alike.
+
+Run this file directly to compare the peak RSS of 1M synthetic references
+held as dicts and as records.
+"""
+
+import os
+import resource
+import subprocess
+import sys
+
+FIELDS = ('authors', 'title', 'journal', 'volume', 'pages', 'year', 'full_citation',
+          'review_reason', 'source_paper')
+INTERNED = {'journal', 'review_reason', 'source_paper'}
+INTEGERS = {'year', 'volume'}
+
+
+def _convert(name, value):
+    """Store a field value in its compact form."""
+    if value is None or value == '':
+        return None
+    if name in INTEGERS:
+        if isinstance(value, int):
+            return value
+        # Volumes such as "Suppl 1" are kept as text
+        return int(value) if value.isdigit() else value
+    if name in INTERNED:
+        return sys.intern(value)
+    return value
+
+
+class ReferenceRecord:
+    """One reference with slotted, interned and integer-typed fields."""
+
+    __slots__ = FIELDS
+
+    def __init__(self, **fields):
+        for name in FIELDS:
+            setattr(self, name, _convert(name, fields.get(name)))
+
+    def __getitem__(self, name):
+        if name not in FIELDS:
+            raise KeyError(name)
+        value = getattr(self, name)
+        # Missing text fields read as '' like the CSV rows they replace
+        if value is None and name not in INTEGERS:
+            return ''
+        return value
+
+    def __setitem__(self, name, value):
+        if name not in FIELDS:
+            raise KeyError(name)
+        setattr(self, name, _convert(name, value))
+
+    def __contains__(self, name):
+        return name in FIELDS
+
+    def get(self, name, default=None):
+        """Return a field, or default for an unknown field name."""
+        return self[name] if name in FIELDS else default
+
+    def keys(self):
+        """Return the field names, so dict(record) and csv.DictWriter work."""
+        return list(FIELDS)
+
+    def __repr__(self):
+        return f"ReferenceRecord(authors={self.authors!r}, title={self.title!r}, year={self.year!r})"
+
+
+def _synthetic_fields(i):
+    """Return the fields of the i-th synthetic reference."""
+    return {
+        'authors': f"Author{i}, A. et al.",
+        'title': f"Synthetic reference number {i}",
+        'journal': ('Nat. Rev. Genet', 'Trends Genet', 'Annu. Rev. Genet', 'Cell')[i % 4],
+        'volume': str(i % 60),
+        'pages': f"{i % 900}–{i % 900 + 12}",
+        'year': str(1990 + i % 34),
+        'full_citation': f"Author{i}, A. et al. Synthetic reference number {i}. Nat. Rev. Genet. 1, 1–2 (2020).",
+        'review_reason': ('Nature Reviews journal', 'Trends journal', 'Annual Review journal')[i % 3],
+        'source_paper': 'lab1/data/Badia-i-Mompel et al 2023.md',
+    }
+
+
+def _peak_rss_mb():
+    """Return this process's peak resident set size in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _hold(variant, count):
+    """Build count references in one representation and print the peak RSS."""
+    rows = []
+    for i in range(count):
+        fields = _synthetic_fields(i)
+        # Copy the strings so dict rows do not share them by accident
+        fields = {name: (value + '.')[:-1] for name, value in fields.items()}
+        rows.append(ReferenceRecord(**fields) if variant == 'record' else fields)
+    print(f"{_peak_rss_mb():.1f}")
+
+
+def _benchmark(count=1000000):
+    """Measure peak RSS of dict rows against ReferenceRecord rows in fresh processes."""
+    results = {}
+    for variant in ('dict', 'record'):
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), variant, str(count)],
+                                capture_output=True, text=True, check=True).stdout
+        results[variant] = float(output.strip())
+        print(f"{variant:>8}: {results[variant]:8.1f} MB peak RSS for {count:,} references")
+    saved = results['dict'] - results['record']
+    print(f"   saved: {saved:8.1f} MB ({saved / results['dict']:.0%})")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3:
+        _hold(sys.argv[1], int(sys.argv[2]))
+    else:
+        _benchmark()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Typed columnar (Parquet) storage for extracted references.
+
+Rows are written in row groups while they are being extracted, with year and
+volume stored as integers and journal / review_reason dictionary-encoded. The
+reader can load only the columns a job needs and push filters such as
+``('year', '>=', 2020)`` down to the row-group statistics, so downstream jobs
+never have to parse the full_citation column.
+
+Requires pyarrow (pip install pyarrow).
+"""
+
+# pyarrow is optional: only Parquet output needs it
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+ROW_GROUP_SIZE = 65536  # rows buffered before a row group is written
+
+INTEGER_COLUMNS = {'year': 'int16', 'volume': 'int32'}
+DICTIONARY_COLUMNS = {'journal', 'review_reason'}
+
+
+def _require_pyarrow():
+    """Raise a helpful error when pyarrow is missing."""
+    if not HAS_PYARROW:
+        raise ImportError("Parquet output needs pyarrow. Install with: pip install pyarrow")
+
+
+def _to_int(value):
+    """Convert a field to int, or None when it is empty or not a plain number."""
+    if isinstance(value, int):
+        return value
+    value = (value or '').strip()
+    return int(value) if value.isdigit() else None
+
+
+def reference_schema(fieldnames):
+    """Return the Arrow schema for a list of reference fieldnames."""
+    _require_pyarrow()
+    fields = []
+    for name in fieldnames:
+        if name in INTEGER_COLUMNS:
+            fields.append(pa.field(name, getattr(pa, INTEGER_COLUMNS[name])()))
+        elif name in DICTIONARY_COLUMNS:
+            fields.append(pa.field(name, pa.dictionary(pa.int32(), pa.string())))
+        else:
+            fields.append(pa.field(name, pa.string()))
+    return pa.schema(fields)
+
+
+class ParquetReferenceWriter:
+    """
+    Write reference rows to a Parquet file one row group at a time.
+
+    Use as a context manager; rows passed to ``write`` are buffered and
+    flushed every ``row_group_size`` rows and on close.
+    """
+
+    def __init__(self, path, fieldnames, row_group_size=ROW_GROUP_SIZE):
+        self.fieldnames = list(fieldnames)
+        self.schema = reference_schema(self.fieldnames)
+        self.row_group_size = row_group_size
+        self.count = 0
+        self._columns = {name: [] for name in self.fieldnames}
+        self._buffered = 0
+        self._writer = pq.ParquetWriter(path, self.schema, compression='zstd')
+
+    def write(self, row):
+        """Buffer one row, flushing a row group when the buffer is full."""
+        for name in self.fieldnames:
+            value = row.get(name)
+            if name in INTEGER_COLUMNS:
+                value = _to_int(value)
+            self._columns[name].append(value)
+        self._buffered += 1
+        self.count += 1
+        if self._buffered >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered rows as one row group."""
+        if not self._buffered:
+            return
+        arrays = []
+        for field in self.schema:
+            values = self._columns[field.name]
+            if pa.types.is_dictionary(field.type):
+                arrays.append(pa.array(values, type=pa.string()).dictionary_encode())
+            else:
+                arrays.append(pa.array(values, type=field.type))
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+        self._columns = {name: [] for name in self.fieldnames}
+        self._buffered = 0
+
+    def close(self):
+        """Flush the last row group and finish the file."""
+        self.flush()
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def write_references_parquet(rows, path, fieldnames, row_group_size=ROW_GROUP_SIZE):
+    """Write rows to Parquet as they arrive and return how many were written."""
+    with ParquetReferenceWriter(path, fieldnames, row_group_size) as writer:
+        for row in rows:
+            writer.write(row)
+    return writer.count
+
+
+def read_references(path, columns=None, filters=None):
+    """
+    Read reference rows from Parquet, loading only the requested columns.
+
+    Args:
+        path: Parquet file written by ParquetReferenceWriter
+        columns: Optional list of column names to load
+        filters: Optional pyarrow filters, e.g. [('year', '>=', 2020)]; row groups
+            whose statistics cannot match are skipped without being read
+
+    Returns:
+        pyarrow.Table (use .to_pylist() for a list of dictionaries)
+    """
+    _require_pyarrow()
+    return pq.read_table(path, columns=columns, filters=filters)
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Heading/section offset index for paper markdown files.
+
+The paper is scanned once to find its section headings, and the byte offsets
+of every section are saved next to it in ``<paper>.sections.json``. Later runs
+load the offsets instead of rescanning, and sections are handed out as
+memoryview slices of an mmap of the file, so no copy of the full text is made.
+
+Headings are recognised as markdown ``#`` lines, as lines matching a list of
+common section names, and as the section names listed in the page's table of
+contents. When a heading occurs more than once (for example "References" in
+the table of contents and above the reference list), the occurrence followed by
+the longest content line is taken as the real section.
+
+Usage:
+    python section_index.py PAPER.md [SECTION]
+"""
+
+import json
+import mmap
+import os
+import re
+import sys
+from collections import namedtuple
+
+INDEX_VERSION = 1
+INDEX_SUFFIX = '.sections.json'
+
+DEFAULT_HEADINGS = [
+    'Abstract', 'Highlights', 'Keywords', 'Introduction', 'Background', 'Results', 'Discussion',
+    'Methods', 'Materials and methods', 'Conclusion', 'Conclusions', 'Concluding remarks',
+    'Outstanding questions', 'Summary', 'Acknowledgements', 'Acknowledgments', 'Author information',
+    'Author contributions', 'Contributions', 'Ethics declarations', 'Competing interests',
+    'Declaration of interests', 'Additional information', 'Supplementary information', 'Glossary',
+    'References', 'Bibliography',
+]
+
+MAX_HEADING_BYTES = 120  # longer lines are never headings
+TOC_MIN_KNOWN = 3        # known headings a run of short lines needs to count as a table of contents
+MIN_BODY_CHARS = 40      # content a table-of-contents name needs after it to count as a heading
+
+MARKDOWN_HEADING = re.compile(r'^#{1,6}\s+(.*?)\s*#*$')
+
+Section = namedtuple('Section', ['name', 'heading_offset', 'start', 'end', 'line'])
+
+
+def _normalise(name):
+    """Normalise a heading for comparison."""
+    return re.sub(r'\s+', ' ', name.strip('*_ ')).lower()
+
+
+def _scan_lines(buffer):
+    """Yield (offset, line number, length) for every line of a buffer."""
+    pos = 0
+    size = len(buffer)
+    line = 0
+    while pos < size:
+        end = buffer.find(b'\n', pos)
+        if end == -1:
+            end = size
+        line += 1
+        yield pos, line, end - pos
+        pos = end + 1
+
+
+def build_sections(buffer, headings=DEFAULT_HEADINGS):
+    """
+    Find the sections of a paper held in a bytes-like buffer.
+
+    Args:
+        buffer: bytes or mmap of the whole file
+        headings: Section names to recognise in addition to markdown headings
+
+    Returns:
+        List of Section tuples in document order
+    """
+    known = {_normalise(name) for name in headings}
+
+    # One pass: keep the short lines and the length of the content that follows each
+    short_lines = []  # [offset, line, text, following content length]
+    waiting = []
+    for offset, line, length in _scan_lines(buffer):
+        text = None
+        if length <= MAX_HEADING_BYTES:
+            text = buffer[offset:offset + length].decode('utf-8', 'replace').strip()
+            if not text:
+                continue
+        for entry in waiting:
+            entry[3] = length
+        waiting = []
+        if text is not None:
+            entry = [offset, line, text, 0]
+            short_lines.append(entry)
+            waiting.append(entry)
+
+    # Names listed in a table of contents: runs of consecutive short lines with several known headings
+    toc_names = set()
+    run = []
+    for entry in short_lines + [None]:
+        if entry is not None and run and entry[1] == run[-1][1] + 1 and not entry[2].endswith('.'):
+            run.append(entry)
+            continue
+        names = {_normalise(item[2]) for item in run}
+        if len(names & known) >= TOC_MIN_KNOWN:
+            toc_names.update(names)
+        run = [entry] if entry is not None and not entry[2].endswith('.') else []
+
+    # Pick the best occurrence of every heading
+    best = {}
+    for offset, line, text, following in short_lines:
+        markdown = MARKDOWN_HEADING.match(text)
+        if markdown:
+            name, score = markdown.group(1).strip('*_ '), (1, following)
+        elif _normalise(text) in known:
+            name, score = text, (0, following)
+        elif _normalise(text) in toc_names and following >= MIN_BODY_CHARS:
+            name, score = text, (0, following)
+        else:
+            continue
+        key = _normalise(name)
+        if key not in best or score > best[key][0]:
+            best[key] = (score, name, offset, line)
+
+    chosen = sorted((offset, line, name) for _, name, offset, line in best.values())
+    sections = []
+    for i, (offset, line, name) in enumerate(chosen):
+        body = buffer.find(b'\n', offset)
+        start = len(buffer) if body == -1 else body + 1
+        end = chosen[i + 1][0] if i + 1 < len(chosen) else len(buffer)
+        sections.append(Section(name, offset, start, end, line))
+    return sections
+
+
+class SectionIndex:
+    """
+    Byte-offset index of the sections of one paper, with zero-copy access.
+
+    Use as a context manager; memoryviews returned by ``view`` must be released
+    before the index is closed.
+    """
+
+    def __init__(self, path, headings=DEFAULT_HEADINGS, persist=True):
+        self.path = path
+        self._file = open(path, 'rb')
+        stat = os.fstat(self._file.fileno())
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if stat.st_size else b''
+
+        self.sections = self._load(stat) if persist else None
+        if self.sections is None:
+            self.sections = build_sections(self._mm, headings)
+            if persist:
+                self._save(stat)
+        self._by_name = {}
+        for section in self.sections:
+            self._by_name.setdefault(_normalise(section.name), section)
+
+    def _load(self, stat):
+        """Return the persisted sections if they match the file, else None."""
+        try:
+            with open(self.path + INDEX_SUFFIX, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if (saved.get('version') != INDEX_VERSION or saved.get('size') != stat.st_size
+                or saved.get('mtime_ns') != stat.st_mtime_ns):
+            return None
+        return [Section(*fields) for fields in saved['sections']]
+
+    def _save(self, stat):
+        """Persist the offsets next to the paper."""
+        saved = {
+            'version': INDEX_VERSION,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sections': [list(section) for section in self.sections],
+        }
+        try:
+            with open(self.path + INDEX_SUFFIX, 'w', encoding='utf-8') as f:
+                json.dump(saved, f, ensure_ascii=False, indent=1)
+        except OSError as e:
+            print(f"Warning: could not save section index: {e}")
+
+    def names(self):
+        """Return the section names in document order."""
+        return [section.name for section in self.sections]
+
+    def find(self, name):
+        """Return the Section with this heading (case-insensitive), or None."""
+        return self._by_name.get(_normalise(name))
+
+    def view(self, name):
+        """Return a zero-copy memoryview of a section's body, or None."""
+        section = self.find(name)
+        if section is None:
+            return None
+        return memoryview(self._mm)[section.start:section.end]
+
+    def text(self, name):
+        """Return a section's body decoded as text, or an empty string."""
+        section = self.find(name)
+        if section is None:
+            return ""
+        return self._mm[section.start:section.end].decode('utf-8', 'replace')
+
+    def _iter_lines(self, start, end):
+        """Yield decoded lines between two offsets, one line in memory at a time."""
+        pos = start
+        while pos < end:
+            line_end = self._mm.find(b'\n', pos, end)
+            if line_end == -1:
+                line_end = end
+            yield self._mm[pos:line_end].decode('utf-8', 'replace')
+            pos = line_end + 1
+
+    def lines(self, name):
+        """Yield the lines of a section's body (nothing if the section is missing)."""
+        section = self.find(name)
+        if section is not None:
+            yield from self._iter_lines(section.start, section.end)
+
+    def front_lines(self):
+        """Yield the lines before the first section (title, authors, dates)."""
+        end = self.sections[0].heading_offset if self.sections else len(self._mm)
+        yield from self._iter_lines(0, end)
+
+    def close(self):
+        """Release the mmap and the file."""
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main():
+    """List the sections of a paper, or print one of them."""
+    if len(sys.argv) < 2:
+        print(__doc__.strip().split('Usage:')[1].strip())
+        sys.exit(1)
+
+    with SectionIndex(sys.argv[1]) as index:
+        if len(sys.argv) > 2:
+            print(index.text(sys.argv[2]))
+            return
+        for section in index.sections:
+            print(f"{section.line:>6}  {section.end - section.start:>9} bytes  {section.name}")
+
+
+if __name__ == "__main__":
+    main()
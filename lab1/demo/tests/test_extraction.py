@@ -0,0 +1,61 @@
+import os
+
+import pytest
+
+from batch_extract_reviews import batch_extract
+from extract_reviews import extract_paper
+from extraction_cache import ExtractionCache
+
+# A table of contents lists "References" and "Acknowledgements" before the real sections
+PAPER = """Enhancers in development
+Sections
+Abstract
+Introduction
+References
+Acknowledgements
+Abstract
+This abstract is long enough to count as the body of the abstract section of this paper.
+Introduction
+Reviews were discussed in this long enough introduction paragraph of the paper itself.
+References
+Kim, S. & Wysocka, J. Deciphering the multi-scale, quantitative cis-regulatory code. Mol. Cell 83, 373–392 (2023).
+Article
+ CAS PubMed Google Scholar 
+Smith, J. A primary research article about enhancers. Cell 12, 1–10 (2020).
+Article
+ CAS PubMed Google Scholar 
+Doe, A. & Roe, B. Enhancers in disease. Nat. Rev. Genet. 24, 100–120 (2023).
+Article
+ CAS PubMed Google Scholar 
+Acknowledgements
+We thank the reviewers of this paper for the helpful comments on the manuscript here.
+"""
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    papers = tmp_path / 'corpus'
+    (papers / 'lab').mkdir(parents=True)
+    (papers / 'lab' / 'paper.md').write_text(PAPER, encoding='utf-8')
+    (papers / 'copy.md').write_text(PAPER, encoding='utf-8')
+    (papers / 'no_references.md').write_text("Title\nIntroduction\nJust text.\n", encoding='utf-8')
+    return papers
+
+
+def test_single_paper_reads_the_real_references_section(corpus):
+    rows = extract_paper(str(corpus / 'lab' / 'paper.md'))
+    assert [(row['title'], row['journal'], row['review_reason']) for row in rows] == [
+        ('Enhancers in disease', 'Nat. Rev. Genet', 'Nature Reviews journal')]
+    assert extract_paper(str(corpus / 'no_references.md')) is None
+
+
+def test_batch_and_single_paper_runs_agree(corpus, tmp_path):
+    with ExtractionCache(str(tmp_path / 'cache.sqlite')) as cache:
+        papers, parsed, reviews = batch_extract(str(corpus), workers=1, cache=cache)
+        assert (papers, parsed) == (3, 2)  # the copy is parsed once
+        single = extract_paper(str(corpus / 'lab' / 'paper.md'))
+        assert [dict(row, source_paper=None) for row in reviews] == [dict(row, source_paper=None) for row in single]
+        assert reviews[0]['source_paper'] == f"copy.md; lab{os.sep}paper.md"
+        # The batch run filled the cache entry a single-paper run looks up
+        cached = cache.get(cache.content_hash(str(corpus / 'lab' / 'paper.md')))
+        assert [dict(row) for row in cached] == [dict(row) for row in single]
@@ -0,0 +1,37 @@
+import os
+import shutil
+
+from extraction_cache import SOURCE_MODULES, ExtractionCache, extractor_version
+from reference_record import ReferenceRecord
+
+
+def test_rows_are_reused_until_the_paper_changes(tmp_path):
+    paper = tmp_path / 'paper.md'
+    paper.write_text("References\nA review.\n", encoding='utf-8')
+    with ExtractionCache(str(tmp_path / 'cache.sqlite')) as cache:
+        first = cache.content_hash(str(paper))
+        assert cache.get(first) is None
+        cache.put(first, [ReferenceRecord(title='A review', year='2020')])
+        assert cache.content_hash(str(paper)) == first
+        assert [dict(row)['title'] for row in cache.get(first)] == ['A review']
+        paper.write_text("References\nA changed review.\n", encoding='utf-8')
+        assert cache.content_hash(str(paper)) != first
+        assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_extractor_version_covers_the_extraction_modules():
+    for module in ('section_index', 'reference_parser', 'citation_styles', 'citation_tagger', 'review_rules',
+                   'reference_record', 'extract_reviews'):
+        assert f"{module}.py" in SOURCE_MODULES
+
+
+def test_extractor_version_changes_with_the_heading_rules(tmp_path, monkeypatch):
+    import extraction_cache
+    module_dir = os.path.dirname(os.path.abspath(extraction_cache.__file__))
+    for name in SOURCE_MODULES:
+        shutil.copy(os.path.join(module_dir, name), tmp_path / name)
+    monkeypatch.setattr(extraction_cache, '__file__', str(tmp_path / 'extraction_cache.py'))
+    before = extractor_version()
+    with open(tmp_path / 'section_index.py', 'a', encoding='utf-8') as f:
+        f.write("\nDEFAULT_HEADINGS.append('Literature cited')\n")
+    assert extractor_version() != before
@@ -0,0 +1,128 @@
+import io
+import os
+import tarfile
+import xml.etree.ElementTree as ET
+
+from pmc_ingest import JatsConverter, ingest, ingest_chunk, markdown_path, reference_fields, tag_free_text
+
+ARTICLE = b'''<?xml version="1.0"?>
+<article xmlns:xlink="http://www.w3.org/1999/xlink">
+<front>
+<journal-meta><journal-id journal-id-type="nlm-ta">Trends Genet</journal-id></journal-meta>
+<article-meta>
+<article-id pub-id-type="pmid">33092903</article-id>
+<article-id pub-id-type="pmc">7969386</article-id>
+<article-id pub-id-type="doi">10.1016/j.tig.2020.09.018</article-id>
+<title-group><article-title>Gene regulation and <italic>noise</italic></article-title></title-group>
+<contrib-group><contrib contrib-type="author"><name><surname>Carthew</surname><given-names>Richard W</given-names></name></contrib></contrib-group>
+<abstract><p>Noise in H<sub>2</sub>O.</p></abstract>
+<abstract abstract-type="graphical"><p>Graphical abstract text</p></abstract>
+<kwd-group><kwd>noise</kwd><kwd>robustness</kwd></kwd-group>
+</article-meta>
+</front>
+<body>
+<sec><title>Introduction</title>
+<p>Text with <bold>bold</bold>.<fig><label>Figure 1</label><caption><title>A figure.</title><p>Caption.</p></caption></fig> After.</p>
+<sec><title>Detail</title><list><list-item><p>one</p></list-item><list-item><p>two</p></list-item></list></sec>
+<table-wrap><label>Table 1</label><caption><title>Tab.</title></caption><table><tr><td>cell text</td></tr></table></table-wrap>
+</sec>
+</body>
+<back>
+<ack><p>Thanks.</p></ack>
+<ref-list>
+<ref><label>1.</label><element-citation><person-group person-group-type="author"><name><surname>Beckwith</surname><given-names>J</given-names></name></person-group><article-title>The operon</article-title><source>J Mol Biol</source><year>2011</year><volume>409</volume><issue>1</issue><fpage>7</fpage><lpage>13</lpage><pub-id pub-id-type="doi">10.1016/j.jmb.2011.02.027</pub-id><pub-id pub-id-type="pmid">21334344</pub-id></element-citation></ref>
+<ref><label>2</label><mixed-citation>Smith J, Doe A. Enhancers: a review. Nat Rev Genet. 2011;12(4):283-293.</mixed-citation></ref>
+</ref-list>
+</back>
+<sub-article><body><p>Sub-article text</p></body></sub-article>
+</article>'''
+
+
+def convert(data=ARTICLE):
+    out = io.StringIO()
+    references = JatsConverter(out).convert(io.BytesIO(data))
+    return out.getvalue(), references
+
+
+def test_markdown_follows_the_pmc_layout():
+    markdown, _ = convert()
+    assert markdown.startswith('# Gene regulation and *noise*\n\n'
+                               '[Richard W Carthew](https://pubmed.ncbi.nlm.nih.gov/?term=%22Carthew%20RW%22%5BAuthor%5D)')
+    assert 'PMCID: PMC7969386  PMID: [33092903](https://pubmed.ncbi.nlm.nih.gov/33092903/)' in markdown
+    assert '[Trends Genet](https://doi.org/10.1016/j.tig.2020.09.018)' in markdown
+    assert '## Abstract\n\nNoise in H~2~O.' in markdown
+    assert '**Keywords:** noise, robustness' in markdown
+    assert '## Introduction' in markdown and '### Detail' in markdown
+    assert '### Figure 1. A figure.\n\nCaption.' in markdown
+    assert 'Text with **bold**. After.' in markdown
+    assert '* one\n* two' in markdown
+    assert '## Acknowledgements\n\nThanks.' in markdown
+    assert markdown.rstrip().endswith('* **2.**Smith J, Doe A. Enhancers: a review. Nat Rev Genet. 2011;12(4):283-293.')
+    for left_out in ('Graphical abstract text', 'cell text', 'Sub-article text'):
+        assert left_out not in markdown
+
+
+def test_structured_reference_fields():
+    _, references = convert()
+    assert references[0] == {
+        'authors': 'Beckwith J', 'title': 'The operon', 'journal': 'J Mol Biol', 'volume': '409',
+        'pages': '7–13', 'year': '2011',
+        'full_citation': 'Beckwith J (2011) The operon. J Mol Biol 409 (1), 7–13. '
+                         '[[DOI](https://doi.org/10.1016/j.jmb.2011.02.027)] '
+                         '[[PubMed](https://pubmed.ncbi.nlm.nih.gov/21334344/)]'}
+
+
+def test_free_text_citation_keeps_journal_and_year():
+    _, references = convert()
+    assert references[1]['journal'] == 'Nat Rev Genet'
+    assert references[1]['year'] == '2011'
+
+
+def test_free_text_without_a_known_layout_still_gets_its_year():
+    fields = tag_free_text('Doe J. Some book title. Oxford University Press; 2009.')
+    assert fields['year'] == '2009' and fields['title'] == 'Some book title'
+
+
+def test_author_lists():
+    def authors(names):
+        ref = ET.fromstring(f'<ref><element-citation><person-group>{names}</person-group>'
+                            '<article-title>T</article-title></element-citation></ref>')
+        return reference_fields(ref)[1]['authors']
+
+    name = '<name><surname>{0}</surname><given-names>{1}</given-names></name>'
+    assert authors(name.format('Raj', 'A') + name.format('van Oudenaarden', 'Alexander')) == \
+        'Raj A and van Oudenaarden A'
+    assert authors(name.format('Raj', 'A') + '<etal/>') == 'Raj A et al.'
+    assert authors(''.join(name.format(n, 'A') for n in 'XYZ')) == 'X A et al.'
+
+
+def test_markdown_path_stays_inside_the_output_directory():
+    assert markdown_path('PMC007xxxxxx/PMC7969386.xml') == os.path.join('PMC007xxxxxx', 'PMC7969386.md')
+    assert markdown_path('../../etc/PMC1.nxml') == os.path.join('etc', 'PMC1.md')
+
+
+def test_one_bad_article_does_not_stop_its_chunk(tmp_path):
+    results = ingest_chunk((str(tmp_path), [
+        ('a/PMC1.xml', ARTICLE[:300]),                                              # truncated XML
+        ('a/PMC2.xml', b'<?xml version="1.0" encoding="bogus"?><article/>'),        # LookupError
+        ('', ARTICLE),                                                              # no file name
+        ('a/PMC3.xml', ARTICLE),
+    ]))
+    errors = [error for _, _, _, error in results]
+    assert errors[0].startswith('a/PMC1.xml: ParseError')
+    assert 'LookupError' in errors[1] and 'IndexError' in errors[2]
+    assert errors[3] is None and results[3][2] == 2
+    assert sorted(os.listdir(tmp_path / 'a')) == ['PMC3.md']
+
+
+def test_ingest_streams_an_archive(tmp_path):
+    archive = tmp_path / 'oa_comm_xml.tar.gz'
+    with tarfile.open(archive, 'w:gz') as tar:
+        for number, data in ((1, ARTICLE), (2, b'<article>'), (3, ARTICLE)):
+            member = tarfile.TarInfo(f"PMC000xxxxxx/PMC{number}.xml")
+            member.size = len(data)
+            tar.addfile(member, io.BytesIO(data))
+    articles, references, errors, reviews = ingest([str(archive)], str(tmp_path / 'md'), workers=1, chunk_size=2)
+    assert (articles, references, len(errors)) == (3, 4, 1)
+    assert [(row['title'], row['source_paper']) for row in reviews] == [
+        ('Enhancers: a review', f"PMC000xxxxxx{os.sep}PMC1.md; PMC000xxxxxx{os.sep}PMC3.md")]
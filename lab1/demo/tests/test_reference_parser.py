@@ -0,0 +1,96 @@
+"""Tests for the streaming References parser and the Nature-style tagger."""
+
+import pytest
+
+from citation_styles import CitationStyle, NatureStyle, NumberedStyle
+from citation_tagger import tag_citation
+from reference_parser import ReferenceParser
+
+REFERENCES = [
+    "Kim, S. & Wysocka, J. Deciphering the cis-regulatory code. Mol. Cell 83, 373–392 (2023).",
+    "Smith, J. A primary research article about enhancers. Cell 12, 1–10 (2020).",
+    "Doe, A. & Roe, B. Enhancers in disease. Nat. Rev. Genet. 24, 100–120 (2023).",
+]
+
+
+def paper_lines(references=REFERENCES, heading="References"):
+    lines = ["Title", "Introduction", "Text that cites Smith, J. in passing.", heading]
+    for reference in references:
+        lines += [reference, "Article", "CAS", "PubMed", "Google Scholar"]
+    return lines + ["Acknowledgements", "Kim, S. thanks nobody. Not a reference 1, 1–2 (2000)."]
+
+
+def test_only_the_section_between_the_headings_is_parsed():
+    parser = ReferenceParser()
+    assert list(parser.iter_citations(paper_lines())) == REFERENCES
+    assert parser.section_found
+    assert isinstance(parser.detected_style, NatureStyle)
+
+
+def test_markdown_heading_starts_the_section():
+    assert list(ReferenceParser().iter_citations(paper_lines(heading="## References"))) == REFERENCES
+
+
+def test_missing_section_yields_nothing():
+    parser = ReferenceParser()
+    assert list(parser.iter_citations(["Title", "Introduction", "No references here."])) == []
+    assert not parser.section_found
+
+
+def test_lines_already_inside_the_section():
+    lines = paper_lines()[4:]
+    assert list(ReferenceParser(start_heading=None).iter_citations(lines)) == REFERENCES
+
+
+def test_reading_stops_at_the_end_heading():
+    def lines():
+        yield from paper_lines()[:-1]
+        pytest.fail("read past the Acknowledgements heading")
+
+    assert len(list(ReferenceParser().iter_citations(lines()))) == 3
+
+
+def test_references_are_yielded_while_the_section_is_still_being_read():
+    read = []
+
+    def lines():
+        for line in paper_lines(REFERENCES * 100):
+            read.append(line)
+            yield line
+
+    citations = ReferenceParser(style=NatureStyle()).iter_citations(lines())
+    assert next(citations) == REFERENCES[0]
+    assert len(read) < 20
+
+
+@pytest.mark.parametrize('citation, expected', [
+    ("Carthew, R. W. Gene regulation and cellular metabolism. Trends Genet. 37, 389–400 (2021).",
+     {'authors': 'Carthew, R. W', 'title': 'Gene regulation and cellular metabolism', 'journal': 'Trends Genet',
+      'volume': '37', 'pages': '389–400', 'year': '2021'}),
+    ("Zhang, Y. et al. Single-cell atlas of the human brain. Nature 600, 1–10 (2021).",
+     {'authors': 'Zhang, Y. et al.', 'title': 'Single-cell atlas of the human brain', 'journal': 'Nature',
+      'volume': '600', 'pages': '1–10', 'year': '2021'}),
+    ("Lee, J.-X. & Park, K. Enhancer grammar. Preprint at bioRxiv https://doi.org/10.1101/2020.01.01 (2020).",
+     {'authors': 'Lee, J.-X. & Park, K', 'title': 'Enhancer grammar', 'journal': 'bioRxiv', 'year': '2020'}),
+])
+def test_tag_citation_fields(citation, expected):
+    fields = tag_citation(citation)
+    assert {name: fields[name] for name in expected} == expected
+    assert fields['full_citation'] == citation
+
+
+def test_tag_citation_stays_linear_on_long_author_lists():
+    authors = ' '.join(f"Author{i}, A. B. C.," for i in range(2000))
+    fields = tag_citation(f"{authors} & Last, Z. A title. Cell 1, 1–2 (2020).")
+    assert (fields['title'], fields['journal'], fields['year']) == ('A title', 'Cell', '2020')
+
+
+def test_styles_must_implement_split_and_tag():
+    class SplitOnly(CitationStyle):
+        def split(self, lines):
+            yield list(lines)
+
+    for style in (CitationStyle, NumberedStyle, SplitOnly):
+        with pytest.raises(TypeError):
+            style()
+    assert NatureStyle().name == 'nature'
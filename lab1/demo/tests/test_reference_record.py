@@ -0,0 +1,41 @@
+"""Tests for the compact reference record."""
+
+import csv
+import io
+
+import pytest
+
+from reference_record import FIELDS, ReferenceRecord
+
+
+def test_year_and_volume_are_integers_when_numeric():
+    row = ReferenceRecord(title="A", volume='24', year='2023')
+    assert (row.year, row.volume) == (2023, 24)
+    assert ReferenceRecord(volume='Suppl 1').volume == 'Suppl 1'
+    assert ReferenceRecord(year=2020).year == 2020
+    assert ReferenceRecord(year='')['year'] is None
+
+
+def test_journal_and_reason_are_interned():
+    first = ReferenceRecord(journal=''.join(['Nat. Rev. ', 'Genet']), review_reason=''.join(['Trends ', 'journal']))
+    second = ReferenceRecord(journal=''.join(['Nat. Rev. ', 'Gen', 'et']), review_reason="Trends journal")
+    assert first.journal is second.journal
+    assert first.review_reason is second.review_reason
+
+
+def test_mapping_access():
+    row = ReferenceRecord(title="A review", year='2020')
+    assert row['authors'] == '' and row.get('missing', 'x') == 'x'
+    row['journal'] = 'Cell'
+    assert dict(row)['journal'] == 'Cell' and list(dict(row)) == list(FIELDS)
+    with pytest.raises(KeyError):
+        row['missing']
+    with pytest.raises(AttributeError):
+        row.extra = 1  # slotted, no per-row dict
+
+
+def test_csv_writer_takes_records():
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=['title', 'year'], extrasaction='ignore')
+    writer.writerow(ReferenceRecord(title="A review", year='2020', journal='Cell'))
+    assert out.getvalue().strip() == "A review,2020"
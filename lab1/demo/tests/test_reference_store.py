@@ -0,0 +1,70 @@
+"""Tests for the typed Parquet reference store."""
+
+import os
+
+import pytest
+
+from extract_reviews import FIELDNAMES, collect, section_reviews, write_reviews
+from reference_record import ReferenceRecord
+from section_index import SectionIndex
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+from reference_store import read_references, write_references_parquet  # noqa: E402
+
+
+def record(year, journal="Nat. Rev. Genet", volume='24'):
+    return ReferenceRecord(authors="Doe, A", title=f"Review from {year}", journal=journal, volume=volume,
+                           pages="1–2", year=str(year), full_citation="...", review_reason="Nature Reviews journal")
+
+
+def test_typed_schema_and_row_groups(tmp_path):
+    path = str(tmp_path / 'reviews.parquet')
+    rows = [record(2015 + i % 10, volume='' if i == 0 else str(i)) for i in range(25)]
+    assert write_references_parquet(iter(rows), path, FIELDNAMES, row_group_size=10) == 25
+
+    schema = pq.read_schema(path)
+    assert schema.field('year').type == pa.int16()
+    assert schema.field('volume').type == pa.int32()
+    assert pa.types.is_dictionary(schema.field('journal').type)
+    assert pa.types.is_dictionary(schema.field('review_reason').type)
+    assert schema.field('title').type == pa.string()
+    assert pq.ParquetFile(path).metadata.num_row_groups == 3
+    assert read_references(path, columns=['volume']).column('volume').to_pylist()[:2] == [None, 1]
+
+
+def test_projection_and_year_filter(tmp_path):
+    path = str(tmp_path / 'reviews.parquet')
+    write_references_parquet([record(year) for year in range(2010, 2025)], path, FIELDNAMES, row_group_size=5)
+
+    table = read_references(path, columns=['title', 'year'], filters=[('year', '>=', 2020)])
+    assert table.column_names == ['title', 'year']
+    assert table.column('year').to_pylist() == list(range(2020, 2025))
+
+
+def test_rows_are_written_while_the_paper_is_parsed(tmp_path):
+    paper = tmp_path / 'paper.md'
+    citations = [f"Doe, A. & Roe, B. Enhancers {i}. Nat. Rev. Genet. {i}, 1–2 ({2000 + i})." for i in range(30)]
+    lines = ["Title", "References"] + [line for citation in citations for line in (citation, "Article")]
+    paper.write_text('\n'.join(lines + ["Acknowledgements", "Thanks."]) + '\n', encoding='utf-8')
+
+    path = str(tmp_path / 'reviews.parquet')
+    written = []
+    with SectionIndex(str(paper), persist=False) as index:
+        assert write_reviews(collect(section_reviews(index), written), path) == 30
+    assert [row['title'] for row in written] == [f"Enhancers {i}" for i in range(30)]
+    assert read_references(path, filters=[('year', '>=', 2020)]).num_rows == 10
+
+
+def test_row_groups_reach_the_file_before_the_rows_run_out(tmp_path):
+    path = str(tmp_path / 'reviews.parquet')
+    sizes = []
+
+    def rows():
+        for i in range(30):
+            sizes.append(os.path.getsize(path) if os.path.exists(path) else 0)
+            yield record(2000 + i)
+
+    write_references_parquet(rows(), path, FIELDNAMES, row_group_size=10)
+    assert sizes[5] < sizes[15] < sizes[25]
@@ -0,0 +1,48 @@
+"""Tests for the review classifier."""
+
+from review_rules import ReviewClassifier
+
+
+def names(rules):
+    return [rule['name'] for rule in rules]
+
+
+def test_rules_matching_at_the_same_position_all_fire():
+    classifier = ReviewClassifier([
+        {'name': 'nature', 'pattern': r'Nat\b', 'reason': "Nature journal"},
+        {'name': 'nature_reviews', 'pattern': r'Nat\s+Rev\b', 'reason': "Nature Reviews journal"},
+    ])
+    assert names(classifier.match("Smith J. Cell death. Nat Rev Cancer 2020;20:1-2.")) == ['nature', 'nature_reviews']
+    assert classifier.hits == {'nature': 1, 'nature_reviews': 1}
+
+
+def test_matches_come_back_in_priority_order():
+    classifier = ReviewClassifier()
+    matched = classifier.match("Reviewed elsewhere. Smith J. Nature Reviews Cancer 2020")
+    assert names(matched) == ['nature_reviews', 'reviewed_elsewhere']
+    assert classifier.classify("Smith J. Trends Cell Biol. 2019") == "Trends journal"
+
+
+def test_citations_without_any_keyword_skip_the_scan():
+    classifier = ReviewClassifier()
+
+    class NoScan:
+        def finditer(self, text):
+            raise AssertionError("scanned a citation without keywords")
+
+    classifier.matcher = NoScan()
+    assert classifier.match("Smith J. Cell death. Science 2020;367:1-2.") == []
+
+
+def test_a_rule_without_a_keyword_turns_the_prefilter_off():
+    classifier = ReviewClassifier([
+        {'name': 'with_keyword', 'pattern': r'Trends', 'keyword': 'trends', 'reason': "keyword"},
+        {'name': 'without', 'pattern': r'Cell\b', 'reason': "no keyword"},
+    ])
+    assert names(classifier.match("Smith J. Cell 2020")) == ['without']
+
+
+def test_no_match_gives_empty_reason_and_counts_the_scan():
+    classifier = ReviewClassifier()
+    assert classifier.classify("Smith J. Science 2020;367:1-2.") == ""
+    assert classifier.scans == 1 and not classifier.hits
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Per-host politeness for the crawler, and racing of candidate URLs.
+
+Articles are processed concurrently by crawl_jobs.work_jobs. The fetch chain
+of each article (DOI -> PubMed -> Semantic Scholar) keeps using blocking
+``requests`` calls and runs in a worker thread. Every HTTP request, including
+each redirect hop, first takes a token from the bucket of its host. A host's
+bucket refills at one request per Crawl-delay from its robots.txt, or per
+``default_delay`` seconds when robots.txt has none. Waiting for doi.org
+therefore never delays requests to unrelated publishers, and a long reference
+list finishes in the time the busiest host needs, not in the sum of all sleeps.
+robots.txt itself is fetched through the crawl session when one is attached
+(pooled and cached like every other request), without waiting for a token.
+
+``race`` tries the candidate PDF URLs of one article side by side (still
+paced by the host buckets) and keeps the first that works.
+"""
+
+import contextvars
+import threading
+import time
+import urllib.robotparser
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+
+DEFAULT_HOST_DELAY = 2.0  # seconds between requests to one host without a robots.txt Crawl-delay
+DEFAULT_BURST = 1         # requests a host may receive back to back
+RACE_PARALLEL = 4         # candidate URLs of one article tried at the same time
+ROBOTS_TIMEOUT = 10       # seconds to wait for a robots.txt
+ROBOTS_PATH = '/robots.txt'
+
+
+class TokenBucket:
+    """Thread-safe token bucket; ``reserve`` books a token and returns how long to wait for it."""
+
+    def __init__(self, interval, burst=DEFAULT_BURST, clock=time.monotonic):
+        self.interval = interval
+        self.burst = burst
+        self.clock = clock
+        self.tokens = float(burst)
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """Take one token and return the seconds until it is available."""
+        with self.lock:
+            now = self.clock()
+            if self.interval > 0:
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) / self.interval)
+            else:
+                self.tokens = self.burst
+            self.updated = now
+            self.tokens -= 1
+            # A negative balance is a queue of callers, each waiting one interval longer
+            return 0.0 if self.tokens >= 0 else -self.tokens * self.interval
+
+
+class HostThrottle:
+    """
+    Per-host token buckets, paced by the robots.txt Crawl-delay of each host.
+
+    Args:
+        default_delay: Seconds between requests to a host without a Crawl-delay
+        burst: Requests a host may receive back to back
+        user_agent: User agent whose Crawl-delay applies
+        use_robots: Fetch robots.txt of each new host to read its Crawl-delay
+        session: Session robots.txt is fetched with (None: a bare requests.get); can be attached later
+        clock: Monotonic clock of the buckets
+        sleep: Function called to wait for a token
+    """
+
+    def __init__(self, default_delay=DEFAULT_HOST_DELAY, burst=DEFAULT_BURST, user_agent='*', use_robots=True,
+                 session=None, clock=time.monotonic, sleep=time.sleep):
+        self.default_delay = default_delay
+        self.burst = burst
+        self.user_agent = user_agent
+        self.use_robots = use_robots
+        self.session = session
+        self.clock = clock
+        self.sleep = sleep
+        self.buckets = {}
+        self.waited = {}  # host -> total seconds spent waiting for its tokens
+        self.lock = threading.Lock()
+
+    def crawl_delay(self, scheme, host):
+        """Return the Crawl-delay robots.txt sets for our user agent, or the default delay."""
+        if not self.use_robots:
+            return self.default_delay
+        robots = urllib.robotparser.RobotFileParser()
+        try:
+            # RobotFileParser.read has no timeout, so fetch the file ourselves
+            response = (self.session or requests).get(f"{scheme}://{host}{ROBOTS_PATH}", timeout=ROBOTS_TIMEOUT,
+                                                       headers={'User-Agent': self.user_agent})
+            if response.status_code != 200:
+                return self.default_delay
+            robots.parse(response.text.splitlines())
+            robots.modified()  # crawl_delay() ignores a parser that was never marked as read
+        except requests.RequestException:
+            return self.default_delay
+        delay = robots.crawl_delay(self.user_agent)
+        return float(delay) if delay is not None else self.default_delay
+
+    def bucket(self, url):
+        """Return the bucket of a URL's host, creating it on first use."""
+        parts = urlsplit(url)
+        host = parts.netloc.lower()
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is not None:
+                return host, bucket
+            # Placeholder so concurrent first requests to a host share one robots.txt fetch
+            ready = self.buckets[host] = threading.Event()
+        try:
+            delay = self.crawl_delay(parts.scheme or 'https', host)
+        except Exception:
+            delay = self.default_delay
+        bucket = TokenBucket(delay, self.burst, self.clock)
+        with self.lock:
+            self.buckets[host] = bucket
+        ready.set()
+        return host, bucket
+
+    def wait(self, url):
+        """Block the calling thread until the host of url may be requested again."""
+        if urlsplit(url).path == ROBOTS_PATH:
+            return  # robots.txt sets the pace, and its host's bucket is not ready until it arrives
+        host, bucket = self.bucket(url)
+        while isinstance(bucket, threading.Event):
+            bucket.wait()
+            host, bucket = self.bucket(url)
+        delay = bucket.reserve()
+        if delay > 0:
+            with self.lock:
+                self.waited[host] = self.waited.get(host, 0.0) + delay
+            self.sleep(delay)
+
+    def report(self):
+        """Return a summary of the hosts contacted and the time spent waiting for each."""
+        lines = [f"Contacted {len(self.buckets)} hosts"]
+        for host, bucket in sorted(self.buckets.items()):
+            interval = getattr(bucket, 'interval', self.default_delay)
+            lines.append(f"  {host:<40} {interval:5.1f} s/request  waited {self.waited.get(host, 0.0):7.1f} s")
+        return '\n'.join(lines)
+
+
+class ThrottledSession(requests.Session):
+    """requests.Session that waits for the host's token before every request and redirect hop."""
+
+    def __init__(self, throttle):
+        super().__init__()
+        self.throttle = throttle
+
+    def send(self, request, **kwargs):
+        # send() is called for the first request and again for every redirect
+        self.throttle.wait(request.url)
+        return super().send(request, **kwargs)
+
+
+def race(calls, max_parallel=RACE_PARALLEL, discard=None):
+    """
+    Run blocking calls side by side and return the first result that is not None.
+
+    Each call is made as call(cancel), where cancel is a threading.Event set as
+    soon as a winner is known; long transfers should check it and give up.
+    Calls that have not started by then are never made. The function returns
+    without waiting for calls still running. Each call runs in a copy of the
+    caller's context, so context variables (such as the job's log of transient
+    failures in crawl_jobs) are shared with it.
+
+    Args:
+        calls: List of callables, in order of preference
+        max_parallel: Calls running at the same time
+        discard: Called with the result of any later call that also succeeded
+
+    Returns:
+        The first result that is not None, or None if every call failed
+    """
+    if not calls:
+        return None
+    cancel = threading.Event()
+    finished = threading.Event()
+    lock = threading.Lock()
+    state = {'winner': None, 'left': len(calls)}
+
+    def run(call):
+        result = None
+        try:
+            if not cancel.is_set():
+                result = call(cancel)
+        except Exception:
+            result = None
+        with lock:
+            state['left'] -= 1
+            if result is not None and state['winner'] is None:
+                state['winner'], result = result, None
+                cancel.set()
+            if cancel.is_set() or state['left'] == 0:
+                finished.set()
+        if result is not None and discard is not None:
+            discard(result)
+
+    pool = ThreadPoolExecutor(max_workers=min(max_parallel, len(calls)))
+    for call in calls:
+        pool.submit(contextvars.copy_context().run, run, call)
+    finished.wait()
+    # Queued calls are dropped; running ones see the cancel flag and finish on their own
+    pool.shutdown(wait=False, cancel_futures=True)
+    return state['winner']
+
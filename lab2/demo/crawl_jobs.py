@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Durable crawl job table with leases, retries and per-host circuit breakers.
+
+Every article of the review table becomes one row of a SQLite job table,
+keyed by a stable article ID, with its state, attempt count, last error and
+the source that finally delivered it. Workers lease one job at a time. A job
+that hits a transient failure (timeouts, connection errors, HTTP 429 and
+5xx) goes back to the queue with exponential backoff and full jitter, and it
+is marked failed after ``max_attempts``. Because the table is the only state,
+an interrupted crawl resumes where it stopped when it is started again.
+
+CircuitBreaker counts consecutive transient failures per host. After
+``failure_threshold`` of them it refuses requests to that host for
+``reset_timeout`` seconds, then lets one trial request through (half-open).
+This stops a failing publisher from burning the attempts of every article
+that links to it.
+"""
+
+import asyncio
+import contextvars
+import hashlib
+import json
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+
+MAX_ATTEMPTS = 5
+LEASE_SECONDS = 600     # a leased job is handed out again if not finished by then
+BACKOFF_BASE = 30.0     # seconds before the first retry (before jitter)
+BACKOFF_CAP = 3600.0    # longest wait between two attempts
+MIN_IDLE_SECONDS = 0.1  # shortest idle sleep while waiting for a job to become due
+
+FAILURE_THRESHOLD = 5   # consecutive transient failures that open a host's circuit
+RESET_TIMEOUT = 300.0   # seconds an open circuit rejects requests before a trial request
+
+TRANSIENT_STATUSES = {429, 500, 502, 503, 504}
+
+PENDING, LEASED, DONE, FAILED = 'pending', 'leased', 'done', 'failed'
+
+Job = namedtuple('Job', ['job_id', 'row', 'attempts'])
+
+
+class TransientError(Exception):
+    """A job failed for a reason that may go away (rate limit, server error, timeout)."""
+
+    def __init__(self, message, retry_after=0.0):
+        super().__init__(message)
+        self.retry_after = retry_after  # seconds before a retry can succeed (e.g. an open circuit)
+
+
+class HostCircuitOpen(requests.ConnectionError):
+    """Raised instead of sending a request to a host whose circuit is open."""
+
+
+def article_id(row):
+    """Return a stable ID for an article row (the same on every run and machine)."""
+    key = row.get('full_citation') or f"{row.get('title', '')} {row.get('year', '')}"
+    key = re.sub(r'\s+', ' ', key).strip().lower()
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]
+
+
+def backoff_delay(attempts, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    """Return a full-jitter exponential backoff delay for the given attempt count."""
+    return random.uniform(0, min(cap, base * 2 ** max(attempts - 1, 0)))
+
+
+class JobStore:
+    """SQLite table of crawl jobs, safe to share between the crawl's worker threads."""
+
+    def __init__(self, path, max_attempts=MAX_ATTEMPTS, lease_seconds=LEASE_SECONDS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                row TEXT NOT NULL,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                source TEXT,
+                lease_owner TEXT,
+                lease_expires REAL,
+                next_attempt REAL NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_due ON jobs (state, next_attempt);
+        """)
+
+    def add(self, rows):
+        """Queue articles that are not in the table yet and return how many were added."""
+        now = time.time()
+        with self.lock:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO jobs (job_id, row, state, updated_at) VALUES (?, ?, ?, ?)",
+                ((article_id(row), json.dumps(dict(row), ensure_ascii=False), PENDING, now) for row in rows),
+            )
+            self.conn.commit()
+            return self.conn.total_changes - before
+
+    def release_leases(self):
+        """Return every leased job to the queue (use at start-up: one crawler per job table)."""
+        with self.lock:
+            self.conn.execute("UPDATE jobs SET state = ?, lease_owner = NULL WHERE state = ?", (PENDING, LEASED))
+            self.conn.commit()
+
+    def lease(self, owner):
+        """Lease the next due job to owner, or return None when no job is due now."""
+        now = time.time()
+        with self.lock:
+            found = self.conn.execute(
+                "SELECT job_id, row, attempts FROM jobs "
+                "WHERE (state = ? AND next_attempt <= ?) OR (state = ? AND lease_expires <= ?) "
+                "ORDER BY next_attempt LIMIT 1",
+                (PENDING, now, LEASED, now),
+            ).fetchone()
+            if found is None:
+                return None
+            self.conn.execute(
+                "UPDATE jobs SET state = ?, lease_owner = ?, lease_expires = ?, updated_at = ? WHERE job_id = ?",
+                (LEASED, owner, now + self.lease_seconds, now, found[0]),
+            )
+            self.conn.commit()
+        return Job(found[0], json.loads(found[1]), found[2])
+
+    def next_due(self):
+        """Return seconds until the next queued job is due, or None when nothing is left to do."""
+        with self.lock:
+            found = self.conn.execute(
+                "SELECT MIN(CASE WHEN state = ? THEN next_attempt ELSE lease_expires END) "
+                "FROM jobs WHERE state IN (?, ?)", (PENDING, PENDING, LEASED),
+            ).fetchone()
+        if found[0] is None:
+            return None
+        return max(found[0] - time.time(), 0.0)
+
+    def _finish(self, job_id, **fields):
+        fields['updated_at'] = time.time()
+        fields['lease_owner'] = None
+        assignments = ', '.join(f"{name} = ?" for name in fields)
+        with self.lock:
+            self.conn.execute(f"UPDATE jobs SET {assignments} WHERE job_id = ?", (*fields.values(), job_id))
+            self.conn.commit()
+
+    def complete(self, job, source):
+        """Record a finished job and the source that delivered it (None when not available anywhere)."""
+        self._finish(job.job_id, state=DONE, source=source, attempts=job.attempts + 1, last_error=None)
+
+    def retry(self, job, error, min_delay=0.0):
+        """Queue a job again after a transient failure, or fail it once its attempts are used up."""
+        attempts = job.attempts + 1
+        if attempts >= self.max_attempts:
+            self._finish(job.job_id, state=FAILED, attempts=attempts, last_error=str(error))
+            return None
+        delay = max(backoff_delay(attempts), min_delay)
+        self._finish(job.job_id, state=PENDING, attempts=attempts, last_error=str(error),
+                     next_attempt=time.time() + delay)
+        return delay
+
+    def counts(self):
+        """Return the number of jobs in each state."""
+        with self.lock:
+            return dict(self.conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+
+    def sources(self):
+        """Return the number of finished jobs per delivering source."""
+        with self.lock:
+            return dict(self.conn.execute(
+                "SELECT COALESCE(source, 'unavailable'), COUNT(*) FROM jobs WHERE state = ? GROUP BY source",
+                (DONE,),
+            ).fetchall())
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class CircuitBreaker:
+    """Per-host circuit breakers over consecutive transient failures."""
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = {}   # host -> consecutive transient failures
+        self.opened = {}     # host -> time its circuit opened
+        self.trips = {}      # host -> times its circuit opened
+        self.lock = threading.Lock()
+
+    def allow(self, host):
+        """Return True if a request to host may be sent now."""
+        with self.lock:
+            opened = self.opened.get(host)
+            if opened is None:
+                return True
+            if time.monotonic() - opened >= self.reset_timeout:
+                # Half-open: let one trial request through, re-open on its failure
+                self.opened[host] = time.monotonic()
+                return True
+            return False
+
+    def retry_after(self, host):
+        """Return the seconds until an open circuit lets a trial request through (0 when closed)."""
+        with self.lock:
+            opened = self.opened.get(host)
+        if opened is None:
+            return 0.0
+        return max(self.reset_timeout - (time.monotonic() - opened), 0.0)
+
+    def record_success(self, host):
+        with self.lock:
+            self.failures.pop(host, None)
+            self.opened.pop(host, None)
+
+    def record_failure(self, host):
+        with self.lock:
+            self.failures[host] = self.failures.get(host, 0) + 1
+            if self.failures[host] >= self.failure_threshold:
+                if host not in self.opened:
+                    self.trips[host] = self.trips.get(host, 0) + 1
+                self.opened[host] = time.monotonic()
+
+    def report(self):
+        """Return a summary of the hosts whose circuit opened during the run."""
+        if not self.trips:
+            return "Circuit breakers: no host tripped"
+        lines = ["Circuit breakers:"]
+        for host, trips in sorted(self.trips.items()):
+            state = 'open' if host in self.opened else 'closed'
+            lines.append(f"  {host:<40} tripped {trips}x, now {state}")
+        return '\n'.join(lines)
+
+
+class TransientLog:
+    """Transient failures met while working on one job, from any of the threads it uses."""
+
+    def __init__(self):
+        self.errors = []
+        self.retry_after = 0.0
+        self.lock = threading.Lock()
+
+    def add(self, error, retry_after=0.0):
+        with self.lock:
+            self.errors.append(error)
+            self.retry_after = max(self.retry_after, retry_after)
+
+
+# The log of the job being worked on. A context variable rather than a thread-local, so the
+# threads a job fans out to (asyncio.to_thread, crawl_engine.race) report into the same log
+_TRANSIENT_LOG = contextvars.ContextVar('transient_log', default=None)
+
+
+class CircuitBreakerMixin:
+    """
+    Session mixin that rejects requests to hosts with an open circuit.
+
+    Transient failures are collected per job, including those met on the
+    threads the job starts, so the caller can tell a retryable failure from an
+    article that is simply not available (see ``reset_transient`` and
+    ``transient_errors``).
+    """
+
+    def __init__(self, *args, breaker=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.breaker = breaker or CircuitBreaker()
+
+    def reset_transient(self):
+        """Start a new log of transient failures for the current job (the current context)."""
+        _TRANSIENT_LOG.set(TransientLog())
+
+    def transient_errors(self):
+        """Return the transient failures of the current job since the last reset."""
+        log = _TRANSIENT_LOG.get()
+        return list(log.errors) if log else []
+
+    def transient_retry_after(self):
+        """Return how long the open circuits met by the current job stay open."""
+        log = _TRANSIENT_LOG.get()
+        return log.retry_after if log else 0.0
+
+    def _transient(self, host, error, retry_after=0.0):
+        log = _TRANSIENT_LOG.get()
+        if log is not None:
+            log.add(f"{host}: {error}", retry_after)
+
+    def send(self, request, **kwargs):
+        host = urlsplit(request.url).netloc.lower()
+        if not self.breaker.allow(host):
+            self._transient(host, "circuit open", self.breaker.retry_after(host))
+            raise HostCircuitOpen(f"Circuit open for {host}")
+        try:
+            response = super().send(request, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            self.breaker.record_failure(host)
+            self._transient(host, type(e).__name__)
+            raise
+        if response.status_code in TRANSIENT_STATUSES:
+            self.breaker.record_failure(host)
+            self._transient(host, f"HTTP {response.status_code}")
+        else:
+            self.breaker.record_success(host)
+        return response
+
+
+async def work_jobs(store, worker, max_concurrency, owner='crawler'):
+    """
+    Run leased jobs through a blocking worker until the queue is drained.
+
+    The worker is called with the article row in a worker thread and returns the
+    delivering source (or None); raising TransientError, or any other exception,
+    sends the job back with backoff. A slot with nothing to lease sleeps until
+    the next job is due, or until another slot sends a job back or finishes one.
+
+    Args:
+        store: JobStore
+        worker: Blocking function worker(row) -> source or None
+        max_concurrency: Jobs in flight at the same time
+        owner: Lease owner name recorded in the table
+    """
+
+    idle = set()  # events of the slots waiting for a job, set when a job is finished or sent back
+
+    async def run(slot):
+        while True:
+            # Registered before the lease, so a change made while this slot looks for work still wakes it
+            woken = asyncio.Event()
+            idle.add(woken)
+            try:
+                job = await asyncio.to_thread(store.lease, f"{owner}-{slot}")
+                if job is None:
+                    wait = await asyncio.to_thread(store.next_due)
+                    if wait is None:
+                        return
+                    try:
+                        await asyncio.wait_for(woken.wait(), max(wait, MIN_IDLE_SECONDS))
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+            finally:
+                idle.discard(woken)
+            try:
+                source = await asyncio.to_thread(worker, job.row)
+            except Exception as e:
+                delay = await asyncio.to_thread(store.retry, job, e, getattr(e, 'retry_after', 0.0))
+                title = job.row.get('title', '')[:50]
+                if delay is None:
+                    print(f"  ✗ Giving up on {title} after {job.attempts + 1} attempts: {e}")
+                else:
+                    print(f"  ↻ Retrying {title} in {delay:.0f} s: {e}")
+            else:
+                await asyncio.to_thread(store.complete, job, source)
+            for waiting in idle:
+                waiting.set()
+
+    loop = asyncio.get_running_loop()
+    # The default executor must be at least as large as the concurrency cap
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=max_concurrency))
+    await asyncio.gather(*(run(slot) for slot in range(max_concurrency)))
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Append-only JSONL manifest of the crawl.
+
+One line per processed article replaces the per-article ``_metadata.json``
+and ``_citation.txt`` files: the table row, the identifiers found in the
+citation, the outcome (downloaded / linked / unavailable), the source that
+delivered the PDF and its SHA-256 in the PDF store. A later line for the same
+article supersedes the earlier ones.
+
+Writes are flushed at once but fsync'ed in batches (every ``sync_every``
+records or ``sync_seconds`` seconds, and on close), so a crawl of 100k
+references costs one file and a few thousand syncs. A last line left
+unfinished by a crash is cut off when the manifest is opened again. When the manifest is
+opened, one pass builds in-memory indexes from article ID (to the byte offset
+of its latest line), DOI and title, so a lookup is a dictionary access and
+one seek.
+
+Usage:
+    python crawl_manifest.py <manifest.jsonl> [article ID | DOI | title]
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+SYNC_EVERY = 100     # records written between two fsyncs
+SYNC_SECONDS = 5.0   # longest time a written record waits for its fsync
+
+DOWNLOADED, LINKED, UNAVAILABLE = 'downloaded', 'linked', 'unavailable'
+
+
+def title_key(title):
+    """Normalise a title for lookups (case, punctuation and spacing ignored)."""
+    return re.sub(r'[\W_]+', ' ', title or '').strip().lower()
+
+
+class CrawlManifest:
+    """
+    JSONL crawl records with indexed lookups, shared by the crawl's worker threads.
+
+    Args:
+        path: Manifest file, created if missing (None: call open() later)
+        sync_every: Records written between two fsyncs
+        sync_seconds: Longest time between a write and its fsync
+    """
+
+    def __init__(self, path=None, sync_every=SYNC_EVERY, sync_seconds=SYNC_SECONDS):
+        self.path = None
+        self.sync_every = sync_every
+        self.sync_seconds = sync_seconds
+        self.offsets = {}    # article ID -> offset of its latest line
+        self.outcomes = {}   # article ID -> outcome of its latest line
+        self.by_doi = {}     # lowercase DOI -> article ID with a stored PDF
+        self.by_title = {}   # title key -> article ID with a stored PDF
+        self.lock = threading.Lock()
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+        if path:
+            self.open(path)
+
+    def open(self, path):
+        """Open (or create) the manifest at path and index its records."""
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._drop_partial_line(path)
+        self.writer = open(path, 'ab')
+        self.reader = open(path, 'rb')
+        self._load()
+
+    @staticmethod
+    def _drop_partial_line(path):
+        """Cut a last line left unfinished by a crash, so the next record starts on a line of its own."""
+        if not os.path.exists(path):
+            return
+        with open(path, 'r+b') as f:
+            end = f.seek(0, os.SEEK_END)
+            if end == 0:
+                return
+            f.seek(end - 1)
+            if f.read(1) == b'\n':
+                return
+            # Find the end of the last complete line, reading backwards in blocks
+            position = end
+            while position > 0:
+                start = max(0, position - 65536)
+                f.seek(start)
+                newline = f.read(position - start).rfind(b'\n')
+                if newline != -1:
+                    position = start + newline + 1
+                    break
+                position = start
+            f.truncate(position)
+
+    def _load(self):
+        """Build the indexes in one pass over the file."""
+        offset = 0
+        self.reader.seek(0)
+        for line in self.reader:
+            if line.strip():
+                try:
+                    self._index(json.loads(line), offset)
+                except ValueError:
+                    pass  # a line cut short by a crash
+            offset += len(line)
+
+    def _index(self, entry, offset):
+        article_id = entry['article_id']
+        self.offsets[article_id] = offset
+        self.outcomes[article_id] = entry.get('outcome', DOWNLOADED if entry.get('sha256') else UNAVAILABLE)
+        if entry.get('sha256'):
+            if entry.get('doi'):
+                self.by_doi[entry['doi'].lower()] = article_id
+            title = entry.get('title') or entry.get('metadata', {}).get('title')
+            if title_key(title):
+                self.by_title[title_key(title)] = article_id
+
+    def append(self, entry):
+        """Write a record (a dictionary with at least 'article_id') and index it."""
+        entry = dict(entry, recorded_at=time.strftime('%Y-%m-%dT%H:%M:%S'))
+        line = (json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8')
+        with self.lock:
+            offset = self.writer.seek(0, os.SEEK_END)
+            self.writer.write(line)
+            self.writer.flush()  # readers see it at once; durability comes with the next fsync
+            self._index(entry, offset)
+            self.unsynced += 1
+            if self.unsynced >= self.sync_every or time.monotonic() - self.last_sync >= self.sync_seconds:
+                self._sync()
+
+    def _sync(self):
+        """fsync the manifest; the caller holds self.lock."""
+        os.fsync(self.writer.fileno())
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def get(self, article_id):
+        """Return the latest record of an article, or None."""
+        with self.lock:
+            offset = self.offsets.get(article_id)
+            if offset is None:
+                return None
+            self.reader.seek(offset)
+            return json.loads(self.reader.readline())
+
+    def find(self, article_id=None, doi=None, title=None):
+        """
+        Return the record of an article by ID, or the record with a stored PDF for a DOI or title.
+
+        The first argument that matches wins; None if none matches.
+        """
+        if article_id and article_id in self.offsets:
+            return self.get(article_id)
+        for index, key in ((self.by_doi, (doi or '').lower()), (self.by_title, title_key(title))):
+            if key and key in index:
+                return self.get(index[key])
+        return None
+
+    def counts(self):
+        """Return the number of articles per latest outcome."""
+        counts = {}
+        with self.lock:
+            for outcome in self.outcomes.values():
+                counts[outcome] = counts.get(outcome, 0) + 1
+        return counts
+
+    def close(self):
+        with self.lock:
+            if self.unsynced:
+                self._sync()
+            self.writer.close()
+            self.reader.close()
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    manifest = CrawlManifest(sys.argv[1])
+    if len(sys.argv) == 2:
+        print(f"{len(manifest.offsets)} articles: {manifest.counts()}")
+    else:
+        key = ' '.join(sys.argv[2:])
+        entry = manifest.find(article_id=key, doi=key, title=key)
+        print(json.dumps(entry, indent=2, ensure_ascii=False) if entry else f"Not found: {key}")
+    manifest.close()
+
+
+if __name__ == "__main__":
+    main()
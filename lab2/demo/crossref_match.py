@@ -0,0 +1,492 @@
+#!/usr/bin/env python3
+"""
+Recover DOIs for parsed references from a local Crossref metadata dump.
+
+The review table carries author-year citations without DOIs, e.g.
+
+    Kim, S. & Wysocka, J. Deciphering the multi-scale, quantitative
+    cis-regulatory code. Mol. Cell 83, 373–392 (2023).
+
+``parse_reference`` splits such a citation into title, journal, year and first
+author with lab1's citation tagger (lab1/demo/citation_tagger.py), the same
+parser that produced the review table, so the two never disagree on a
+citation. ``build_index`` streams a Crossref dump and writes a SQLite index. The
+dump can be the public data file (a directory of ``*.json.gz`` files with an
+"items" list) or JSONL with one work per line. Memory stays bounded however
+many records the dump holds. Each title becomes a MinHash signature of its
+content words, and the signature is split into LSH bands. A reference and a
+work whose titles are similar share a band key with high probability, so
+candidates come from an index lookup instead of a scan.
+
+``CrossrefIndex.match`` resolves references in bulk. It writes the band keys
+of a chunk of references to a temporary table and joins them with the index.
+The join keeps only works published within a year of the reference. Each
+candidate is then scored on:
+
+    title     word Jaccard with the parsed title, or the share of the work's
+              title words found in the citation (parsing errors cost little)
+    year      same year or one year apart
+    journal   abbreviation-aware comparison ("Nat. Rev. Genet." matches
+              "Nature Reviews Genetics"); a different journal excludes the
+              candidate unless the title is a near-exact match
+    author    family name of the first author found in the citation
+
+Usage:
+    python crossref_match.py build <index> <dump file or directory> ...
+    python crossref_match.py match <index> <review_articles.csv>
+    python crossref_match.py benchmark [records] [references]
+"""
+
+import csv
+import functools
+import gzip
+import hashlib
+import itertools
+import json
+import os
+import random
+import re
+import sqlite3
+import struct
+import sys
+import tempfile
+import time
+import unicodedata
+from collections import namedtuple
+
+# The citation tagger is shared with lab1's extraction; appended, so lab2 modules keep precedence
+LAB1_DEMO = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, 'lab1', 'demo')
+if LAB1_DEMO not in sys.path:
+    sys.path.append(LAB1_DEMO)
+from citation_tagger import tag_citation  # noqa: E402
+
+NUM_BANDS = 10            # LSH bands per title
+BAND_ROWS = 3             # MinHash values per band
+BATCH = 10000             # works per SQLite executemany during the build
+QUERY_CHUNK = 2000        # references joined against the index at once
+MIN_SCORE = 0.75          # best candidates below this are not accepted
+MAX_CANDIDATES = 20       # works scored per reference, those sharing the most bands
+TOP_CANDIDATES = 3        # scored candidates kept per reference
+
+_SIGNATURE = struct.Struct(f'<{NUM_BANDS * BAND_ROWS}I')  # one 32-bit hash value per MinHash position
+_KEY_MASK = (1 << 63) - 1  # band keys fit SQLite's signed 64-bit integers
+
+STOPWORDS = frozenset(
+    'a an and are as at by for from in into is its of on or the their to via with without'.split())
+
+Reference = namedtuple('Reference', ['title', 'journal', 'year', 'first_author', 'text'])
+DoiMatch = namedtuple('DoiMatch', ['doi', 'score', 'title', 'journal', 'year'])
+Work = namedtuple('Work', ['doi', 'title', 'journal', 'short_journal', 'year', 'author', 'words'])
+_Query = namedtuple('_Query', ['title_words', 'text_words', 'journal_words', 'author'])
+
+
+def words(text):
+    """Lowercase ASCII words of a text (accents and markup removed)."""
+    text = unicodedata.normalize('NFKD', re.sub(r'<[^>]+>', ' ', text or ''))
+    return re.findall(r'[a-z0-9]+', text.encode('ascii', 'ignore').decode('ascii').lower())
+
+
+def content_words(text):
+    """Set of the words of a title that carry meaning (no stopwords or single letters)."""
+    return {word for word in words(text) if len(word) > 1 and word not in STOPWORDS}
+
+
+def _to_year(value):
+    try:
+        return int(str(value).strip()[:4])
+    except ValueError:
+        return None
+
+
+def parse_reference(citation, title='', journal='', year=''):
+    """
+    Split an author-year citation into its parts.
+
+    Args:
+        citation: Full citation string
+        title, journal, year: Values from the review table, used where the
+            citation cannot be parsed
+
+    Returns:
+        Reference (title, journal, year, first_author, text)
+    """
+    citation = citation or ''
+    fields = tag_citation(citation)
+    first_author = fields['authors'].split(',', 1)[0].strip() if ',' in fields['authors'] else None
+    return Reference(fields['title'] or title or citation, fields['journal'] or journal or None,
+                     _to_year(fields['year']) or _to_year(year), first_author or None, citation)
+
+
+def minhash(tokens):
+    """MinHash signature of a set of words (NUM_BANDS * BAND_ROWS values)."""
+    # One extendable-output hash per word gives all its hash values; the minimum per position
+    # is taken across words in C
+    values = (_SIGNATURE.unpack(hashlib.shake_128(token.encode('ascii')).digest(_SIGNATURE.size))
+              for token in tokens)
+    return list(map(min, zip(*values)))
+
+
+def band_keys(tokens):
+    """LSH band keys of a set of words (none for titles of fewer than two words)."""
+    if len(tokens) < 2:
+        return []
+    signature = minhash(tokens)
+    keys = []
+    for band in range(NUM_BANDS):
+        key = band + 1
+        for value in signature[band * BAND_ROWS:(band + 1) * BAND_ROWS]:
+            key = ((key * 0x100000001B3) ^ value) & 0xFFFFFFFFFFFFFFFF
+        keys.append(key & _KEY_MASK)
+    return keys
+
+
+@functools.lru_cache(maxsize=65536)
+def _name_words(name):
+    return tuple(word for word in words(name) if word not in STOPWORDS)
+
+
+def _abbreviates(short_words, full_words):
+    return bool(short_words) and len(short_words) == len(full_words) and \
+        all(full.startswith(short) for short, full in zip(short_words, full_words))
+
+
+def journal_matches(cited, names):
+    """Whether a cited (possibly abbreviated) journal name matches one of a work's journal names."""
+    cited_words = _name_words(cited)
+    return any(_abbreviates(cited_words, _name_words(name)) for name in names)
+
+
+def _prepare(reference):
+    """Word sets of a reference, computed once for all its candidates."""
+    author = words(reference.first_author)[:1] if reference.first_author else None
+    return _Query(content_words(reference.title), content_words(reference.text),
+                  _name_words(reference.journal) if reference.journal else None, author)
+
+
+def score(reference, work, query=None):
+    """
+    Score how well a Crossref work matches a reference, between 0 and 1.
+
+    Args:
+        reference: Reference from parse_reference
+        work: Work (its words field may be None)
+        query: _prepare(reference), when already computed
+
+    Returns:
+        Score (0 when the titles share too little or the journal rules the work out)
+    """
+    query = query or _prepare(reference)
+    work_words = set(work.words.split()) if work.words is not None else content_words(work.title)
+    if not work_words:
+        return 0.0
+    jaccard = len(query.title_words & work_words) / len(query.title_words | work_words)
+    # Titles cut short or run into the author list by the parser are still contained in the citation
+    contained = len(work_words & query.text_words) / len(work_words) if len(work_words) >= 4 else 0.0
+    title_score = max(jaccard, 0.95 * contained)
+    if title_score < 0.5:
+        return 0.0  # below MIN_SCORE whatever the other fields say
+    total = 0.7 * title_score
+    if reference.year and work.year:
+        total += 0.1 if reference.year == work.year else 0.05
+    else:
+        total += 0.05
+    journals = [name for name in (work.journal, work.short_journal) if name]
+    if query.journal_words and journals:
+        if any(_abbreviates(query.journal_words, _name_words(name)) for name in journals):
+            total += 0.1
+        elif title_score < 0.95:
+            return 0.0
+    else:
+        total += 0.05
+    if work.author and query.author:
+        total += 0.1 if words(work.author)[:1] == query.author else 0.0
+    else:
+        total += 0.05
+    return round(total, 3)
+
+
+def _open_text(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+def _dump_files(paths):
+    """Yield the dump files of the given files and directories, in name order."""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if re.search(r'\.jsonl?(?:\.gz)?$', name):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def _crossref_items(path):
+    """Yield the works of one dump file: JSON with an 'items' list, or JSONL."""
+    with _open_text(path) as f:
+        if re.search(r'\.jsonl(?:\.gz)?$', path):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            data = json.load(f)
+            yield from (data.get('message', data).get('items') or [])
+
+
+def _issued_year(item):
+    for field in ('issued', 'published-print', 'published-online', 'created'):
+        parts = (item.get(field) or {}).get('date-parts') or [[None]]
+        if parts[0] and parts[0][0]:
+            return int(parts[0][0])
+    return None
+
+
+def _first(values):
+    return values[0] if values else None
+
+
+def _crossref_rows(paths):
+    """Yield (doi, title, journal, short journal, year, first author) per work with a DOI and a title."""
+    for path in _dump_files(paths):
+        for item in _crossref_items(path):
+            doi, title = item.get('DOI'), _first(item.get('title'))
+            if doi and title:
+                author = _first(item.get('author')) or {}
+                yield (doi.lower(), title, _first(item.get('container-title')),
+                       _first(item.get('short-container-title')), _issued_year(item),
+                       author.get('family') or author.get('name'))
+
+
+def build_index(path, dumps):
+    """
+    Build a DOI matching index from Crossref dump files.
+
+    Args:
+        path: SQLite file to write (replaced when done)
+        dumps: Dump files or directories of dump files
+
+    Returns:
+        Number of works indexed
+    """
+    temp = path + '.tmp'
+    if os.path.exists(temp):
+        os.remove(temp)
+    conn = sqlite3.connect(temp)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("CREATE TABLE works (id INTEGER PRIMARY KEY, doi TEXT, title TEXT, journal TEXT, "
+                 "short_journal TEXT, year INTEGER, author TEXT, words TEXT)")
+    conn.execute("CREATE TABLE bands (key INTEGER, year INTEGER, work INTEGER)")
+    count = 0
+    rows = _crossref_rows(dumps)
+    while True:
+        batch = list(itertools.islice(rows, BATCH))
+        if not batch:
+            break
+        title_words = [content_words(row[1]) for row in batch]
+        conn.executemany("INSERT INTO works VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                         ((count + i + 1,) + row + (' '.join(title_words[i]),) for i, row in enumerate(batch)))
+        conn.executemany("INSERT INTO bands VALUES (?, ?, ?)",
+                         ((key, row[4] or 0, count + i + 1)
+                          for i, row in enumerate(batch) for key in band_keys(title_words[i])))
+        count += len(batch)
+        if count % (BATCH * 50) == 0:
+            print(f"  {count:,} works")
+    # One sort after the import is much faster than keeping the index up to date while inserting
+    print("Indexing band keys...")
+    conn.execute("CREATE INDEX bands_key ON bands (key, year, work)")
+    conn.commit()
+    conn.close()
+    os.replace(temp, path)
+    return count
+
+
+def _year_ranges(year):
+    """Band index year ranges to probe for a reference (works without a year are stored under 0)."""
+    if not year:
+        return [(0, 9999)]
+    return [(year - 1, year + 1), (0, 0)]
+
+
+class CrossrefIndex:
+    """
+    Bulk title-to-DOI matching against an index built by build_index.
+
+    Args:
+        path: Index file (None: call open() later; until then nothing matches)
+        min_score: Score the best candidate needs to be accepted
+    """
+
+    def __init__(self, path=None, min_score=MIN_SCORE):
+        self.path = None
+        self.conn = None
+        self.min_score = min_score
+        self.stats = {'references': 0, 'matched': 0, 'candidates': 0}
+        if path:
+            self.open(path)
+
+    def open(self, path):
+        """Open the index at path (read-only)."""
+        self.path = path
+        self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+
+    def candidates(self, references, top=TOP_CANDIDATES):
+        """
+        Score the candidate DOIs of many references.
+
+        Args:
+            references: List of Reference
+            top: Candidates kept per reference
+
+        Returns:
+            List aligned with references, each a list of DoiMatch sorted by
+            descending score (empty when nothing shares a band)
+        """
+        results = [[] for _ in references]
+        if self.conn is None:
+            return results
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS probe (ref INTEGER, key INTEGER, low INTEGER, high INTEGER)")
+        for start in range(0, len(references), QUERY_CHUNK):
+            chunk = references[start:start + QUERY_CHUNK]
+            queries = [_prepare(reference) for reference in chunk]
+            self.conn.execute("DELETE FROM probe")
+            self.conn.executemany("INSERT INTO probe VALUES (?, ?, ?, ?)",
+                                  ((start + i, key, low, high)
+                                   for i, reference in enumerate(chunk) for key in band_keys(queries[i].title_words)
+                                   for low, high in _year_ranges(reference.year)))
+            # Band hits are counted on the covering index alone, year filter included; only the
+            # works sharing the most bands with a reference (the most similar titles) are read.
+            # CROSS JOIN keeps the probe table outermost: SQLite has no statistics for it and
+            # would otherwise scan the band table
+            found = self.conn.execute(
+                "WITH hits AS (SELECT p.ref AS ref, b.work AS work, COUNT(*) AS shared "
+                "  FROM probe p CROSS JOIN bands b ON b.key = p.key AND b.year BETWEEN p.low AND p.high "
+                "  GROUP BY p.ref, b.work), "
+                "ranked AS (SELECT ref, work, ROW_NUMBER() OVER (PARTITION BY ref ORDER BY shared DESC) AS rank "
+                "  FROM hits) "
+                "SELECT r.ref, w.doi, w.title, w.journal, w.short_journal, w.year, w.author, w.words "
+                "FROM ranked r CROSS JOIN works w ON w.id = r.work WHERE r.rank <= ?", (MAX_CANDIDATES,))
+            for ref, *fields in found:
+                work = Work(*fields)
+                self.stats['candidates'] += 1
+                value = score(references[ref], work, queries[ref - start])
+                if value > 0:
+                    results[ref].append(DoiMatch(work.doi, value, work.title, work.journal or work.short_journal,
+                                                 work.year))
+            for ref in range(start, start + len(chunk)):
+                results[ref] = sorted(results[ref], key=lambda match: -match.score)[:top]
+        return results
+
+    def match(self, references):
+        """
+        Return the accepted DOI match of each reference.
+
+        Args:
+            references: List of Reference
+
+        Returns:
+            List aligned with references: the best DoiMatch when it scores at
+            least min_score, else None
+        """
+        matches = [found[0] if found and found[0].score >= self.min_score else None
+                   for found in self.candidates(references)]
+        self.stats['references'] += len(references)
+        self.stats['matched'] += sum(match is not None for match in matches)
+        return matches
+
+    def report(self):
+        stats = self.stats
+        return (f"Crossref index: {stats['matched']} of {stats['references']} references matched to a DOI, "
+                f"{stats['candidates']} candidates scored")
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def _match_table(index_path, table):
+    index = CrossrefIndex(index_path)
+    with open(table, 'r', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    references = [parse_reference(row.get('full_citation', ''), row.get('title', ''), row.get('journal', ''),
+                                  row.get('year', '')) for row in rows]
+    start = time.perf_counter()
+    found = index.candidates(references)
+    elapsed = time.perf_counter() - start
+    for reference, candidates in zip(references, found):
+        best = candidates[0] if candidates else None
+        mark = best.doi if best and best.score >= index.min_score else '-'
+        print(f"{mark:40} {best.score if best else 0:.2f}  {reference.title[:70]}")
+    print(f"{len(references)} references in {elapsed:.2f} s")
+    index.close()
+
+
+def _benchmark(records=1000000, references=10000):
+    """Build an index of synthetic works and match perturbed citations of some of them."""
+    rng = random.Random(1)
+    vocabulary = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(4, 11)))
+                  for _ in range(50000)]
+    weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))  # Zipf, like titles
+    journals = [(f"Journal of {name.title()} Research", f"J. {name[:4].title()}. Res.")
+                for name in vocabulary[100:400]]
+    work_dir = tempfile.mkdtemp(prefix='crossref_bench_')
+    dump = os.path.join(work_dir, 'works.jsonl.gz')
+    cited = []
+    print(f"Writing {records:,} synthetic works to {dump}")
+    with gzip.open(dump, 'wt', encoding='utf-8') as f:
+        for number in range(records):
+            title = ' '.join(rng.choices(vocabulary, cum_weights=weights, k=rng.randint(6, 14))).capitalize()
+            journal, short = rng.choice(journals)
+            year = rng.randint(1990, 2024)
+            family = rng.choice(vocabulary).title()
+            doi = f"10.{1000 + number % 900}/bench.{number}"
+            f.write(json.dumps({'DOI': doi, 'title': [title], 'container-title': [journal],
+                                'short-container-title': [short], 'issued': {'date-parts': [[year]]},
+                                'author': [{'family': family, 'given': 'A.'}]}) + '\n')
+            if len(cited) < references and rng.random() < references / records:
+                cited.append((doi, title, short, year, family))
+
+    index_path = os.path.join(work_dir, 'crossref_index.sqlite')
+    start = time.perf_counter()
+    build_index(index_path, [dump])
+    print(f"Built index in {time.perf_counter() - start:.1f} s, {os.path.getsize(index_path) / 1e6:.0f} MB")
+
+    citations = []
+    for doi, title, short, year, family in cited:
+        title_words = title.split()
+        if rng.random() < 0.3:
+            title_words.pop(rng.randrange(len(title_words)))  # a word lost by the parser
+        citations.append(f"{family}, A. & Other, B. {' '.join(title_words)}. {short} 12, 1–10 ({year}).")
+    parsed = [parse_reference(citation) for citation in citations]
+    index = CrossrefIndex(index_path)
+    start = time.perf_counter()
+    matches = index.match(parsed)
+    elapsed = time.perf_counter() - start
+    correct = sum(match is not None and match.doi == doi for match, (doi, *_) in zip(matches, cited))
+    print(f"Matched {len(parsed):,} references in {elapsed:.2f} s: {correct:,} correct, "
+          f"{sum(match is not None for match in matches) - correct} wrong")
+    print(index.report())
+    index.close()
+
+
+def main():
+    if len(sys.argv) >= 2 and sys.argv[1] == 'benchmark':
+        _benchmark(*(int(arg) for arg in sys.argv[2:4]))
+        return
+    if len(sys.argv) < 4 or sys.argv[1] not in ('build', 'match'):
+        print(__doc__)
+        sys.exit(1)
+    if sys.argv[1] == 'build':
+        start = time.perf_counter()
+        count = build_index(sys.argv[2], sys.argv[3:])
+        print(f"Indexed {count:,} works in {sys.argv[2]} in {time.perf_counter() - start:.1f} s")
+    else:
+        _match_table(sys.argv[2], sys.argv[3])
+
+
+if __name__ == "__main__":
+    main()
@@ -6,31 +6,65 @@ Web Crawler for Downloading Review Article Full Texts
 This script reads a CSV file of review articles and attempts to download
 full texts from various sources including DOI links, PubMed Central, and
 publisher websites.
+
+Usage:
+    python download_reviews.py [--offline]
+
+With --offline, responses are replayed from the HTTP cache of earlier runs and
+nothing is sent over the network.
+
+Progress is kept in a job table next to the output: articles that failed with
+a transient error (rate limit, server error, timeout) are retried with
+backoff, and an interrupted run continues where it stopped when restarted.
 """
 
 import os
+import asyncio
 import csv
-import re
-import time
 import requests
-from urllib.parse import urlparse, unquote
 from pathlib import Path
-import json
 import sys
 
-# Try to import BeautifulSoup, but make it optional
+from crawl_engine import HostThrottle, ThrottledSession, race
+from crawl_jobs import CircuitBreakerMixin, JobStore, TransientError, article_id, work_jobs
+from http_cache import CachingSessionMixin, HttpCache
+from http_session import create_session
+from identifiers import scan_citations, scan_identifiers
+from oa_index import OaIndex
+from pdf_links import sniff_pdf_links
+from crossref_match import CrossrefIndex, parse_reference
+from crawl_manifest import DOWNLOADED, LINKED, UNAVAILABLE, CrawlManifest
+from pdf_store import PdfStore
+from pdf_to_text import HAS_PYMUPDF, HAS_PYPDF, TEXT_CACHE_DIR, convert_pdfs, directory_sources, manifest_sources
+from pdf_to_text import report as text_report
+from pdf_stream import PdfRejected, stream_pdf
+from semantic_scholar import SemanticScholar, open_access_pdf
+from url_templates import UrlTemplates
+
+# pyarrow is only needed when the review table is a Parquet file
 try:
-    from bs4 import BeautifulSoup
-    HAS_BS4 = True
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
 except ImportError:
-    HAS_BS4 = False
-    print("Warning: BeautifulSoup4 not installed. Some PDF link extraction features may be limited.")
-    print("Install with: pip install beautifulsoup4")
+    HAS_PYARROW = False
 
 # Configuration
 INPUT_CSV = "/Users/simonwang/Documents/Usage/AIagent4bio/lab2/data/review_articles.csv"
 OUTPUT_DIR = "/Users/simonwang/Documents/Usage/AIagent4bio/lab2/demo/Reviews"
-DELAY_BETWEEN_REQUESTS = 2  # seconds to wait between requests
+DELAY_BETWEEN_REQUESTS = 2  # seconds between requests to one host, unless its robots.txt sets a Crawl-delay
+MAX_CONCURRENCY = 8  # articles processed at the same time
+HTTP_CACHE = "/Users/simonwang/Documents/Usage/AIagent4bio/lab2/demo/.http_cache.sqlite"
+PDF_TEMP_DIR = os.path.join(OUTPUT_DIR, '.partial')  # PDFs being downloaded (same disk as OUTPUT_DIR)
+SEMANTIC_SCHOLAR_API = "https://api.semanticscholar.org/graph/v1"  # or a mock_semantic_scholar.py server
+OA_INDEX = "/Users/simonwang/Documents/Usage/AIagent4bio/lab2/data/oa_index.bin"  # built with oa_index.py, optional
+CROSSREF_INDEX = "/Users/simonwang/Documents/Usage/AIagent4bio/lab2/data/crossref_index.sqlite"  # crossref_match.py, optional
+URL_TEMPLATES = "/Users/simonwang/Documents/Usage/AIagent4bio/lab2/demo/.url_templates.json"
+JOB_DB = "/Users/simonwang/Documents/Usage/AIagent4bio/lab2/demo/.crawl_jobs.sqlite"
+TEXT_DIR = "/Users/simonwang/Documents/Usage/AIagent4bio/lab2/data/fulltext"  # markdown of the PDFs, for the analyses
+OFFLINE = '--offline' in sys.argv  # replay cached responses only, without network access
+
+# Columns the downloader uses (only these are read from a Parquet review table)
+INPUT_COLUMNS = ['authors', 'title', 'journal', 'year', 'full_citation']
 
 # Headers to mimic a browser
 HEADERS = {
@@ -41,191 +75,219 @@ HEADERS = {
     'Connection': 'keep-alive',
 }
 
-def extract_doi(citation):
-    """Extract DOI from citation string."""
-    # Pattern 1: https://doi.org/10.xxxx/xxxxx
-    doi_pattern1 = r'https?://doi\.org/(10\.\d+/[^\s\)]+)'
-    match = re.search(doi_pattern1, citation)
-    if match:
-        return match.group(1)
-    
-    # Pattern 2: doi:10.xxxx/xxxxx
-    doi_pattern2 = r'doi[:\s]+(10\.\d+/[^\s\)]+)'
-    match = re.search(doi_pattern2, citation, re.IGNORECASE)
-    if match:
-        return match.group(1)
-    
-    return None
+# Per-host politeness shared by every request of the crawl
+THROTTLE = HostThrottle(DELAY_BETWEEN_REQUESTS, user_agent=HEADERS['User-Agent'])
 
-def extract_pubmed_id(citation):
-    """Extract PubMed ID from citation string."""
-    # Look for "PubMed" followed by potential ID
-    pubmed_pattern = r'PubMed[^\d]*(\d+)'
-    match = re.search(pubmed_pattern, citation)
-    if match:
-        return match.group(1)
-    return None
+class CrawlSession(CachingSessionMixin, CircuitBreakerMixin, ThrottledSession):
+    """Session answering from the HTTP cache first, then skipping failing hosts and throttling the rest."""
+
+# One keep-alive connection pool for every fetch path, so each host is only handshaken once
+# (main() attaches the HTTP cache)
+SESSION = create_session(HEADERS, CrawlSession, throttle=THROTTLE)
+THROTTLE.session = SESSION  # robots.txt is pooled and cached like every other request
+
+# PDF URL patterns learned per DOI prefix and publisher host (main() loads the saved ones)
+TEMPLATES = UrlTemplates()
+
+# PDFs stored once per SHA-256 (opened in main()); the manifest records the articles
+PDF_STORE = PdfStore()
+MANIFEST = CrawlManifest()
+
+# DOI/PMID/PMCID/open access URL lookups in local dumps (main() maps the index when it exists)
+OPEN_ACCESS = OaIndex()
 
-def sanitize_filename(filename):
-    """Create a safe filename from article title."""
-    # Remove or replace invalid characters
-    filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
-    filename = re.sub(r'\s+', '_', filename)
-    filename = filename[:200]  # Limit length
-    return filename
+# Title-to-DOI matching in a local Crossref dump (main() matches the citations without a DOI up front)
+CROSSREF = CrossrefIndex()
+RECOVERED_DOIS = {}  # article ID -> DOI matched in the Crossref index
 
-def download_from_doi(doi):
+# Semantic Scholar lookups, batched by DOI and memoised for the run
+SCHOLAR = SemanticScholar(SESSION, SEMANTIC_SCHOLAR_API)
+
+def download_from_doi(doi, session=None, templates=None):
     """Attempt to download PDF from DOI."""
+    session = session or SESSION
+    templates = templates or TEMPLATES
     try:
+        # A publisher we have seen before: build the PDF URL from the DOI alone
+        template_url = templates.doi_url(doi)
+        if template_url:
+            print(f"  Trying learned PDF URL: {template_url}")
+            pdf = download_pdf(template_url, session)
+            templates.record('doi', doi, bool(pdf))
+            if pdf:
+                return pdf
+        
         # Try direct DOI resolution
         doi_url = f"https://doi.org/{doi}"
         print(f"  Attempting DOI resolution: {doi_url}")
         
-        session = requests.Session()
-        session.headers.update(HEADERS)
+        # A known host only needs the redirect chain, not the landing page itself
+        landing_url = None
+        if templates.has_hosts():
+            landing = session.head(doi_url, allow_redirects=True, timeout=30)
+            if landing.status_code == 200:
+                landing_url = landing.url
+                template_url = templates.landing_url(landing_url)
+                if template_url:
+                    print(f"  Resolved to: {landing_url}, trying learned PDF URL: {template_url}")
+                    pdf = download_pdf(template_url, session)
+                    templates.record('host', landing_url, bool(pdf))
+                    if pdf:
+                        return pdf
         
-        # Follow redirects to get the actual publisher page
-        response = session.get(doi_url, allow_redirects=True, timeout=30)
-        
-        if response.status_code == 200:
+        # Follow redirects to get the actual publisher page, reading only as much of it as needed
+        with session.get(landing_url or doi_url, allow_redirects=True, stream=True, timeout=30) as response:
+            if response.status_code != 200:
+                return None
             final_url = response.url
             print(f"  Resolved to: {final_url}")
             
-            # Try to find PDF link on the page
-            if 'pdf' in final_url.lower() or final_url.endswith('.pdf'):
-                return download_pdf(final_url, session)
-            
-            # Try common PDF URL patterns
-            pdf_urls = [
-                final_url.replace('/article/', '/article/pdf/'),
-                final_url.replace('/abs/', '/pdf/'),
-                final_url + '.pdf',
-                final_url.replace('/full/', '/pdf/'),
-            ]
-            
-            for pdf_url in pdf_urls:
-                try:
-                    pdf_response = session.head(pdf_url, timeout=10)
-                    if pdf_response.status_code == 200 and 'pdf' in pdf_response.headers.get('content-type', '').lower():
-                        return download_pdf(pdf_url, session)
-                except:
-                    continue
-            
-            # Try to extract PDF link from HTML
-            if HAS_BS4:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                # Look for PDF links
-                pdf_links = soup.find_all('a', href=re.compile(r'\.pdf|pdf', re.I))
-                for link in pdf_links:
-                    href = link.get('href', '')
-                    if href:
-                        if not href.startswith('http'):
-                            href = requests.compat.urljoin(final_url, href)
-                        try:
-                            return download_pdf(href, session)
-                        except:
-                            continue
+            # Try to find PDF link on the page (a URL that looks like a PDF is downloaded as is)
+            is_pdf_url = 'pdf' in final_url.lower() or final_url.endswith('.pdf')
+            links = None if is_pdf_url else sniff_pdf_links(response)
+        
+        if is_pdf_url:
+            return download_pdf(final_url, session)
+        
+        # The publisher's own citation_pdf_url is nearly always right
+        for url in links.confident:
+            pdf = download_pdf(url, session)
+            if pdf:
+                templates.learn(doi, final_url, pdf.url)
+                return pdf
+        
+        # Common PDF URL patterns, then the PDF-looking links of the page
+        pdf_urls = [
+            final_url.replace('/article/', '/article/pdf/'),
+            final_url.replace('/abs/', '/pdf/'),
+            final_url + '.pdf',
+            final_url.replace('/full/', '/pdf/'),
+        ]
+        candidates = [lambda cancel, url=url: probe_pdf(url, session, cancel)
+                      for url in dict.fromkeys(pdf_urls) if url != final_url]
+        candidates += [lambda cancel, url=href: download_pdf(url, session, cancel)
+                       for href in links.anchors if href not in pdf_urls and href not in links.confident]
+        
+        # Try all candidates side by side; the first real PDF wins and the rest are dropped
+        pdf = race(candidates, discard=lambda loser: loser.discard())
+        if pdf:
+            # Remember how this publisher builds its PDF URLs
+            templates.learn(doi, final_url, pdf.url)
+            return pdf
         
         return None
     except Exception as e:
         print(f"  Error downloading from DOI: {e}")
         return None
 
-def download_from_pubmed(pubmed_id):
+def download_from_pubmed(pubmed_id, pmcid=None, session=None, in_pmc=False):
     """Attempt to download from PubMed Central if available."""
+    session = session or SESSION
     try:
+        # The local index already knows the article is in PMC: no need to probe
+        if pmcid and in_pmc:
+            pdf = download_pdf(f"https://www.ncbi.nlm.nih.gov/pmc/articles/{pmcid}/pdf/", session)
+            if pdf:
+                return pdf
         # Check if paper is in PubMed Central (open access)
-        pmc_url = f"https://www.ncbi.nlm.nih.gov/pmc/articles/PMC{pubmed_id}/"
-        session = requests.Session()
-        session.headers.update(HEADERS)
+        elif pmcid:
+            pmc_url = f"https://www.ncbi.nlm.nih.gov/pmc/articles/{pmcid}/"
+            response = session.get(pmc_url, timeout=30)
+            if response.status_code == 200:
+                # Try to get PDF
+                pdf_url = f"https://www.ncbi.nlm.nih.gov/pmc/articles/{pmcid}/pdf/"
+                pdf_response = session.head(pdf_url, timeout=10)
+                if pdf_response.status_code == 200:
+                    return download_pdf(pdf_url, session)
         
-        response = session.get(pmc_url, timeout=30)
-        if response.status_code == 200:
-            # Try to get PDF
-            pdf_url = f"https://www.ncbi.nlm.nih.gov/pmc/articles/PMC{pubmed_id}/pdf/"
-            pdf_response = session.head(pdf_url, timeout=10)
-            if pdf_response.status_code == 200:
-                return download_pdf(pdf_url, session)
+        if not pubmed_id:
+            return None
         
         # Try regular PubMed
         pubmed_url = f"https://pubmed.ncbi.nlm.nih.gov/{pubmed_id}/"
-        response = session.get(pubmed_url, timeout=30)
-        if response.status_code == 200 and HAS_BS4:
-            soup = BeautifulSoup(response.text, 'html.parser')
+        with session.get(pubmed_url, stream=True, timeout=30) as response:
+            if response.status_code != 200:
+                return None
             # Look for full text links
-            fulltext_links = soup.find_all('a', string=re.compile(r'full.?text|pdf', re.I))
-            for link in fulltext_links:
-                href = link.get('href', '')
-                if href and 'pdf' in href.lower():
-                    if not href.startswith('http'):
-                        href = requests.compat.urljoin(pubmed_url, href)
-                    return download_pdf(href, session)
-        
-        return None
+            links = sniff_pdf_links(response)
+        candidates = [lambda cancel, url=url: download_pdf(url, session, cancel)
+                      for url in links.confident + links.anchors]
+        return race(candidates, discard=lambda loser: loser.discard())
     except Exception as e:
         print(f"  Error downloading from PubMed: {e}")
         return None
 
-def download_pdf(url, session=None):
-    """Download PDF from URL."""
+def probe_pdf(url, session=None, cancel=None):
+    """Download url if a HEAD request says it is a PDF."""
+    session = session or SESSION
     try:
-        if session is None:
-            session = requests.Session()
-            session.headers.update(HEADERS)
-        
-        response = session.get(url, stream=True, timeout=30)
-        if response.status_code == 200:
-            content_type = response.headers.get('content-type', '').lower()
-            if 'pdf' in content_type:
-                return response.content
-            # Sometimes PDFs are served with wrong content-type
-            if len(response.content) > 1000:  # Reasonable size for PDF
-                return response.content
+        response = session.head(url, timeout=10)
+    except requests.RequestException:
+        return None
+    if response.status_code == 200 and 'pdf' in response.headers.get('content-type', '').lower():
+        return download_pdf(url, session, cancel)
+    return None
+
+def download_pdf(url, session=None, cancel=None):
+    """Stream a PDF from URL to a temporary file; returns a StreamedPdf or None."""
+    session = session or SESSION
+    if cancel is not None and cancel.is_set():
+        return None
+    try:
+        # Closing the response hands its connection back to the pool even when the body is not read
+        with session.get(url, stream=True, timeout=30) as response:
+            if response.status_code == 200:
+                # The content-type is often wrong, so the first bytes decide
+                return stream_pdf(response, PDF_TEMP_DIR, cancel=cancel)
+        return None
+    except PdfRejected as e:
+        if cancel is None or not cancel.is_set():
+            print(f"    Skipped {url}: {e}")
         return None
     except Exception as e:
         print(f"    Error downloading PDF: {e}")
         return None
 
-def download_from_semantic_scholar(title, authors):
+def download_from_semantic_scholar(title, authors, session=None, doi=None, scholar=None):
     """Attempt to download from Semantic Scholar (for open access papers)."""
+    session = session or SESSION
+    scholar = scholar or SCHOLAR
     try:
-        # Search Semantic Scholar API
-        search_query = f"{title} {authors}".strip()
-        api_url = "https://api.semanticscholar.org/graph/v1/paper/search"
-        
-        params = {
-            'query': search_query[:100],  # Limit query length
-            'limit': 1
-        }
-        
-        session = requests.Session()
-        session.headers.update({'User-Agent': HEADERS['User-Agent']})
-        
-        response = session.get(api_url, params=params, timeout=30)
-        if response.status_code == 200:
-            data = response.json()
-            if data.get('data') and len(data['data']) > 0:
-                paper = data['data'][0]
-                # Check if open access PDF is available
-                if 'openAccessPdf' in paper and paper['openAccessPdf']:
-                    pdf_url = paper['openAccessPdf'].get('url')
-                    if pdf_url:
-                        print(f"  Found open access PDF on Semantic Scholar")
-                        return download_pdf(pdf_url, session)
+        # DOI lookups were batched up front in main(); a title search is the fallback
+        paper = scholar.paper(doi, title)
+        pdf_url = open_access_pdf(paper)
+        if pdf_url:
+            print("  Found open access PDF on Semantic Scholar")
+            return download_pdf(pdf_url, session)
         return None
     except Exception as e:
         print(f"  Error searching Semantic Scholar: {e}")
         return None
 
-def save_article_metadata(row, output_dir):
-    """Save article metadata as JSON."""
-    metadata_file = os.path.join(output_dir, f"{sanitize_filename(row.get('title', 'unknown'))}_metadata.json")
-    with open(metadata_file, 'w', encoding='utf-8') as f:
-        json.dump(row, f, indent=2, ensure_ascii=False)
-    return metadata_file
+def manifest_entry(row, key, identifiers, outcome, source=None, sha256=None, size=None, url=None):
+    """Build the crawl manifest record of an article."""
+    return {
+        'article_id': key,
+        'outcome': outcome,
+        'source': source,
+        'sha256': sha256,
+        'size': size,
+        'url': url,
+        'doi': identifiers.doi,
+        'pmid': identifiers.pmid,
+        'pmcid': identifiers.pmcid,
+        'arxiv': identifiers.arxiv,
+        'title': row.get('title', ''),
+        'metadata': dict(row),
+    }
 
-def process_article(row, output_dir):
-    """Process a single article and attempt to download full text."""
+def process_article(row, session=None, store=None, manifest=None, oa_index=None, recovered_dois=None):
+    """Process a single article and return the source it was downloaded from (None if unavailable)."""
+    session = session or SESSION
+    oa_index = oa_index or OPEN_ACCESS
+    recovered_dois = RECOVERED_DOIS if recovered_dois is None else recovered_dois
+    store = store or PDF_STORE
+    manifest = manifest or MANIFEST
     title = row.get('title', 'Unknown Title')
     authors = row.get('authors', '')
     citation = row.get('full_citation', '')
@@ -236,126 +298,201 @@ def process_article(row, output_dir):
     print(f"  Authors: {authors[:60]}...")
     print(f"  Journal: {journal}, Year: {year}")
     
-    # Create safe filename
-    safe_title = sanitize_filename(title or f"{authors}_{year}")
-    if not safe_title or safe_title == 'Unknown_Title':
-        safe_title = f"article_{hash(citation) % 10000}"
+    key = article_id(row)
+    source = None  # fetch path that delivered the PDF
+    
+    # One scan finds every identifier in the citation
+    identifiers = scan_identifiers(citation)
+    if not identifiers.doi and key in recovered_dois:
+        identifiers = identifiers._replace(doi=recovered_dois[key])
+        print(f"  DOI matched by title (local Crossref index): {identifiers.doi}")
     
-    downloaded = False
+    # The local index fills in missing identifiers and knows open access copies, without any request
+    local = oa_index.resolve(identifiers.doi, identifiers.pmid, identifiers.pmcid)
+    if local:
+        identifiers = identifiers._replace(doi=identifiers.doi or local.doi, pmid=identifiers.pmid or local.pmid,
+                                           pmcid=identifiers.pmcid or local.pmcid)
+    pubmed_id = identifiers.pmid
+    doi = identifiers.doi
     
-    # Try DOI first
-    doi = extract_doi(citation)
-    if doi:
+    # The same article may already be stored, e.g. under another citation with the same DOI
+    stored = manifest.find(article_id=key)
+    if not (stored and stored.get('sha256')):
+        stored = manifest.find(doi=doi)
+    if stored and stored.get('sha256'):
+        print(f"  ✓ Already stored: {store.blob_path(stored['sha256'])}")
+        if stored['article_id'] != key:
+            manifest.append(manifest_entry(row, key, identifiers, LINKED, stored['source'],
+                                           stored['sha256'], stored['size'], stored['url']))
+        return stored['source']
+    
+    # Try the open access copy known to the local index first
+    pdf = None
+    if local and local.oa_url:
+        print(f"  Open access copy (local index): {local.oa_url}")
+        pdf = download_pdf(local.oa_url, session)
+        if pdf:
+            source = 'open_access_index'
+    
+    # Then the DOI
+    if doi and not source:
         print(f"  Found DOI: {doi}")
-        pdf_content = download_from_doi(doi)
-        if pdf_content:
-            pdf_file = os.path.join(output_dir, f"{safe_title}.pdf")
-            with open(pdf_file, 'wb') as f:
-                f.write(pdf_content)
-            print(f"  ✓ Downloaded PDF: {pdf_file}")
-            downloaded = True
-            time.sleep(DELAY_BETWEEN_REQUESTS)
+        pdf = download_from_doi(doi, session)
+        if pdf:
+            source = 'doi'
     
     # Try PubMed if not downloaded
-    if not downloaded:
-        pubmed_id = extract_pubmed_id(citation)
-        if pubmed_id:
-            print(f"  Found PubMed ID: {pubmed_id}")
-            pdf_content = download_from_pubmed(pubmed_id)
-            if pdf_content:
-                pdf_file = os.path.join(output_dir, f"{safe_title}.pdf")
-                with open(pdf_file, 'wb') as f:
-                    f.write(pdf_content)
-                print(f"  ✓ Downloaded PDF: {pdf_file}")
-                downloaded = True
-                time.sleep(DELAY_BETWEEN_REQUESTS)
+    if not source:
+        if pubmed_id or identifiers.pmcid:
+            print(f"  Found PubMed ID: {pubmed_id}, PMC ID: {identifiers.pmcid}")
+            in_pmc = bool(local and local.pmcid)
+            pdf = download_from_pubmed(pubmed_id, identifiers.pmcid, session, in_pmc)
+            if pdf:
+                source = 'pubmed'
     
     # Try Semantic Scholar for open access
-    if not downloaded and title:
-        print(f"  Searching Semantic Scholar...")
-        pdf_content = download_from_semantic_scholar(title, authors)
-        if pdf_content:
-            pdf_file = os.path.join(output_dir, f"{safe_title}.pdf")
-            with open(pdf_file, 'wb') as f:
-                f.write(pdf_content)
-            print(f"  ✓ Downloaded PDF from Semantic Scholar: {pdf_file}")
-            downloaded = True
-            time.sleep(DELAY_BETWEEN_REQUESTS)
-    
-    # Save metadata regardless
-    save_article_metadata(row, output_dir)
+    if not source and title:
+        print("  Searching Semantic Scholar...")
+        pdf = download_from_semantic_scholar(title, authors, session, doi)
+        if pdf:
+            source = 'semantic_scholar'
     
-    if not downloaded:
-        print(f"  ✗ Could not download full text (may be behind paywall or not available)")
-        # Save citation info as text file
-        citation_file = os.path.join(output_dir, f"{safe_title}_citation.txt")
-        with open(citation_file, 'w', encoding='utf-8') as f:
-            f.write(f"Title: {title}\n")
-            f.write(f"Authors: {authors}\n")
-            f.write(f"Journal: {journal}\n")
-            f.write(f"Year: {year}\n")
-            f.write(f"\nFull Citation:\n{citation}\n")
-            if doi:
-                f.write(f"\nDOI: {doi}\n")
-            if pubmed_id:
-                f.write(f"PubMed ID: {pubmed_id}\n")
-        print(f"  ✓ Saved citation info: {citation_file}")
+    # One manifest line per article, downloaded or not
+    if source:
+        pdf_file = store.put(pdf)
+        print(f"  ✓ Downloaded PDF from {source}: {pdf_file}")
+        manifest.append(manifest_entry(row, key, identifiers, DOWNLOADED, source, pdf.sha256, pdf.size, pdf.url))
+    else:
+        print("  ✗ Could not download full text (may be behind paywall or not available)")
+        manifest.append(manifest_entry(row, key, identifiers, UNAVAILABLE))
     
-    return downloaded
+    return source
+
+def load_articles(path):
+    """Read the review table: CSV, or Parquet with only INPUT_COLUMNS loaded."""
+    if path.endswith('.parquet'):
+        if not HAS_PYARROW:
+            raise ImportError("Reading Parquet needs pyarrow. Install with: pip install pyarrow")
+        rows = pq.read_table(path, columns=INPUT_COLUMNS).to_pylist()
+        # Same string values as the CSV reader, so the rest of the pipeline is unchanged
+        return [{key: '' if value is None else str(value) for key, value in row.items()} for row in rows]
+
+    with open(path, 'r', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+def fetch_article(row):
+    """Job worker: process an article, raising TransientError when it may succeed on a retry."""
+    SESSION.reset_transient()
+    source = process_article(row)
+    errors = SESSION.transient_errors()
+    if not source and errors:
+        raise TransientError('; '.join(errors[-3:]), SESSION.transient_retry_after())
+    return source
 
 def main():
     """Main function to process all articles."""
     print("=" * 80)
     print("Review Article Full Text Downloader")
     print("=" * 80)
+    if OFFLINE:
+        print("Offline replay: answering from the HTTP cache only")
     
     # Create output directory
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     print(f"Output directory: {OUTPUT_DIR}")
+    # Partial downloads of an interrupted run are useless; their jobs are retried
+    for partial in Path(PDF_TEMP_DIR).glob('*.part'):
+        partial.unlink()
+    SESSION.cache = HttpCache(HTTP_CACHE, offline=OFFLINE)
+    TEMPLATES.load(URL_TEMPLATES)
+    PDF_STORE.open(OUTPUT_DIR)
+    if os.path.exists(OA_INDEX):
+        OPEN_ACCESS.open(OA_INDEX)
+        print(f"Open access index: {OA_INDEX}")
+    MANIFEST.open(os.path.join(OUTPUT_DIR, 'manifest.jsonl'))
+    jobs = JobStore(JOB_DB)
     
     # Read CSV file
-    print(f"\nReading CSV file: {INPUT_CSV}")
+    print(f"\nReading review table: {INPUT_CSV}")
     articles = []
     try:
-        with open(INPUT_CSV, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            articles = list(reader)
+        articles = load_articles(INPUT_CSV)
         print(f"Found {len(articles)} articles to process")
     except Exception as e:
-        print(f"Error reading CSV: {e}")
+        print(f"Error reading review table: {e}")
         return
     
-    # Process each article
-    downloaded_count = 0
-    failed_count = 0
+    # Queue new articles; finished ones from earlier runs are not fetched again
+    added = jobs.add(articles)
+    jobs.release_leases()  # leases of an interrupted run
+    print(f"Queued {added} new articles, job table: {jobs.counts()}")
     
-    for i, row in enumerate(articles, 1):
-        print(f"\n{'='*80}")
-        print(f"Article {i}/{len(articles)}")
-        print(f"{'='*80}")
-        
-        try:
-            if process_article(row, OUTPUT_DIR):
-                downloaded_count += 1
-            else:
-                failed_count += 1
-        except Exception as e:
-            print(f"  ✗ Error processing article: {e}")
-            failed_count += 1
-        
-        # Be respectful with rate limiting
-        if i < len(articles):
-            time.sleep(DELAY_BETWEEN_REQUESTS)
+    # Citations without a DOI are matched to one by title, year and journal, all in one pass
+    dois = scan_citations(row.get('full_citation', '') for row in articles)['doi']
+    if os.path.exists(CROSSREF_INDEX):
+        CROSSREF.open(CROSSREF_INDEX)
+        missing = [row for row, doi in zip(articles, dois) if doi is None]
+        references = [parse_reference(row.get('full_citation', ''), row.get('title', ''), row.get('journal', ''),
+                                      row.get('year', '')) for row in missing]
+        for row, match in zip(missing, CROSSREF.match(references)):
+            if match:
+                RECOVERED_DOIS[article_id(row)] = match.doi
+        print(f"Matched {len(RECOVERED_DOIS)} of {len(missing)} citations without a DOI in {CROSSREF_INDEX}")
+        dois = dois + list(RECOVERED_DOIS.values())
+    
+    # One paper/batch request per 500 DOIs instead of one search per article
+    try:
+        batches = SCHOLAR.prefetch(dois)
+        print(f"Looked up {sum(doi is not None for doi in dois)} DOIs on Semantic Scholar in {batches} batch requests")
+    except Exception as e:
+        print(f"Semantic Scholar batch lookup failed, falling back to single lookups: {e}")
+    
+    # Process articles concurrently; pacing is per host, so no global sleeps are needed
+    print(f"Crawling with up to {MAX_CONCURRENCY} articles in flight")
+    try:
+        asyncio.run(work_jobs(jobs, fetch_article, MAX_CONCURRENCY))
+    except KeyboardInterrupt:
+        print("\nInterrupted; run again to resume")
+    TEMPLATES.close()  # hit and miss counts are saved in batches
+    
+    # Stored PDFs become markdown for the analyses; PDFs converted in earlier runs come from the text cache
+    text_stats = None
+    if HAS_PYMUPDF or HAS_PYPDF:
+        pdfs = directory_sources(OUTPUT_DIR) + manifest_sources(MANIFEST, PDF_STORE)
+        text_stats = convert_pdfs(pdfs, os.path.join(OUTPUT_DIR, TEXT_CACHE_DIR), TEXT_DIR)
+    else:
+        print("PDF text extraction skipped: pip install pymupdf (or pypdf) to convert the PDFs")
+    
+    counts = jobs.counts()
+    sources = jobs.sources()
     
     # Summary
     print(f"\n{'='*80}")
     print("SUMMARY")
     print(f"{'='*80}")
-    print(f"Total articles: {len(articles)}")
-    print(f"Successfully downloaded: {downloaded_count}")
-    print(f"Not available/failed: {failed_count}")
+    print(f"Total articles: {sum(counts.values())}")
+    print(f"Successfully downloaded: {counts.get('done', 0) - sources.get('unavailable', 0)} {sources}")
+    print(f"Not available: {sources.get('unavailable', 0)}")
+    print(f"Failed after retries: {counts.get('failed', 0)}")
+    print(f"Still queued: {counts.get('pending', 0) + counts.get('leased', 0)}")
+    print(THROTTLE.report())
+    print(SESSION.breaker.report())
+    print(SESSION.pool_stats.report())
+    print(SESSION.cache.report())
+    print(TEMPLATES.report())
+    print(PDF_STORE.report())
+    print(SCHOLAR.report())
+    print(OPEN_ACCESS.report())
+    print(CROSSREF.report())
+    if text_stats:
+        print(text_report(text_stats))
+    CROSSREF.close()
+    OPEN_ACCESS.close()
+    print(f"Manifest: {MANIFEST.path} {MANIFEST.counts()}")
+    MANIFEST.close()
+    SESSION.cache.close()
+    jobs.close()
     print(f"\nOutput directory: {OUTPUT_DIR}")
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Persistent HTTP response cache for the crawler.
+
+Responses are indexed in SQLite by method and full URL (query parameters
+included) and their bodies are stored once per SHA-256 under ``body_dir``, so
+identical landing pages reached through different URLs share one file.
+Cache-Control and Expires decide how long an entry is fresh. A stale entry is
+revalidated with If-None-Match / If-Modified-Since, and a 304 answer is served
+from disk. Redirect hops (doi.org -> publisher) are cached one by one, so a
+re-crawl of an unchanged reference list turns into local hits and 304s.
+
+In offline mode nothing is sent: cached entries are replayed whatever their
+age, and uncached requests fail with a ConnectionError.
+
+Bodies of streamed requests (``stream=True``: PDF downloads and sniffed
+landing pages) are not stored, since they are rarely read to the end, but
+their redirect hops are, and a stored copy answers a streamed request too.
+"""
+
+import email.utils
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+DEFAULT_TTL = 24 * 3600   # seconds a response without Cache-Control/Expires is fresh
+CACHED_METHODS = ('GET', 'HEAD')
+CACHED_STATUSES = {200, 203, 300, 301, 302, 303, 307, 308, 404, 410}
+
+# Headers that describe the encoded transfer, not the decoded body we store
+DROPPED_HEADERS = ('content-encoding', 'transfer-encoding', 'content-length')
+
+
+def _cache_control(headers):
+    """Parse a Cache-Control header into a dictionary of lowercase directives."""
+    directives = {}
+    for part in headers.get('cache-control', '').split(','):
+        name, _, value = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = value.strip('"')
+    return directives
+
+
+def _expires_at(headers, now, default_ttl):
+    """Return the time until which a response is fresh (now when it must be revalidated)."""
+    directives = _cache_control(headers)
+    if 'no-cache' in directives:
+        return now
+    for name in ('s-maxage', 'max-age'):
+        if directives.get(name, '').isdigit():
+            return now + int(directives[name])
+    if headers.get('expires'):
+        try:
+            return email.utils.parsedate_to_datetime(headers['expires']).timestamp()
+        except (TypeError, ValueError):
+            return now  # an invalid Expires means already expired
+    return now + default_ttl
+
+
+class HttpCache:
+    """
+    SQLite index of cached responses with content-addressed bodies on disk.
+
+    Args:
+        path: SQLite database file
+        body_dir: Directory for the response bodies (defaults to ``<path>.bodies``)
+        default_ttl: Freshness of responses that carry no Cache-Control/Expires
+        offline: Replay cached responses only, never touching the network
+    """
+
+    def __init__(self, path, body_dir=None, default_ttl=DEFAULT_TTL, offline=False):
+        self.path = path
+        self.body_dir = body_dir or path + '.bodies'
+        self.default_ttl = default_ttl
+        self.offline = offline
+        self.stats = {'fresh': 0, 'revalidated': 0, 'fetched': 0, 'uncacheable': 0}
+        self.lock = threading.Lock()
+
+        os.makedirs(self.body_dir, exist_ok=True)
+        # Shared by the crawl's worker threads; every use holds self.lock
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                method TEXT NOT NULL,
+                url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                reason TEXT,
+                headers TEXT NOT NULL,
+                body_hash TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            );
+        """)
+
+    @staticmethod
+    def key(method, url, body=None):
+        """Return the cache key of a request."""
+        digest = hashlib.sha256(f"{method.upper()} {url}".encode('utf-8'))
+        if body:
+            digest.update(body if isinstance(body, bytes) else body.encode('utf-8'))
+        return digest.hexdigest()
+
+    def _body_path(self, body_hash):
+        return os.path.join(self.body_dir, body_hash[:2], body_hash)
+
+    def _write_body(self, content):
+        """Store a body once per content hash and return the hash."""
+        body_hash = hashlib.sha256(content).hexdigest()
+        path = self._body_path(body_hash)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp, 'wb') as f:
+                f.write(content)
+            os.replace(temp, path)
+        return body_hash
+
+    def lookup(self, key):
+        """Return the stored entry for a key as a dictionary, or None."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT method, url, status, reason, headers, body_hash, stored_at, expires_at "
+                "FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        names = ('method', 'url', 'status', 'reason', 'headers', 'body_hash', 'stored_at', 'expires_at')
+        entry = dict(zip(names, row))
+        # Header names keep the case the server sent, so look them up case-insensitively
+        entry['headers'] = CaseInsensitiveDict(json.loads(entry['headers']))
+        return entry
+
+    def store(self, key, response):
+        """Store a response unless its status or Cache-Control forbids it."""
+        if response.status_code not in CACHED_STATUSES or 'no-store' in _cache_control(response.headers):
+            self.count('uncacheable')
+            return
+        now = time.time()
+        headers = {name: value for name, value in response.headers.items() if name.lower() not in DROPPED_HEADERS}
+        body_hash = self._write_body(response.content)
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, response.request.method, response.url, response.status_code, response.reason,
+                 json.dumps(headers), body_hash, now, _expires_at(response.headers, now, self.default_ttl)),
+            )
+            self.conn.commit()
+
+    def refresh(self, key, not_modified):
+        """Extend an entry after a 304 answer, taking its updated caching headers."""
+        now = time.time()
+        with self.lock:
+            self.conn.execute("UPDATE responses SET stored_at = ?, expires_at = ? WHERE key = ?",
+                              (now, _expires_at(not_modified.headers, now, self.default_ttl), key))
+            self.conn.commit()
+
+    def count(self, outcome):
+        """Count how a request was served (the cache is shared by the session pool's threads)."""
+        with self.lock:
+            self.stats[outcome] += 1
+
+    def build_response(self, entry, request):
+        """Rebuild a requests.Response from a stored entry."""
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.reason = entry['reason']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.url = entry['url']
+        response.request = request
+        response.encoding = get_encoding_from_headers(response.headers)
+        with open(self._body_path(entry['body_hash']), 'rb') as f:
+            response._content = f.read()
+        response._content_consumed = True  # iter_content() then serves the stored body
+        response.from_cache = True
+        return response
+
+    def report(self):
+        """Return a one-line summary of how requests were served."""
+        stats = self.stats
+        return (f"HTTP cache: {stats['fresh']} fresh hits, {stats['revalidated']} revalidated (304), "
+                f"{stats['fetched']} fetched, {stats['uncacheable']} not cacheable")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class CachingSessionMixin:
+    """
+    Session mixin that answers GET/HEAD requests from an HttpCache.
+
+    Put it before the session class in the bases (e.g. ``class S(CachingSessionMixin,
+    ThrottledSession)``) so fresh hits skip throttling and the network entirely.
+    """
+
+    def __init__(self, *args, cache=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache = cache
+
+    def send(self, request, **kwargs):
+        cache = self.cache
+        if cache is None or request.method not in CACHED_METHODS:
+            if cache is not None and cache.offline:
+                raise requests.ConnectionError(f"Offline replay: {request.method} {request.url} is not cached")
+            return super().send(request, **kwargs)
+
+        allow_redirects = kwargs.pop('allow_redirects', True)
+        key = cache.key(request.method, request.url, request.body)
+        entry = cache.lookup(key)
+
+        if entry is not None and (cache.offline or entry['expires_at'] > time.time()):
+            cache.count('fresh')
+            response = cache.build_response(entry, request)
+        elif cache.offline:
+            raise requests.ConnectionError(f"Offline replay: {request.method} {request.url} is not cached")
+        else:
+            if entry is not None:
+                # Ask the server whether our copy is still current
+                request = request.copy()
+                if entry['headers'].get('ETag'):
+                    request.headers['If-None-Match'] = entry['headers']['ETag']
+                if entry['headers'].get('Last-Modified'):
+                    request.headers['If-Modified-Since'] = entry['headers']['Last-Modified']
+            response = super().send(request, allow_redirects=False, **kwargs)
+            if response.status_code == 304 and entry is not None:
+                cache.count('revalidated')
+                cache.refresh(key, response)
+                response = cache.build_response(entry, request)
+            else:
+                cache.count('fetched')
+                if not kwargs.get('stream') or response.is_redirect:
+                    cache.store(key, response)
+
+        if allow_redirects and response.is_redirect:
+            # Follow the hops through send() so each one is cached too, as Session.send would
+            history = [response] + list(self.resolve_redirects(response, request, **kwargs))
+            response = history.pop()
+            response.history = history
+        return response
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Process-wide pooled HTTP session for the crawler.
+
+One session is shared by every fetch path, so connections to doi.org, PubMed,
+Semantic Scholar and the publishers are kept alive and reused instead of
+paying a new TCP and TLS handshake per article. Connection pools are kept for
+``pool_hosts`` hosts with up to ``pool_per_host`` connections each (enough for
+every concurrent article to hold one). Responses are decoded from gzip and
+deflate, and from brotli when the brotli package is installed.
+
+``PoolStats`` counts requests and newly opened connections, so a run can
+report how many handshakes the pool saved.
+"""
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# brotli is optional: urllib3 decodes "br" responses only when it is installed
+try:
+    import brotli  # noqa: F401
+    HAS_BROTLI = True
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        HAS_BROTLI = True
+    except ImportError:
+        HAS_BROTLI = False
+
+POOL_HOSTS = 32     # hosts whose connection pools are kept
+POOL_PER_HOST = 8   # keep-alive connections kept per host
+
+ACCEPT_ENCODING = 'gzip, deflate, br' if HAS_BROTLI else 'gzip, deflate'
+
+
+class PoolStats:
+    """Thread-safe counters of requests sent and connections opened."""
+
+    def __init__(self):
+        self.requests = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+
+    def count_request(self):
+        with self.lock:
+            self.requests += 1
+
+    def count_connection(self):
+        with self.lock:
+            self.connections += 1
+
+    def report(self):
+        """Return a one-line summary of connection reuse."""
+        reused = max(self.requests - self.connections, 0)
+        rate = reused / self.requests if self.requests else 0.0
+        return (f"HTTP pool: {self.requests} requests over {self.connections} connections, "
+                f"{reused} handshakes saved (hit rate {rate:.0%})")
+
+
+def _counting_pool(pool_class, stats):
+    """Return a subclass of a urllib3 pool class that counts new connections."""
+
+    class CountingPool(pool_class):
+        def _new_conn(self):
+            stats.count_connection()
+            return super()._new_conn()
+
+    return CountingPool
+
+
+class PooledAdapter(HTTPAdapter):
+    """HTTPAdapter with sized pools that records requests and new connections in a PoolStats."""
+
+    def __init__(self, stats, pool_hosts=POOL_HOSTS, pool_per_host=POOL_PER_HOST, **kwargs):
+        self.stats = stats
+        super().__init__(pool_connections=pool_hosts, pool_maxsize=pool_per_host, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _counting_pool(HTTPConnectionPool, self.stats),
+            'https': _counting_pool(HTTPSConnectionPool, self.stats),
+        }
+
+    def send(self, request, **kwargs):
+        self.stats.count_request()
+        return super().send(request, **kwargs)
+
+
+def create_session(headers=None, session_class=requests.Session, pool_hosts=POOL_HOSTS,
+                   pool_per_host=POOL_PER_HOST, **session_kwargs):
+    """
+    Create a keep-alive session with sized, counted connection pools.
+
+    Args:
+        headers: Default headers; Accept-Encoding is set to the encodings we can decode
+        session_class: requests.Session subclass to instantiate (e.g. a ThrottledSession)
+        pool_hosts: Number of hosts whose pools are kept
+        pool_per_host: Keep-alive connections kept per host
+        session_kwargs: Passed to session_class
+
+    Returns:
+        Session with a ``pool_stats`` attribute (PoolStats)
+    """
+    session = session_class(**session_kwargs)
+    session.headers.update(headers or {})
+    session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+    session.pool_stats = PoolStats()
+    adapter = PooledAdapter(session.pool_stats, pool_hosts, pool_per_host)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
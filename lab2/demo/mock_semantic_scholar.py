@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Semantic Scholar Graph API, for tests and benchmarks.
+
+Serves the two endpoints the crawler uses, with the same request and
+response shapes:
+
+    POST /graph/v1/paper/batch?fields=...   {"ids": ["DOI:10.1038/...", ...]}
+    GET  /graph/v1/paper/search?query=...&limit=1&fields=...
+
+Papers are made up deterministically from the DOI or the query: about three
+DOIs in four are known, and about half of the papers have an open access
+PDF. ``--latency`` adds a delay per request to mimic the round trip to the
+real API.
+
+Usage:
+    python mock_semantic_scholar.py [--port 8765] [--latency 0.2]
+    python mock_semantic_scholar.py --benchmark [N]
+
+The benchmark starts the server in-process, looks up N synthetic articles
+once with one title search each (the old behaviour) and once through
+SemanticScholar's DOI batches, and prints requests and time for both.
+"""
+
+import hashlib
+import http.server
+import json
+import sys
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+DEFAULT_PORT = 8765
+MAX_BATCH = 500
+
+
+def _digest(text):
+    return int(hashlib.sha256(text.lower().encode('utf-8')).hexdigest()[:8], 16)
+
+
+def make_paper(doi=None, title=None):
+    """Return the made-up paper of a DOI or title (None for an unknown DOI)."""
+    key = doi or title
+    digest = _digest(key)
+    if doi and digest % 4 == 0:
+        return None
+    paper_id = hashlib.sha1(key.lower().encode('utf-8')).hexdigest()
+    open_access = digest % 2 == 0
+    return {
+        'paperId': paper_id,
+        'title': title or f"Paper {paper_id[:8]}",
+        'externalIds': {'DOI': doi} if doi else {},
+        'isOpenAccess': open_access,
+        'openAccessPdf': {'url': f"https://example.org/pdf/{paper_id}.pdf", 'status': 'GREEN'}
+                         if open_access else None,
+    }
+
+
+class MockHandler(http.server.BaseHTTPRequestHandler):
+    latency = 0.0
+    requests_served = 0
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _count(self):
+        type(self).requests_served += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def do_POST(self):
+        self._count()
+        if urlsplit(self.path).path != '/graph/v1/paper/batch':
+            return self._reply(404, {'error': 'Not found'})
+        length = int(self.headers.get('Content-Length', 0))
+        ids = json.loads(self.rfile.read(length) or b'{}').get('ids', [])
+        if len(ids) > MAX_BATCH:
+            return self._reply(400, {'error': f"At most {MAX_BATCH} ids per request"})
+        papers = [make_paper(doi=paper_id[4:]) if paper_id.upper().startswith('DOI:') else None
+                  for paper_id in ids]
+        self._reply(200, papers)
+
+    def do_GET(self):
+        self._count()
+        parts = urlsplit(self.path)
+        if parts.path != '/graph/v1/paper/search':
+            return self._reply(404, {'error': 'Not found'})
+        query = parse_qs(parts.query).get('query', [''])[0]
+        data = [make_paper(title=query)] if query else []
+        self._reply(200, {'total': len(data), 'offset': 0, 'data': data})
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(port=DEFAULT_PORT, latency=0.0, background=False):
+    """
+    Start the mock API.
+
+    Args:
+        port: Port to listen on (0 picks a free one)
+        latency: Seconds added to every request
+        background: Serve from a daemon thread and return the server
+
+    Returns:
+        The server when background is True (its base URL is
+        http://127.0.0.1:<server.server_port>/graph/v1)
+    """
+    MockHandler.latency = latency
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', port), MockHandler)
+    if background:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+    print(f"Mock Semantic Scholar API on http://127.0.0.1:{server.server_port}/graph/v1")
+    server.serve_forever()
+
+
+def _benchmark(count=2000, latency=0.02):
+    """Compare one title search per article with DOI batches against the mock API."""
+    import requests
+    from semantic_scholar import FIELDS, SemanticScholar
+
+    server = serve(0, latency, background=True)
+    api_url = f"http://127.0.0.1:{server.server_port}/graph/v1"
+    articles = [(f"10.{1000 + i % 50}/mock.{i}", f"Synthetic review title number {i}") for i in range(count)]
+    session = requests.Session()
+
+    start = time.perf_counter()
+    served = MockHandler.requests_served
+    for _, title in articles:
+        session.get(f"{api_url}/paper/search", params={'query': title[:100], 'limit': 1, 'fields': FIELDS})
+    print(f"Title search per article: {MockHandler.requests_served - served} requests, "
+          f"{time.perf_counter() - start:.2f} s")
+
+    start = time.perf_counter()
+    served = MockHandler.requests_served
+    client = SemanticScholar(session, api_url)
+    client.prefetch(doi for doi, _ in articles)
+    found = sum(client.paper(doi, title) is not None for doi, title in articles)
+    print(f"DOI batches + search fallback: {MockHandler.requests_served - served} requests, "
+          f"{time.perf_counter() - start:.2f} s, {found}/{count} papers found")
+    print(client.report())
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    if '--benchmark' in sys.argv:
+        rest = [arg for arg in sys.argv[1:] if arg != '--benchmark']
+        _benchmark(int(rest[0]) if rest else 2000)
+    else:
+        port = int(sys.argv[sys.argv.index('--port') + 1]) if '--port' in sys.argv else DEFAULT_PORT
+        latency = float(sys.argv[sys.argv.index('--latency') + 1]) if '--latency' in sys.argv else 0.0
+        serve(port, latency)
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Offline DOI / PMID / PMCID / open access URL index built from local dumps.
+
+The importer streams two bulk files:
+
+    PMC-ids.csv(.gz)       NCBI's mapping of every PMC article (DOI, PMCID, PMID)
+    Unpaywall JSONL(.gz)   snapshot lines with doi, is_oa and best_oa_location
+
+and merges them by DOI in a temporary SQLite file, so memory stays bounded
+however large the dumps are. The result is one compact file:
+
+    header   magic, slot count, offset of the records
+    slots    open-addressing hash table of (64-bit key hash, record offset)
+    records  one "doi<TAB>pmid<TAB>pmcid<TAB>oa_url" line per article
+
+Every record is reachable from its DOI, PMID and PMCID. ``OaIndex`` maps the
+file with mmap, so a lookup is a hash, a probe or two and one line read, in
+microseconds and without loading the index into memory.
+
+Usage:
+    python oa_index.py build <index> [--pmc-ids PMC-ids.csv.gz] [--unpaywall snapshot.jsonl.gz]
+    python oa_index.py lookup <index> <DOI | PMID | PMCID> ...
+"""
+
+import csv
+import gzip
+import hashlib
+import itertools
+import json
+import mmap
+import os
+import re
+import sqlite3
+import struct
+import sys
+import time
+from collections import namedtuple
+
+MAGIC = b'OAINDEX1'
+HEADER = struct.Struct('<8sQQ')   # magic, slot count, records offset
+SLOT = struct.Struct('<QQ')       # key hash (0 = empty), record offset
+BATCH = 10000                     # rows per SQLite executemany during the import
+
+OaRecord = namedtuple('OaRecord', ['doi', 'pmid', 'pmcid', 'oa_url'])
+
+
+def _open_text(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, 'r', encoding='utf-8', newline='')
+
+
+def _key_hash(field, value):
+    """Return the nonzero 64-bit hash of a namespaced key such as 'pmid:12345'."""
+    digest = hashlib.blake2b(f"{field}:{value}".encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little') or 1
+
+
+def normalise(field, value):
+    """Normalise an identifier the way the index stores it (None when empty)."""
+    value = (value or '').strip()
+    if not value:
+        return None
+    if field == 'doi':
+        return re.sub(r'^(?:https?://(?:dx\.)?doi\.org/|doi:)', '', value, flags=re.I).lower()
+    if field == 'pmcid':
+        value = value.upper()
+        return value if value.startswith('PMC') else f"PMC{value}"
+    return value
+
+
+def _pmc_rows(path):
+    """Yield (key, doi, pmid, pmcid, oa_url) from a PMC-ids.csv file."""
+    with _open_text(path) as f:
+        for row in csv.DictReader(f):
+            doi = normalise('doi', row.get('DOI'))
+            pmcid = normalise('pmcid', row.get('PMCID'))
+            pmid = normalise('pmid', row.get('PMID'))
+            key = doi or pmcid or (f"pmid:{pmid}" if pmid else None)
+            if key:
+                yield key, doi, pmid, pmcid, None
+
+
+def _unpaywall_rows(path):
+    """Yield (key, doi, pmid, pmcid, oa_url) for the open access DOIs of an Unpaywall snapshot."""
+    with _open_text(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            doi = normalise('doi', entry.get('doi'))
+            location = entry.get('best_oa_location') or {}
+            url = location.get('url_for_pdf') or location.get('url')
+            if doi and entry.get('is_oa') and url:
+                yield doi, doi, None, None, url
+
+
+def _stage(conn, rows):
+    """Merge rows into the staging table by key, keeping known values."""
+    insert = ("INSERT INTO records VALUES (?, ?, ?, ?, ?) ON CONFLICT(key) DO UPDATE SET "
+              "doi = COALESCE(excluded.doi, doi), pmid = COALESCE(excluded.pmid, pmid), "
+              "pmcid = COALESCE(excluded.pmcid, pmcid), oa_url = COALESCE(excluded.oa_url, oa_url)")
+    count = 0
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, BATCH))
+        if not batch:
+            return count
+        conn.executemany(insert, batch)
+        count += len(batch)
+
+
+def build_index(path, pmc_ids=None, unpaywall=None):
+    """
+    Build an index file from the local dumps.
+
+    Args:
+        path: Index file to write (replaced atomically when done)
+        pmc_ids: PMC-ids.csv or .csv.gz
+        unpaywall: Unpaywall JSONL or .jsonl.gz snapshot
+
+    Returns:
+        Number of records in the index
+    """
+    staging = path + '.staging.sqlite'
+    if os.path.exists(staging):
+        os.remove(staging)
+    conn = sqlite3.connect(staging)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("CREATE TABLE records (key TEXT PRIMARY KEY, doi TEXT, pmid TEXT, pmcid TEXT, oa_url TEXT) "
+                 "WITHOUT ROWID")
+    if pmc_ids:
+        print(f"Importing {pmc_ids}: {_stage(conn, _pmc_rows(pmc_ids)):,} rows")
+    if unpaywall:
+        print(f"Importing {unpaywall}: {_stage(conn, _unpaywall_rows(unpaywall)):,} open access DOIs")
+    conn.commit()
+
+    records, keys = conn.execute("SELECT COUNT(*), COUNT(doi) + COUNT(pmid) + COUNT(pmcid) FROM records").fetchone()
+    slots = 8
+    while slots < 2 * keys:  # load factor at most 1/2
+        slots *= 2
+    records_start = HEADER.size + slots * SLOT.size
+    mask = slots - 1
+
+    temp = path + '.tmp'
+    with open(temp, 'w+b') as f:
+        f.write(HEADER.pack(MAGIC, slots, records_start))
+        f.truncate(records_start)
+        table = mmap.mmap(f.fileno(), records_start)
+        f.seek(records_start)
+        offset = records_start
+        for record in conn.execute("SELECT doi, pmid, pmcid, oa_url FROM records"):
+            line = ('\t'.join(value or '' for value in record) + '\n').encode('utf-8')
+            f.write(line)
+            for field, value in zip(('doi', 'pmid', 'pmcid'), record):
+                if not value:
+                    continue
+                key_hash = _key_hash(field, value)
+                slot = key_hash & mask
+                while SLOT.unpack_from(table, HEADER.size + slot * SLOT.size)[0]:
+                    slot = (slot + 1) & mask
+                SLOT.pack_into(table, HEADER.size + slot * SLOT.size, key_hash, offset)
+            offset += len(line)
+        table.flush()
+        table.close()
+    os.replace(temp, path)
+    conn.close()
+    os.remove(staging)
+    return records
+
+
+class OaIndex:
+    """
+    Read-only, memory-mapped lookups in an index built by build_index.
+
+    Args:
+        path: Index file (None: call open() later; until then nothing resolves)
+    """
+
+    def __init__(self, path=None):
+        self.path = None
+        self.map = None
+        self.stats = {'hits': 0, 'misses': 0}
+        if path:
+            self.open(path)
+
+    def open(self, path):
+        """Map the index file at path."""
+        self.path = path
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.slots, self.records_start = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an open access index")
+        self.mask = self.slots - 1
+
+    def _record(self, offset):
+        end = self.map.find(b'\n', offset)
+        doi, pmid, pmcid, oa_url = self.map[offset:end].decode('utf-8').split('\t')
+        return OaRecord(doi or None, pmid or None, pmcid or None, oa_url or None)
+
+    def get(self, field, value):
+        """Return the record whose field ('doi', 'pmid' or 'pmcid') equals value, or None."""
+        value = normalise(field, value)
+        if value is None or self.map is None:
+            return None
+        key_hash = _key_hash(field, value)
+        slot = key_hash & self.mask
+        unpack_from, table, slot_size, header = SLOT.unpack_from, self.map, SLOT.size, HEADER.size
+        while True:
+            stored, offset = unpack_from(table, header + slot * slot_size)
+            if not stored:
+                return None
+            if stored == key_hash:
+                record = self._record(offset)
+                if getattr(record, field) == value:
+                    return record
+            slot = (slot + 1) & self.mask
+
+    def resolve(self, doi=None, pmid=None, pmcid=None):
+        """Return the record of the first identifier the index knows, or None."""
+        for field, value in (('doi', doi), ('pmcid', pmcid), ('pmid', pmid)):
+            record = self.get(field, value) if value else None
+            if record is not None:
+                self.stats['hits'] += 1
+                return record
+        self.stats['misses'] += 1
+        return None
+
+    def report(self):
+        return f"Open access index: {self.stats['hits']} articles resolved locally, {self.stats['misses']} unknown"
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.file.close()
+            self.map = None
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in ('build', 'lookup'):
+        print(__doc__)
+        sys.exit(1)
+    command, path, rest = sys.argv[1], sys.argv[2], sys.argv[3:]
+    if command == 'build':
+        options = dict(zip(rest[::2], rest[1::2]))
+        start = time.perf_counter()
+        records = build_index(path, options.get('--pmc-ids'), options.get('--unpaywall'))
+        print(f"Wrote {records:,} records to {path} in {time.perf_counter() - start:.1f} s")
+        return
+    index = OaIndex(path)
+    for key in rest:
+        field = 'pmcid' if key.upper().startswith('PMC') else 'pmid' if key.isdigit() else 'doi'
+        print(f"{key}: {index.get(field, key)}")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Content-addressed store for downloaded PDFs.
+
+Every PDF is stored once, under its SHA-256:
+
+    <root>/pdfs/<first two hex digits>/<sha256>.pdf
+
+so file names are deterministic, never depend on mis-parsed titles, and the
+same PDF fetched for two citations takes the space of one. Which article a
+PDF belongs to is recorded in the crawl manifest (see crawl_manifest.py),
+whose indexes answer lookups by article ID, DOI or title without listing a
+directory.
+"""
+
+import os
+import threading
+
+BLOB_DIR = 'pdfs'
+
+
+class PdfStore:
+    """
+    PDFs keyed by SHA-256.
+
+    Args:
+        root: Directory of the store (None: call open() later)
+    """
+
+    def __init__(self, root=None):
+        self.root = None
+        self.stats = {'stored': 0, 'deduplicated': 0}
+        self.lock = threading.Lock()
+        if root:
+            self.open(root)
+
+    def open(self, root):
+        """Use root as the store directory."""
+        self.root = root
+        os.makedirs(os.path.join(root, BLOB_DIR), exist_ok=True)
+
+    def blob_path(self, sha256):
+        """Return the path of the PDF with the given SHA-256."""
+        return os.path.join(self.root, BLOB_DIR, sha256[:2], f"{sha256}.pdf")
+
+    def put(self, pdf):
+        """
+        Store a downloaded PDF.
+
+        Args:
+            pdf: StreamedPdf (its temporary file is moved into the store or deleted)
+
+        Returns:
+            Path of the stored PDF
+        """
+        path = self.blob_path(pdf.sha256)
+        with self.lock:
+            if os.path.exists(path):
+                pdf.discard()  # same bytes already stored for another citation
+                self.stats['deduplicated'] += 1
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                pdf.save(path)
+                self.stats['stored'] += 1
+        return path
+
+    def report(self):
+        """Return a one-line summary of this run's stores."""
+        return f"PDF store: {self.stats['stored']} PDFs stored, {self.stats['deduplicated']} duplicates not stored again"
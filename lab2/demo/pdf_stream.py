@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Stream PDF responses to disk, validating them while the bytes arrive.
+
+The body is written chunk by chunk to a temporary file, so a large PDF never
+sits in memory. The first chunk must contain the ``%PDF-`` header; otherwise
+(an HTML paywall or error page) the transfer is abandoned right away. A
+Content-Length above ``max_bytes`` is refused before reading, and a body that
+grows past it is cut off. The SHA-256 and size are computed on the way, and
+``StreamedPdf.save`` moves the finished file into place with an atomic rename,
+so a crash never leaves a truncated PDF under its final name.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+
+MAX_PDF_BYTES = 100 * 1024 * 1024  # largest PDF we keep (supplementary files included)
+CHUNK_SIZE = 64 * 1024
+PDF_MAGIC = b'%PDF-'
+MAGIC_WINDOW = 1024  # the PDF header may follow some junk within the first kilobyte
+
+
+class PdfRejected(Exception):
+    """The response is not a PDF we keep (wrong magic bytes or too large)."""
+
+
+class StreamedPdf:
+    """A validated PDF in a temporary file, with its SHA-256 and size."""
+
+    def __init__(self, temp_path, sha256, size, url):
+        self.temp_path = temp_path
+        self.sha256 = sha256
+        self.size = size
+        self.url = url
+
+    def save(self, path):
+        """Move the PDF to path (atomic within one file system) and return path."""
+        try:
+            os.replace(self.temp_path, path)
+        except OSError:
+            shutil.move(self.temp_path, path)  # temp directory on another file system
+        self.temp_path = None
+        return path
+
+    def discard(self):
+        """Delete the temporary file if the PDF was not saved."""
+        if self.temp_path and os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+        self.temp_path = None
+
+    def __repr__(self):
+        return f"StreamedPdf({self.url!r}, {self.size} bytes, sha256={self.sha256[:12]})"
+
+
+def stream_pdf(response, temp_dir, max_bytes=MAX_PDF_BYTES, chunk_size=CHUNK_SIZE, cancel=None):
+    """
+    Write a streamed response to a temporary file if it is a PDF.
+
+    Args:
+        response: requests.Response obtained with stream=True
+        temp_dir: Directory for the temporary file (best on the file system of the final PDF)
+        max_bytes: Largest accepted body
+        chunk_size: Bytes read per chunk
+        cancel: Optional threading.Event; the transfer stops when it is set
+
+    Returns:
+        StreamedPdf
+
+    Raises:
+        PdfRejected: The body does not start like a PDF, is larger than max_bytes,
+            or the transfer was cancelled
+    """
+    length = response.headers.get('content-length', '')
+    if length.isdigit() and int(length) > max_bytes:
+        raise PdfRejected(f"Content-Length {int(length):,} exceeds {max_bytes:,} bytes")
+
+    os.makedirs(temp_dir, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(suffix='.pdf.part', dir=temp_dir)
+    digest = hashlib.sha256()
+    size = 0
+    head = b''
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in response.iter_content(chunk_size):
+                if not chunk:
+                    continue
+                if cancel is not None and cancel.is_set():
+                    raise PdfRejected("Cancelled")
+                if len(head) < MAGIC_WINDOW:
+                    head += chunk[:MAGIC_WINDOW - len(head)]
+                    if PDF_MAGIC not in head and len(head) >= MAGIC_WINDOW:
+                        raise PdfRejected(f"Not a PDF (starts with {head[:16]!r})")
+                size += len(chunk)
+                if size > max_bytes:
+                    raise PdfRejected(f"Body exceeds {max_bytes:,} bytes")
+                digest.update(chunk)
+                f.write(chunk)
+        if PDF_MAGIC not in head:
+            raise PdfRejected(f"Not a PDF (starts with {head[:16]!r})")
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return StreamedPdf(temp_path, digest.hexdigest(), size, response.url)
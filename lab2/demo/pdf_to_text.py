@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+Convert downloaded PDFs to markdown for the analyses, on a process pool.
+
+Every PDF is converted once. Its text is cached under the PDF's SHA-256,
+next to the PDF store:
+
+    <root>/text/<first two hex digits>/<sha256>.md
+
+so a PDF stored for two citations, or met again on the next run, is not
+converted again. A PDF that could not be converted leaves a ``.error`` file
+there instead and is skipped until the stage runs with ``--retry-failed``.
+
+Each worker reads its document page by page and appends every page's text to
+a temporary file as it goes, so a 300-page supplement never sits in memory.
+Workers stop a PDF that runs past its timeout between two pages. A page stuck
+inside the PDF library's C code never returns to Python, so the parent process
+also watches every worker and kills and replaces one whose PDF overruns its
+timeout (or that crashes), and the stage carries on with the other PDFs.
+
+The cached text is then copied to the text directory in the markdown layout
+demo1_extract_methods.py and the lab3 analyses read: "# Title", paragraphs,
+and "## " headings for the standard section names. The file is named after
+the article title (or PDF name) plus the start of the PDF's SHA-256, so two
+articles with the same title do not overwrite each other.
+
+PDFs come from the crawl manifest (named after the article title) and from
+loose *.pdf files of a directory such as lab2/demo/Reviews.
+
+Text extraction needs PyMuPDF (pip install pymupdf) or, slower and without
+layout blocks, pypdf.
+
+Usage:
+    python pdf_to_text.py [PDF_DIR] [--text-dir DIR] [--workers N] [--timeout SECONDS] [--retry-failed]
+"""
+
+import argparse
+import hashlib
+import multiprocessing
+import multiprocessing.connection
+import os
+import re
+import shutil
+import time
+import unicodedata
+
+try:
+    import pymupdf
+    HAS_PYMUPDF = True
+except ImportError:
+    HAS_PYMUPDF = False
+try:
+    import pypdf
+    HAS_PYPDF = True
+except ImportError:
+    HAS_PYPDF = False
+
+from crawl_manifest import CrawlManifest
+from pdf_store import PdfStore
+
+# Configuration
+PDF_DIR = "/Users/simonwang/Documents/Usage/AIagent4bio/lab2/demo/Reviews"  # PDF store root and loose PDFs
+TEXT_DIR = "/Users/simonwang/Documents/Usage/AIagent4bio/lab2/data/fulltext"  # markdown named after the articles
+TEXT_CACHE_DIR = 'text'  # under the PDF store root, keyed by SHA-256
+TIMEOUT = 120  # seconds one PDF may take
+KILL_GRACE = 5.0  # seconds past the timeout before the parent kills a worker that did not stop itself
+POLL_SECONDS = 0.5  # how often the parent checks its workers' deadlines
+HASH_CHUNK = 1024 * 1024
+
+SECTION_HEADING = re.compile(
+    r'^(?:\d{1,2}\.?\s+)?(Abstract|Summary|Introduction|Background|Results|Discussion|Conclusions?|Outlook|'
+    r'Perspectives?|(?:Materials and )?Methods|Acknowledge?ments|References|Bibliography|Literature cited)$',
+    re.IGNORECASE)
+PAGE_NUMBER = re.compile(r'^\d{1,4}$')
+
+
+class ConversionTimeout(Exception):
+    """A PDF took longer than its timeout to convert."""
+
+
+def file_sha256(path):
+    """Return the SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _paragraph(text):
+    """Join the lines of a text block, undoing hyphenation at line ends and ligatures ("ﬁ" -> "fi")."""
+    text = re.sub(r'(\w)-\n(?=[a-z])', r'\1', unicodedata.normalize('NFKC', text).strip())
+    return ' '.join(text.split())
+
+
+def _markdown_block(text):
+    """Return the markdown of one text block ('' for page numbers and empty blocks)."""
+    text = _paragraph(text)
+    if not text or PAGE_NUMBER.match(text):
+        return ''
+    heading = SECTION_HEADING.match(text)
+    if heading:
+        return f"## {heading.group(1).capitalize()}"
+    return text
+
+
+def _pages(pdf_path):
+    """Yield the text blocks of each page of a PDF, one page at a time."""
+    if HAS_PYMUPDF:
+        with pymupdf.open(pdf_path) as document:
+            for page in document:
+                # (x0, y0, x1, y1, text, block number, block type); type 0 is text, in reading order
+                yield [block[4] for block in page.get_text('blocks', sort=True) if block[6] == 0]
+    elif HAS_PYPDF:
+        for page in pypdf.PdfReader(pdf_path).pages:
+            yield re.split(r'\n\s*\n', page.extract_text() or '')
+    else:
+        raise RuntimeError("PDF text extraction needs pymupdf or pypdf")
+
+
+def write_markdown(pdf_path, out, title, deadline=None):
+    """
+    Write the markdown of a PDF to a text stream, page by page.
+
+    Args:
+        pdf_path: PDF file
+        out: Writable text stream
+        title: Title for the "# " heading
+        deadline: time.monotonic() value after which ConversionTimeout is raised
+
+    Returns:
+        Number of pages converted
+    """
+    out.write(f"# {title}\n\n")
+    pages = 0
+    for blocks in _pages(pdf_path):
+        for block in blocks:
+            text = _markdown_block(block)
+            if text:
+                out.write(text + '\n\n')
+        pages += 1
+        if deadline is not None and time.monotonic() > deadline:
+            raise ConversionTimeout(f"timed out after {pages} pages")
+    return pages
+
+
+def _failed(cache_path, error):
+    """Record a failed conversion next to the cache entry, so later runs skip the PDF."""
+    temp = cache_path + '.part'
+    if os.path.exists(temp):
+        os.remove(temp)
+    with open(os.path.splitext(cache_path)[0] + '.error', 'w', encoding='utf-8') as f:
+        f.write(error + '\n')
+
+
+def convert_pdf(job):
+    """
+    Convert one PDF into its cache file.
+
+    Args:
+        job: Tuple of (PDF path, cache path, title, timeout in seconds)
+
+    Returns:
+        Tuple of (cache path, pages converted, error or None)
+    """
+    pdf_path, cache_path, title, timeout = job
+    temp, error_path = cache_path + '.part', os.path.splitext(cache_path)[0] + '.error'
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    try:
+        with open(temp, 'w', encoding='utf-8') as out:
+            pages = write_markdown(pdf_path, out, title, time.monotonic() + timeout)
+        os.replace(temp, cache_path)
+        if os.path.exists(error_path):
+            os.remove(error_path)  # a retry succeeded
+        return cache_path, pages, None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        _failed(cache_path, error)
+        return cache_path, 0, error
+
+
+def _worker(connection):
+    """Worker process: convert each PDF the parent sends down the pipe and send back its result, until None."""
+    for job in iter(connection.recv, None):
+        connection.send(convert_pdf(job))
+
+
+def run_conversions(jobs, workers, timeout):
+    """
+    Convert PDFs on worker processes, killing and replacing a worker whose PDF overruns.
+
+    The parent hands each worker one PDF at a time over the worker's own pipe,
+    so it always knows which PDF a stuck or crashed worker was converting, and
+    killing a worker can only break that worker's pipe. A result the worker
+    sent before its deadline is used, not reported as a timeout.
+
+    Args:
+        jobs: List of convert_pdf jobs
+        workers: Number of worker processes
+        timeout: Seconds one PDF may take; its worker is killed KILL_GRACE seconds later
+
+    Returns:
+        Generator of (job, pages converted, error or None), in completion order
+    """
+    context = multiprocessing.get_context()
+    pending = list(reversed(jobs))
+    processes = {}  # pid -> (worker process, parent end of its pipe)
+    busy = {}       # pid -> (job, time it was handed out)
+
+    def start_worker():
+        connection, child = context.Pipe()
+        process = context.Process(target=_worker, args=(child,), daemon=True)
+        process.start()
+        child.close()
+        processes[process.pid] = (process, connection)
+        return process.pid
+
+    def hand_out(pid):
+        if pending:
+            job = pending.pop()
+            processes[pid][1].send(job)
+            busy[pid] = (job, time.monotonic())
+
+    def retire(pid, error=None):
+        """Stop a worker that crashed (error None) or overran, and start a new one if PDFs are left."""
+        job, _ = busy.pop(pid)
+        process, connection = processes.pop(pid)
+        if process.is_alive():
+            process.kill()
+        process.join()
+        connection.close()
+        error = error or f"WorkerCrashed: exit code {process.exitcode}"
+        if not os.path.exists(job[1]):
+            _failed(job[1], error)
+        if pending:
+            hand_out(start_worker())
+        return job, 0, error
+
+    try:
+        for _ in range(min(workers, len(jobs))):
+            hand_out(start_worker())
+        while busy:
+            waiting = {processes[pid][1]: pid for pid in busy}
+            for connection in multiprocessing.connection.wait(list(waiting), timeout=POLL_SECONDS):
+                pid = waiting[connection]
+                try:
+                    _, pages, error = connection.recv()
+                except (EOFError, OSError):
+                    yield retire(pid)  # the worker died without sending a result
+                    continue
+                job, _ = busy.pop(pid)
+                hand_out(pid)
+                yield job, pages, error
+            now = time.monotonic()
+            for pid, (job, started) in list(busy.items()):
+                # A result (or the end of a dead worker's pipe) waiting in the pipe is read on the next round
+                if now - started <= timeout + KILL_GRACE or processes[pid][1].poll():
+                    continue
+                yield retire(pid, f"ConversionTimeout: worker killed after {now - started:.0f} s")
+    finally:
+        for process, connection in processes.values():
+            try:
+                connection.send(None)
+            except OSError:
+                pass  # the worker is gone already
+            connection.close()
+        for process, _ in processes.values():
+            process.join(timeout=1)
+            if process.is_alive():
+                process.kill()
+                process.join()
+
+
+def text_name(title, sha256):
+    """File name of an article's markdown: its title or PDF name, then the start of the PDF's SHA-256."""
+    name = re.sub(r'[^\w\-,.&]+', '_', title).strip('_.')
+    return f"{name[:120] or 'untitled'}_{sha256[:8]}.md"
+
+
+def manifest_sources(manifest, store):
+    """Return (PDF path, SHA-256, title) of every PDF recorded in a crawl manifest."""
+    sources = []
+    for article_id in list(manifest.offsets):
+        entry = manifest.get(article_id)
+        sha256 = entry.get('sha256')
+        path = store.blob_path(sha256) if sha256 else None
+        if path and os.path.exists(path):
+            title = entry.get('title') or entry.get('metadata', {}).get('title') or article_id
+            sources.append((path, sha256, title))
+    return sources
+
+
+def directory_sources(directory):
+    """Return (PDF path, SHA-256, title) of the loose *.pdf files of a directory."""
+    sources = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if name.lower().endswith('.pdf') and os.path.isfile(path):
+            sources.append((path, file_sha256(path), os.path.splitext(name)[0]))
+    return sources
+
+
+def convert_pdfs(sources, cache_dir, text_dir, workers=None, timeout=TIMEOUT, retry_failed=False):
+    """
+    Convert PDFs to markdown, reusing the cached text of PDFs converted before.
+
+    Args:
+        sources: List of (PDF path, SHA-256, title)
+        cache_dir: Directory of the text cache keyed by SHA-256
+        text_dir: Directory the markdown is copied to, named by text_name
+        workers: Number of worker processes (defaults to the CPU count)
+        timeout: Seconds one PDF may take
+        retry_failed: Convert PDFs again whose earlier conversion failed
+
+    Returns:
+        Dictionary of counts: 'converted', 'cached', 'failed', 'skipped' and 'pages'
+    """
+    os.makedirs(text_dir, exist_ok=True)
+    stats = {'converted': 0, 'cached': 0, 'failed': 0, 'skipped': 0, 'pages': 0}
+    cache_paths, jobs = {}, {}
+    for path, sha256, title in sources:
+        cache_path = os.path.join(cache_dir, sha256[:2], f"{sha256}.md")
+        cache_paths[cache_path] = cache_paths.get(cache_path, []) + [title]
+        if os.path.exists(cache_path) or cache_path in jobs:
+            continue
+        if os.path.exists(os.path.splitext(cache_path)[0] + '.error') and not retry_failed:
+            stats['skipped'] += 1
+            continue
+        jobs[cache_path] = (path, cache_path, title, timeout)
+    stats['cached'] = sum(os.path.exists(path) for path in cache_paths)
+
+    if jobs:
+        print(f"Converting {len(jobs)} PDFs to text ({stats['cached']} already cached)")
+        for job, pages, error in run_conversions(list(jobs.values()), workers or os.cpu_count() or 1, timeout):
+            if error:
+                stats['failed'] += 1
+                print(f"  ✗ {job[0]}: {error}")
+            else:
+                stats['converted'] += 1
+                stats['pages'] += pages
+
+    for cache_path, titles in cache_paths.items():
+        if os.path.exists(cache_path):
+            sha256 = os.path.splitext(os.path.basename(cache_path))[0]
+            for title in titles:
+                shutil.copyfile(cache_path, os.path.join(text_dir, text_name(title, sha256)))
+    return stats
+
+
+def report(stats):
+    """Return a one-line summary of a convert_pdfs run."""
+    return (f"PDF text: {stats['converted']} PDFs converted ({stats['pages']} pages), {stats['cached']} from cache, "
+            f"{stats['failed']} failed, {stats['skipped']} skipped after earlier failures")
+
+
+def main():
+    """Convert the PDFs of the crawl output directory from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('pdf_dir', nargs='?', default=PDF_DIR,
+                        help="crawl output directory: PDF store, manifest.jsonl and loose PDFs")
+    parser.add_argument('--text-dir', default=TEXT_DIR, help="directory for the markdown named after the articles")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--timeout', type=float, default=TIMEOUT, help="seconds one PDF may take")
+    parser.add_argument('--retry-failed', action='store_true', help="convert PDFs again that failed before")
+    args = parser.parse_args()
+    if not (HAS_PYMUPDF or HAS_PYPDF):
+        print("PDF text extraction needs pymupdf or pypdf: pip install pymupdf")
+        return
+
+    sources = directory_sources(args.pdf_dir)
+    manifest_path = os.path.join(args.pdf_dir, 'manifest.jsonl')
+    if os.path.exists(manifest_path):
+        manifest = CrawlManifest(manifest_path)
+        sources += manifest_sources(manifest, PdfStore(args.pdf_dir))
+        manifest.close()
+    start = time.perf_counter()
+    stats = convert_pdfs(sources, os.path.join(args.pdf_dir, TEXT_CACHE_DIR), args.text_dir, args.workers,
+                         args.timeout, args.retry_failed)
+    print(f"{report(stats)} in {time.perf_counter() - start:.1f} s")
+    print(f"Markdown saved to: {args.text_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Tests for per-host throttling, with a fake clock, and for racing candidate calls."""
+
+import threading
+import time
+
+import pytest
+
+from crawl_engine import HostThrottle, TokenBucket, race
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class FakeResponse:
+    def __init__(self, status_code, text=''):
+        self.status_code = status_code
+        self.text = text
+
+
+class FakeSession:
+    def __init__(self, robots):
+        self.robots = robots  # host -> (status, robots.txt text)
+        self.fetched = []
+
+    def get(self, url, timeout=None, headers=None):
+        self.fetched.append(url)
+        host = url.split('/')[2]
+        return FakeResponse(*self.robots.get(host, (404, '')))
+
+
+def test_bucket_spaces_requests_by_the_interval():
+    clock = FakeClock()
+    bucket = TokenBucket(2.0, clock=clock)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 2.0, 4.0]  # callers queue up
+    clock.now += 10
+    assert bucket.reserve() == 0.0
+
+
+def test_bucket_allows_bursts():
+    clock = FakeClock()
+    bucket = TokenBucket(1.0, burst=3, clock=clock)
+    assert [bucket.reserve() for _ in range(4)] == [0.0, 0.0, 0.0, 1.0]
+    clock.now += 1.5
+    assert bucket.reserve() == pytest.approx(0.5)
+
+
+def test_crawl_delay_of_robots_txt_paces_its_host_only():
+    clock = FakeClock()
+    session = FakeSession({'slow.example': (200, "User-agent: *\nCrawl-delay: 5\n")})
+    throttle = HostThrottle(1.0, session=session, clock=clock, sleep=clock.sleep)
+
+    throttle.wait("https://slow.example/a")
+    throttle.wait("https://fast.example/a")
+    throttle.wait("https://slow.example/b")  # sleeps 5 s, by which time fast.example has a token again
+    throttle.wait("https://fast.example/b")
+    throttle.wait("https://fast.example/c")
+    assert clock.slept == [5.0, 1.0]
+    assert throttle.buckets['slow.example'].interval == 5.0
+    assert throttle.buckets['fast.example'].interval == 1.0
+    assert session.fetched == ["https://slow.example/robots.txt", "https://fast.example/robots.txt"]
+
+
+def test_crawl_delay_for_our_user_agent():
+    session = FakeSession({'site.example': (200, "User-agent: OtherBot\nCrawl-delay: 30\n\n"
+                                                 "User-agent: ReviewBot\nCrawl-delay: 3\n")})
+    throttle = HostThrottle(1.0, user_agent='ReviewBot', session=session)
+    assert throttle.crawl_delay('https', 'site.example') == 3.0
+    assert throttle.crawl_delay('https', 'missing.example') == 1.0
+
+
+def test_robots_txt_requests_do_not_wait_for_a_token():
+    clock = FakeClock()
+    throttle = HostThrottle(1.0, use_robots=False, clock=clock, sleep=clock.sleep)
+    throttle.wait("https://site.example/robots.txt")
+    assert throttle.buckets == {} and clock.slept == []
+
+
+def test_waits_are_reported_per_host():
+    clock = FakeClock()
+    throttle = HostThrottle(2.0, use_robots=False, clock=clock, sleep=clock.sleep)
+    throttle.wait("https://a.example/1")
+    throttle.wait("https://a.example/2")
+    assert throttle.waited == {'a.example': 2.0}
+    assert "a.example" in throttle.report()
+
+
+def test_race_returns_the_first_result_and_cancels_the_rest():
+    cancelled = threading.Event()
+
+    def slow(cancel):
+        if cancel.wait(5):
+            cancelled.set()
+        return None
+
+    started = time.monotonic()
+    assert race([slow, lambda cancel: None, lambda cancel: 'pdf']) == 'pdf'
+    assert time.monotonic() - started < 2
+    assert cancelled.wait(2)
+
+
+def test_race_discards_later_winners():
+    second_started, second_done = threading.Event(), threading.Event()
+    discarded = []
+
+    def first(cancel):
+        second_started.wait(2)
+        return 'first'
+
+    def second(cancel):
+        second_started.set()
+        time.sleep(0.05)
+        second_done.set()
+        return 'second'
+
+    def discard(result):
+        discarded.append(result)
+
+    assert race([first, second], discard=discard) == 'first'
+    assert second_done.wait(2)
+    time.sleep(0.05)
+    assert discarded == ['second']
+
+
+def test_race_skips_calls_not_started_before_the_winner():
+    made = []
+
+    def call(name):
+        def run(cancel):
+            made.append(name)
+            time.sleep(0.05)
+            return name
+        return run
+
+    assert race([call('a'), call('b'), call('c')], max_parallel=1) == 'a'
+    time.sleep(0.2)
+    assert made == ['a']
+
+
+def test_race_returns_none_when_every_call_fails():
+    def boom(cancel):
+        raise ValueError("dead link")
+
+    assert race([boom, lambda cancel: None]) is None
+    assert race([]) is None
+
@@ -0,0 +1,186 @@
+import asyncio
+import http.server
+import threading
+import time
+
+import pytest
+import requests
+
+import crawl_jobs
+from crawl_engine import race
+from crawl_jobs import (DONE, FAILED, LEASED, PENDING, CircuitBreaker, CircuitBreakerMixin, HostCircuitOpen,
+                        JobStore, TransientError, article_id, backoff_delay, work_jobs)
+
+
+class BreakerSession(CircuitBreakerMixin, requests.Session):
+    pass
+
+
+class UnavailableHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(503)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def unavailable_url():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), UnavailableHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/paper.pdf"
+    server.shutdown()
+
+
+def state(store, job_id):
+    return store.conn.execute("SELECT state, attempts FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+
+
+def test_article_id_is_stable_across_spacing_and_case():
+    assert article_id({'full_citation': 'A  Title.\nCell'}) == article_id({'full_citation': 'a title. cell'})
+
+
+def test_add_is_idempotent(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs.sqlite'))
+    assert store.add([{'title': 'A'}, {'title': 'B'}]) == 2
+    assert store.add([{'title': 'A'}]) == 0
+    assert store.counts() == {PENDING: 2}
+
+
+def test_expired_lease_is_handed_out_again(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs.sqlite'), lease_seconds=0.05)
+    store.add([{'title': 'A'}])
+    job = store.lease('one')
+    assert store.lease('two') is None
+    time.sleep(0.1)
+    again = store.lease('two')
+    assert again.job_id == job.job_id
+    assert state(store, job.job_id)[0] == LEASED
+
+
+def test_retry_backs_off_then_fails(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs.sqlite'), max_attempts=2)
+    store.add([{'title': 'A'}])
+    job = store.lease('one')
+    delay = store.retry(job, 'HTTP 503', min_delay=100)
+    assert delay >= 100
+    assert state(store, job.job_id) == (PENDING, 1)
+    assert store.lease('one') is None  # not due yet
+    assert store.next_due() > 90
+
+    store.conn.execute("UPDATE jobs SET next_attempt = 0")
+    job = store.lease('one')
+    assert store.retry(job, 'HTTP 503') is None
+    assert state(store, job.job_id) == (FAILED, 2)
+
+
+def test_complete_records_the_source(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs.sqlite'))
+    store.add([{'title': 'A'}, {'title': 'B'}])
+    store.complete(store.lease('one'), 'pmc')
+    store.complete(store.lease('one'), None)
+    assert store.counts() == {DONE: 2}
+    assert store.sources() == {'pmc': 1, 'unavailable': 1}
+
+
+def test_backoff_delay_is_capped():
+    assert all(0 <= backoff_delay(attempts, base=1, cap=8) <= 8 for attempts in range(1, 20))
+
+
+def test_circuit_opens_and_half_opens():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure('host')
+    assert breaker.allow('host')
+    breaker.record_failure('host')
+    assert not breaker.allow('host')
+    assert 0 < breaker.retry_after('host') <= 0.05
+    time.sleep(0.06)
+    assert breaker.allow('host')      # one trial request
+    assert not breaker.allow('host')  # the next waits for its outcome
+    breaker.record_success('host')
+    assert breaker.allow('host')
+    assert breaker.trips == {'host': 1}
+
+
+def test_open_circuit_rejects_requests(unavailable_url):
+    session = BreakerSession(breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60))
+    session.reset_transient()
+    assert session.get(unavailable_url).status_code == 503
+    with pytest.raises(HostCircuitOpen):
+        session.get(unavailable_url)
+    assert session.transient_retry_after() > 0
+    assert [error.split(': ', 1)[1] for error in session.transient_errors()] == ['HTTP 503', 'circuit open']
+
+
+def test_transient_errors_of_raced_calls_reach_the_job(unavailable_url):
+    session = BreakerSession()
+
+    def fetch(cancel):
+        session.get(unavailable_url)
+        return None
+
+    def worker(row):
+        session.reset_transient()
+        if race([fetch, fetch]) is None and session.transient_errors():
+            raise TransientError('; '.join(session.transient_errors()))
+        return None
+
+    async def run_job():
+        return await asyncio.to_thread(worker, {'title': 'A'})
+
+    with pytest.raises(TransientError, match='HTTP 503'):
+        asyncio.run(run_job())
+
+
+def test_transient_logs_of_concurrent_jobs_are_separate(unavailable_url):
+    session = BreakerSession()
+    found = {}
+
+    def worker(name, fail):
+        session.reset_transient()
+        if fail:
+            race([lambda cancel: session.get(unavailable_url) and None])
+        time.sleep(0.05)
+        found[name] = session.transient_errors()
+
+    threads = [threading.Thread(target=worker, args=('failing', True)),
+               threading.Thread(target=worker, args=('clean', False))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(found['failing']) == 1 and found['clean'] == []
+
+
+def test_idle_slot_wakes_when_the_last_job_finishes(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs.sqlite'))  # leases last LEASE_SECONDS (minutes)
+    store.add([{'title': 'Slow'}, {'title': 'Fast'}])
+
+    def worker(row):
+        if row['title'] == 'Slow':
+            time.sleep(0.5)
+        return 'doi'
+
+    started = time.monotonic()
+    asyncio.run(work_jobs(store, worker, 2))
+    assert time.monotonic() - started < 3
+    assert store.counts() == {DONE: 2}
+
+
+def test_retried_job_runs_once_it_is_due(tmp_path, monkeypatch):
+    monkeypatch.setattr(crawl_jobs, 'backoff_delay', lambda attempts: 0.3)
+    store = JobStore(str(tmp_path / 'jobs.sqlite'))
+    store.add([{'title': 'Flaky'}])
+    calls = []
+
+    def worker(row):
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            raise TransientError("HTTP 503")
+        return 'doi'
+
+    asyncio.run(work_jobs(store, worker, 3))
+    assert len(calls) == 2 and 0.3 <= calls[1] - calls[0] < 2
+    assert store.counts() == {DONE: 1}
@@ -0,0 +1,37 @@
+"""Tests for the append-only crawl manifest."""
+
+from crawl_manifest import DOWNLOADED, UNAVAILABLE, CrawlManifest
+
+
+def test_records_survive_a_reopen(tmp_path):
+    path = str(tmp_path / 'manifest.jsonl')
+    manifest = CrawlManifest(path)
+    manifest.append({'article_id': 'a', 'doi': '10.1/A', 'title': 'A Review.', 'sha256': 'aa'})
+    manifest.append({'article_id': 'b', 'outcome': UNAVAILABLE})
+    manifest.append({'article_id': 'a', 'doi': '10.1/A', 'title': 'A Review.', 'sha256': 'ab'})
+    manifest.close()
+
+    manifest = CrawlManifest(path)
+    assert manifest.get('a')['sha256'] == 'ab'
+    assert manifest.find(doi='10.1/a')['article_id'] == 'a'
+    assert manifest.find(title='a review')['article_id'] == 'a'
+    assert manifest.counts() == {DOWNLOADED: 1, UNAVAILABLE: 1}
+    manifest.close()
+
+
+def test_append_after_a_crash_mid_line(tmp_path):
+    path = str(tmp_path / 'manifest.jsonl')
+    manifest = CrawlManifest(path)
+    manifest.append({'article_id': 'a', 'outcome': UNAVAILABLE})
+    manifest.close()
+    with open(path, 'ab') as f:
+        f.write(b'{"article_id": "b", "do')  # the process died while writing b
+
+    manifest = CrawlManifest(path)
+    manifest.append({'article_id': 'c', 'outcome': UNAVAILABLE})
+    manifest.close()
+
+    manifest = CrawlManifest(path)
+    assert sorted(manifest.offsets) == ['a', 'c']
+    assert manifest.get('c')['article_id'] == 'c'
+    manifest.close()
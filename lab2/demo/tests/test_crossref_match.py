@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from crossref_match import CrossrefIndex, build_index, journal_matches, parse_reference
+
+WORKS = [
+    {'DOI': '10.1038/S41576-023-00001-1', 'title': ['Single-cell chromatin accessibility in development'],
+     'container-title': ['Nature Reviews Genetics'], 'short-container-title': ['Nat Rev Genet'],
+     'issued': {'date-parts': [[2023, 2]]}, 'author': [{'family': 'Kim', 'given': 'S.'}]},
+    {'DOI': '10.1016/j.cell.2021.01.002', 'title': ['Enhancer grammar of transcription factor binding'],
+     'container-title': ['Cell'], 'issued': {'date-parts': [[2021]]}, 'author': [{'family': 'Zhang'}]},
+    {'DOI': '10.1000/no-title'},
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    dump = tmp_path / 'works.jsonl'
+    dump.write_text('\n'.join(json.dumps(work) for work in WORKS) + '\n', encoding='utf-8')
+    path = str(tmp_path / 'crossref.sqlite')
+    assert build_index(path, [str(dump)]) == 2
+    index = CrossrefIndex(path)
+    yield index
+    index.close()
+
+
+def test_parse_reference_uses_the_citation_tagger():
+    reference = parse_reference('Kim, S. & Lee, J. Single-cell chromatin accessibility in development. '
+                                'Nat. Rev. Genet. 24, 1–20 (2023).')
+    assert reference.title == 'Single-cell chromatin accessibility in development'
+    assert reference.journal == 'Nat. Rev. Genet'
+    assert reference.year == 2023
+    assert reference.first_author == 'Kim'
+
+
+def test_parse_reference_falls_back_to_the_table():
+    reference = parse_reference('an unstructured note', 'A title', 'Cell', '2020')
+    assert reference[:4] == ('A title', 'Cell', 2020, None)
+
+
+def test_journal_abbreviations_match():
+    assert journal_matches('Nat. Rev. Genet.', ['Nature Reviews Genetics'])
+    assert not journal_matches('Nat. Rev. Genet.', ['Cell'])
+
+
+def test_match_finds_the_doi_through_an_abbreviated_journal(index):
+    found, = index.match([parse_reference('Kim, S. et al. Single-cell chromatin accessibility in development. '
+                                          'Nat. Rev. Genet. 24, 1–20 (2023).')])
+    assert found.doi == '10.1038/s41576-023-00001-1'
+    assert found.year == 2023
+
+
+def test_wrong_journal_rules_out_an_inexact_title(index):
+    title = 'Kim, S. et al. Single-cell chromatin accessibility of neurons. '
+    right, wrong = index.match([parse_reference(title + 'Nat. Rev. Genet. 24, 1–20 (2023).'),
+                                parse_reference(title + 'Cell 24, 1–20 (2023).')])
+    assert right.doi == '10.1038/s41576-023-00001-1'
+    assert wrong is None
+
+
+def test_match_rejects_a_wrong_year_or_title(index):
+    citations = [
+        'Zhang, Y. Enhancer grammar of transcription factor binding. Cell 184, 1–10 (2015).',
+        'Ruiz, A. A study of something else entirely. Cell 1, 1–2 (2021).',
+    ]
+    assert index.match([parse_reference(citation) for citation in citations]) == [None, None]
+    assert index.stats['references'] == 2 and index.stats['matched'] == 0
+
+
+def test_unopened_index_matches_nothing():
+    assert CrossrefIndex().match([parse_reference('Kim, S. A title. Cell 1, 1 (2020).')]) == [None]
@@ -0,0 +1,81 @@
+"""Tests for racing the candidate PDF URLs of a DOI landing page, against a local publisher."""
+
+import http.server
+import threading
+import time
+
+import pytest
+import requests
+
+import download_reviews
+from url_templates import UrlTemplates
+
+PDF = b'%PDF-1.7\n' + b'x' * 5000 + b'\n%%EOF\n'
+DEAD_LINKS = 8
+DEAD_SECONDS = 0.5
+
+
+class PublisherHandler(http.server.BaseHTTPRequestHandler):
+    """A landing page linking to many slow dead PDFs and one real one."""
+
+    def do_GET(self):
+        if self.path == '/article/123':
+            links = ''.join(f'<a href="/files/dead{i}.pdf">PDF</a>' for i in range(DEAD_LINKS))
+            self.reply(200, 'text/html', f'<html><body>{links}<a href="/files/paper.pdf">PDF</a></body></html>'.encode())
+        elif self.path == '/files/paper.pdf':
+            self.reply(200, 'application/pdf', PDF)
+        elif self.path.startswith('/files/dead'):
+            time.sleep(DEAD_SECONDS)
+            self.reply(404, 'text/html', b'gone')
+        else:
+            self.reply(404, 'text/html', b'not found')
+
+    def do_HEAD(self):
+        self.reply(404, 'text/html', b'')
+
+    def reply(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class DoiSession(requests.Session):
+    """Resolves https://doi.org/<doi> to the local publisher."""
+
+    def __init__(self, publisher):
+        super().__init__()
+        self.publisher = publisher
+
+    def request(self, method, url, *args, **kwargs):
+        if url.startswith('https://doi.org/'):
+            url = self.publisher + '/article/123'
+        return super().request(method, url, *args, **kwargs)
+
+
+@pytest.fixture
+def session():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), PublisherHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    with DoiSession(f"http://127.0.0.1:{server.server_port}") as session:
+        yield session
+    server.shutdown()
+    server.server_close()
+
+
+def test_first_real_pdf_wins_without_waiting_for_dead_links(session, tmp_path, monkeypatch):
+    monkeypatch.setattr(download_reviews, 'PDF_TEMP_DIR', str(tmp_path / 'partial'))
+    templates = UrlTemplates()
+    started = time.monotonic()
+    pdf = download_reviews.download_from_doi('10.1000/test.123', session, templates)
+    elapsed = time.monotonic() - started
+    assert pdf is not None and pdf.url.endswith('/files/paper.pdf')
+    assert pdf.size == len(PDF)
+    # Trying the dead links one by one would take DEAD_LINKS * DEAD_SECONDS
+    assert elapsed < DEAD_LINKS * DEAD_SECONDS / 2
+    pdf.discard()
@@ -0,0 +1,109 @@
+import http.server
+import threading
+
+import pytest
+import requests
+
+from http_cache import CachingSessionMixin, HttpCache
+
+
+class CachingSession(CachingSessionMixin, requests.Session):
+    pass
+
+
+class RevalidatingHandler(http.server.BaseHTTPRequestHandler):
+    """Serves /page with lowercase validators; /moved redirects to it; /stored is fresh for an hour."""
+    requests_seen = []
+
+    def do_GET(self):
+        type(self).requests_seen.append((self.path, self.headers.get('If-None-Match'),
+                                         self.headers.get('If-Modified-Since')))
+        if self.path == '/moved':
+            self.send_response(301)
+            self.send_header('location', '/page')
+            self.send_header('cache-control', 'max-age=3600')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if self.path == '/page' and self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.send_header('cache-control', 'no-cache')
+            self.end_headers()
+            return
+        body = b'<html>landing page</html>'
+        self.send_response(200)
+        self.send_header('etag', '"v1"')
+        self.send_header('last-modified', 'Mon, 01 Jan 2024 00:00:00 GMT')
+        self.send_header('cache-control', 'max-age=3600' if self.path == '/stored' else 'no-cache')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    RevalidatingHandler.requests_seen = []
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), RevalidatingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = HttpCache(str(tmp_path / 'cache.sqlite'))
+    yield cache
+    cache.close()
+
+
+def test_lowercase_validators_are_sent_back(server, cache):
+    session = CachingSession(cache=cache)
+    first = session.get(f"{server}/page")
+    second = session.get(f"{server}/page")
+    assert RevalidatingHandler.requests_seen[1] == ('/page', '"v1"', 'Mon, 01 Jan 2024 00:00:00 GMT')
+    assert second.status_code == 200 and second.content == first.content
+    assert second.from_cache
+    assert cache.stats == {'fresh': 0, 'revalidated': 1, 'fetched': 1, 'uncacheable': 0}
+
+
+def test_fresh_entry_is_served_without_a_request(server, cache):
+    session = CachingSession(cache=cache)
+    session.get(f"{server}/stored")
+    response = session.get(f"{server}/stored")
+    assert len(RevalidatingHandler.requests_seen) == 1
+    assert response.headers['ETag'] == '"v1"'
+    assert cache.stats['fresh'] == 1
+
+
+def test_redirect_hops_are_cached_one_by_one(server, cache):
+    session = CachingSession(cache=cache)
+    response = session.get(f"{server}/moved")
+    assert response.url == f"{server}/page" and [hop.status_code for hop in response.history] == [301]
+    session.get(f"{server}/moved")
+    # The second time only the final page is revalidated; the redirect is still fresh
+    assert [path for path, _, _ in RevalidatingHandler.requests_seen] == ['/moved', '/page', '/page']
+
+
+def test_offline_replays_stale_entries_and_refuses_the_rest(server, tmp_path):
+    online = HttpCache(str(tmp_path / 'cache.sqlite'))
+    CachingSession(cache=online).get(f"{server}/page")
+    online.close()
+    offline = HttpCache(str(tmp_path / 'cache.sqlite'), offline=True)
+    session = CachingSession(cache=offline)
+    assert session.get(f"{server}/page").content == b'<html>landing page</html>'
+    with pytest.raises(requests.ConnectionError):
+        session.get(f"{server}/other")
+    assert len(RevalidatingHandler.requests_seen) == 1
+    offline.close()
+
+
+def test_stats_are_counted_under_concurrency(cache):
+    threads = [threading.Thread(target=lambda: [cache.count('fresh') for _ in range(2000)]) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.stats['fresh'] == 16000
@@ -0,0 +1,58 @@
+"""Tests for the pooled crawl session."""
+
+import gzip
+import http.server
+import threading
+
+import pytest
+
+from http_session import ACCEPT_ENCODING, PoolStats, create_session
+
+BODY = b"<html>landing page</html>"
+
+
+class KeepAliveHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keeps connections open between requests
+
+    def do_GET(self):
+        gzipped = 'gzip' in self.headers.get('Accept-Encoding', '')
+        body = gzip.compress(BODY) if gzipped else BODY
+        self.send_response(200)
+        if gzipped:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def base_url():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_connections_are_reused(base_url):
+    session = create_session({'User-Agent': 'test'})
+    for i in range(5):
+        response = session.get(f"{base_url}/article/{i}")
+        assert response.content == BODY  # decoded from gzip
+    assert (session.pool_stats.requests, session.pool_stats.connections) == (5, 1)
+    assert "4 handshakes saved (hit rate 80%)" in session.pool_stats.report()
+    session.close()
+
+
+def test_session_asks_for_compressed_responses(base_url):
+    session = create_session({'Accept-Encoding': 'identity'})
+    assert session.headers['Accept-Encoding'] == ACCEPT_ENCODING
+    assert session.get(base_url).request.headers['Accept-Encoding'] == ACCEPT_ENCODING
+    session.close()
+
+
+def test_pool_stats_report_without_requests():
+    assert PoolStats().report() == "HTTP pool: 0 requests over 0 connections, 0 handshakes saved (hit rate 0%)"
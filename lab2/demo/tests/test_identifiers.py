@@ -0,0 +1,55 @@
+from identifiers import NO_IDENTIFIERS, scan_citations, scan_identifiers
+
+
+def test_pubmed_link_is_the_only_identifier():
+    found = scan_identifiers("Smith J (2011) Title. J Mol Biol 409, 7–13. https://pubmed.ncbi.nlm.nih.gov/12345678/")
+    assert found.pmid == '12345678'
+
+
+def test_pubmed_markdown_link():
+    found = scan_identifiers("Title. [[PubMed](https://pubmed.ncbi.nlm.nih.gov/21334344/)]")
+    assert found.pmid == '21334344'
+
+
+def test_pmc_markdown_citation():
+    found = scan_identifiers(
+        "Beckwith J (2011) The operon. J Mol Biol 409 (1), 7–13. [[DOI](https://doi.org/10.1016/j.jmb.2011.02.027)] "
+        "[[PMC free article](https://pmc.ncbi.nlm.nih.gov/articles/PMC3123456/)] "
+        "[[PubMed](https://pubmed.ncbi.nlm.nih.gov/21334344/)]")
+    assert found == ('10.1016/j.jmb.2011.02.027', '21334344', 'PMC3123456', None)
+
+
+def test_doi_trailing_punctuation_and_brackets():
+    assert scan_identifiers("see (doi: 10.1038/nrg.2017.38).").doi == '10.1038/nrg.2017.38'
+    assert scan_identifiers("doi:10.1002/(SICI)1097-0258(19980715)17:13<1>3.0.CO;2-2").doi.startswith(
+        '10.1002/(SICI)1097-0258(19980715)17:13')
+
+
+def test_digits_after_pubmed_link_text_are_not_a_pmid():
+    assert scan_identifiers("Nat. Rev. Genet. 22, 96 (2021). CAS PubMed 12345 Google Scholar").pmid is None
+
+
+def test_pmid_with_leading_zero_is_rejected():
+    assert scan_identifiers("PMID: 0123456").pmid is None
+
+
+def test_pmcid_inside_a_word_is_rejected():
+    assert scan_identifiers("XPMC1234567 and 310.1234/abc").pmcid is None
+
+
+def test_arxiv_months_and_numbering():
+    assert scan_identifiers("Preprint at arXiv:2106.01345 (2021).").arxiv == '2106.01345'
+    assert scan_identifiers("arXiv:2113.01345").arxiv is None      # month 13
+    assert scan_identifiers("arXiv:1406.01345").arxiv is None      # 5 digits before 2015
+    assert scan_identifiers("arXiv.org/abs/hep-th/9901001").arxiv == 'hep-th/9901001'
+
+
+def test_no_identifier():
+    assert scan_identifiers("Author A. A title. Cell 134, 317 (2008).") is NO_IDENTIFIERS
+    assert scan_identifiers(None) is NO_IDENTIFIERS
+
+
+def test_scan_citations_is_aligned_with_its_input():
+    columns = scan_citations(["PMID: 123", "", "PMID: 123", "doi 10.1000/xyz"])
+    assert columns['pmid'] == ['123', None, '123', None]
+    assert columns['doi'] == [None, None, None, '10.1000/xyz']
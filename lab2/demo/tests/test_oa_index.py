@@ -0,0 +1,71 @@
+"""Tests for the offline open access index."""
+
+import gzip
+import json
+
+import pytest
+
+from oa_index import OaIndex, OaRecord, build_index
+
+PMC_IDS = """Journal Title,ISSN,eISSN,Year,Volume,Issue,Page,DOI,PMCID,PMID,Manuscript Id,Release Date
+Cell,,,2020,1,1,1,10.1016/J.CELL.2020.01.001,PMC100,111,,live
+Nature,,,2021,2,1,5,,PMC200,222,,live
+Science,,,2019,3,1,9,10.1126/science.abc,,333,,live
+"""
+
+UNPAYWALL = [
+    {'doi': '10.1016/j.cell.2020.01.001', 'is_oa': True,
+     'best_oa_location': {'url_for_pdf': 'https://oa.example/cell.pdf'}},
+    {'doi': '10.1126/science.abc', 'is_oa': False, 'best_oa_location': None},
+    {'doi': '10.9999/only.unpaywall', 'is_oa': True, 'best_oa_location': {'url': 'https://oa.example/landing'}},
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    pmc_ids = tmp_path / 'PMC-ids.csv.gz'
+    with gzip.open(pmc_ids, 'wt', encoding='utf-8') as f:
+        f.write(PMC_IDS)
+    unpaywall = tmp_path / 'unpaywall.jsonl'
+    unpaywall.write_text('\n'.join(json.dumps(entry) for entry in UNPAYWALL) + '\n\n', encoding='utf-8')
+    path = str(tmp_path / 'oa.index')
+    assert build_index(path, str(pmc_ids), str(unpaywall)) == 4
+    index = OaIndex(path)
+    yield index
+    index.close()
+
+
+def test_every_identifier_reaches_the_merged_record(index):
+    expected = OaRecord('10.1016/j.cell.2020.01.001', '111', 'PMC100', 'https://oa.example/cell.pdf')
+    assert index.get('doi', 'https://doi.org/10.1016/J.Cell.2020.01.001') == expected
+    assert index.get('pmid', '111') == expected
+    assert index.get('pmcid', '100') == expected
+    assert index.get('pmcid', 'pmc200') == OaRecord(None, '222', 'PMC200', None)
+    assert index.get('doi', '10.9999/only.unpaywall').oa_url == 'https://oa.example/landing'
+
+
+def test_closed_access_doi_keeps_no_url(index):
+    assert index.get('doi', '10.1126/science.abc') == OaRecord('10.1126/science.abc', '333', None, None)
+
+
+def test_unknown_identifiers_miss(index):
+    assert index.get('doi', '10.1/unknown') is None
+    assert index.get('pmid', '') is None
+    assert index.get('pmcid', '111') is None  # a PMID is not a PMCID
+
+
+def test_resolve_takes_the_first_known_identifier(index):
+    assert index.resolve(doi='10.1/unknown', pmid='222').pmcid == 'PMC200'
+    assert index.resolve(doi='10.1/unknown') is None
+    assert index.stats == {'hits': 1, 'misses': 1}
+
+
+def test_unopened_index_resolves_nothing():
+    assert OaIndex().resolve(doi='10.1016/j.cell.2020.01.001') is None
+
+
+def test_other_files_are_rejected(tmp_path):
+    path = tmp_path / 'not.index'
+    path.write_bytes(b'x' * 64)
+    with pytest.raises(ValueError):
+        OaIndex(str(path))
@@ -0,0 +1,49 @@
+"""Tests for the incremental PDF-link sniffer."""
+
+from pdf_links import sniff_chunks
+
+BASE = "https://publisher.example/article/1"
+
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def test_meta_tag_split_across_chunks_is_found():
+    page = (b'<html><head><title>x</title>'
+            b'<meta name="citation_pdf_url" content="/content/1.full.pdf?a=1&amp;b=2"></head>')
+    for size in (1, 7, 64):
+        links = sniff_chunks(chunked(page, size), BASE)
+        assert links.confident == ["https://publisher.example/content/1.full.pdf?a=1&b=2"]
+
+
+def test_reading_stops_at_the_first_confident_link():
+    consumed = []
+
+    def chunks():
+        yield b'<head><link rel="alternate" type="application/pdf" href="https://cdn.example/1.pdf">'
+        for i in range(100):
+            consumed.append(i)
+            yield b'<p>' + b'x' * 1000 + b'</p>'
+
+    links = sniff_chunks(chunks(), BASE)
+    assert links.confident == ["https://cdn.example/1.pdf"]
+    assert consumed == []
+
+
+def test_anchors_are_collected_up_to_the_limit():
+    page = b''.join(b'<a href="/pdf/%d">PDF</a><a href="/html/%d">HTML</a>' % (i, i) for i in range(10))
+    links = sniff_chunks(chunked(page, 16), BASE, max_anchors=3)
+    assert links.confident == []
+    assert links.anchors == [f"https://publisher.example/pdf/{i}" for i in range(3)]
+    assert links.bytes_read < len(page)
+
+
+def test_duplicate_anchors_are_kept_once():
+    page = b'<a href="/a.pdf">one</a><a href="/a.pdf">two</a>'
+    assert sniff_chunks([page], BASE).anchors == ["https://publisher.example/a.pdf"]
+
+
+def test_reading_stops_after_max_bytes():
+    links = sniff_chunks(chunked(b'<p>nothing here</p>' * 1000, 100), BASE, max_bytes=500)
+    assert links == ([], [], 500)
@@ -0,0 +1,27 @@
+"""Tests for the content-addressed PDF store."""
+
+import hashlib
+import os
+
+from pdf_store import PdfStore
+from pdf_stream import StreamedPdf
+
+
+def streamed(tmp_path, name, content):
+    path = tmp_path / f"{name}.pdf.part"
+    path.write_bytes(content)
+    return StreamedPdf(str(path), hashlib.sha256(content).hexdigest(), len(content), f"https://x.example/{name}")
+
+
+def test_same_pdf_is_stored_once(tmp_path):
+    store = PdfStore(str(tmp_path / 'store'))
+    first = store.put(streamed(tmp_path, 'a', b'%PDF-1.4 same'))
+    second = store.put(streamed(tmp_path, 'b', b'%PDF-1.4 same'))
+    other = store.put(streamed(tmp_path, 'c', b'%PDF-1.4 other'))
+
+    sha256 = hashlib.sha256(b'%PDF-1.4 same').hexdigest()
+    assert first == second == os.path.join(str(tmp_path / 'store'), 'pdfs', sha256[:2], f"{sha256}.pdf")
+    assert other != first
+    assert store.stats == {'stored': 2, 'deduplicated': 1}
+    assert not list(tmp_path.glob('*.part'))  # the duplicate's temporary file is deleted too
+    assert "1 duplicates" in store.report()
@@ -0,0 +1,74 @@
+"""Tests for validated PDF streaming."""
+
+import hashlib
+import os
+import threading
+
+import pytest
+from requests.structures import CaseInsensitiveDict
+
+from pdf_stream import MAGIC_WINDOW, PdfRejected, stream_pdf
+
+PDF = b'%PDF-1.7\n' + b'x' * 5000 + b'\n%%EOF\n'
+
+
+class FakeResponse:
+    def __init__(self, body, headers=None, chunk=1000):
+        self.body = body
+        self.headers = CaseInsensitiveDict(headers or {})
+        self.chunk = chunk
+        self.url = "https://publisher.example/paper.pdf"
+        self.chunks_read = 0
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), self.chunk):
+            self.chunks_read += 1
+            yield self.body[start:start + self.chunk]
+
+
+def test_pdf_is_streamed_hashed_and_saved(tmp_path):
+    pdf = stream_pdf(FakeResponse(PDF), str(tmp_path / 'tmp'))
+    assert (pdf.size, pdf.sha256) == (len(PDF), hashlib.sha256(PDF).hexdigest())
+    target = pdf.save(str(tmp_path / 'paper.pdf'))
+    assert open(target, 'rb').read() == PDF and pdf.temp_path is None
+    assert os.listdir(tmp_path / 'tmp') == []
+
+
+def test_html_is_rejected_after_the_first_kilobyte(tmp_path):
+    response = FakeResponse(b'<!DOCTYPE html>' + b'<p>paywall</p>' * 5000, chunk=256)
+    with pytest.raises(PdfRejected, match="Not a PDF"):
+        stream_pdf(response, str(tmp_path))
+    assert response.chunks_read == MAGIC_WINDOW // 256
+    assert os.listdir(tmp_path) == []
+
+
+def test_header_after_some_junk_is_accepted(tmp_path):
+    assert stream_pdf(FakeResponse(b'\r\n\xef\xbb\xbf' + PDF), str(tmp_path)).size == len(PDF) + 5
+
+
+def test_short_non_pdf_is_rejected(tmp_path):
+    with pytest.raises(PdfRejected):
+        stream_pdf(FakeResponse(b'Not found'), str(tmp_path))
+
+
+def test_oversized_content_length_is_refused_before_reading(tmp_path):
+    response = FakeResponse(PDF, {'Content-Length': str(10 ** 9)})
+    with pytest.raises(PdfRejected, match="Content-Length"):
+        stream_pdf(response, str(tmp_path), max_bytes=1000)
+    assert response.chunks_read == 0
+
+
+def test_body_growing_past_the_limit_is_cut_off(tmp_path):
+    response = FakeResponse(PDF)  # no Content-Length
+    with pytest.raises(PdfRejected, match="exceeds"):
+        stream_pdf(response, str(tmp_path), max_bytes=2500)
+    assert response.chunks_read == 3
+    assert os.listdir(tmp_path) == []
+
+
+def test_cancelled_transfer_is_dropped(tmp_path):
+    cancel = threading.Event()
+    cancel.set()
+    with pytest.raises(PdfRejected, match="Cancelled"):
+        stream_pdf(FakeResponse(PDF), str(tmp_path), cancel=cancel)
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,109 @@
+"""Tests for the PDF-to-text stage."""
+
+import os
+import time
+
+import pytest
+
+import pdf_to_text
+from pdf_to_text import convert_pdfs, directory_sources, text_name
+
+fitz = pytest.importorskip('fitz')
+
+
+def make_pdf(path, *pages):
+    document = fitz.open()
+    for text in pages:
+        document.new_page().insert_text((72, 72), text)
+    document.save(path)
+    document.close()
+
+
+def read_texts(text_dir):
+    return {name: open(os.path.join(text_dir, name), encoding='utf-8').read() for name in os.listdir(text_dir)}
+
+
+def test_converts_and_reuses_the_cache(tmp_path):
+    make_pdf(tmp_path / 'Paper one.pdf', 'First page', 'Second page')
+    sources = directory_sources(tmp_path)
+    stats = convert_pdfs(sources, tmp_path / 'cache', tmp_path / 'text', workers=1)
+    assert (stats['converted'], stats['pages']) == (1, 2)
+    [(name, text)] = read_texts(tmp_path / 'text').items()
+    assert name == text_name('Paper one', sources[0][1])
+    assert 'First page' in text and 'Second page' in text
+
+    stats = convert_pdfs(sources, tmp_path / 'cache', tmp_path / 'text', workers=1)
+    assert (stats['converted'], stats['cached']) == (0, 1)
+
+
+def test_same_titles_do_not_overwrite_each_other(tmp_path):
+    for folder, text in (('a', 'Alpha'), ('b', 'Beta')):
+        os.makedirs(tmp_path / folder)
+        make_pdf(tmp_path / folder / 'Review.pdf', text)
+    sources = directory_sources(tmp_path / 'a') + directory_sources(tmp_path / 'b')
+    convert_pdfs(sources, tmp_path / 'cache', tmp_path / 'text', workers=2)
+    texts = read_texts(tmp_path / 'text')
+    assert len(texts) == 2
+    assert any('Alpha' in text for text in texts.values()) and any('Beta' in text for text in texts.values())
+
+
+def test_failed_pdf_is_skipped_until_retried(tmp_path):
+    (tmp_path / 'broken.pdf').write_bytes(b'%PDF-1.4 not really a pdf')
+    sources = directory_sources(tmp_path)
+    assert convert_pdfs(sources, tmp_path / 'cache', tmp_path / 'text', workers=1)['failed'] == 1
+    assert convert_pdfs(sources, tmp_path / 'cache', tmp_path / 'text', workers=1)['skipped'] == 1
+    assert convert_pdfs(sources, tmp_path / 'cache', tmp_path / 'text', workers=1, retry_failed=True)['failed'] == 1
+
+
+def _stuck_pages(pdf_path):
+    """A page that never returns, like one stuck in the PDF library's C code."""
+    yield 'first page'
+    while True:
+        time.sleep(60)
+
+
+def _crashing_pages(pdf_path):
+    os._exit(3)
+    yield
+
+
+@pytest.mark.parametrize('pages, error', [(_stuck_pages, 'ConversionTimeout'), (_crashing_pages, 'WorkerCrashed')])
+def test_parent_replaces_stuck_or_crashed_workers(tmp_path, monkeypatch, pages, error):
+    if pdf_to_text.multiprocessing.get_start_method() != 'fork':
+        pytest.skip("workers see the patched page reader only when forked")
+    for name in ('a', 'b', 'c'):
+        make_pdf(tmp_path / f'{name}.pdf', name)
+    sources = directory_sources(tmp_path)
+    jobs = [(path, str(tmp_path / 'cache' / f'{sha256}.md'), title, 1) for path, sha256, title in sources]
+    monkeypatch.setattr(pdf_to_text, 'KILL_GRACE', 0.5)
+    monkeypatch.setattr(pdf_to_text, '_pages', pages)
+
+    started = time.monotonic()
+    results = list(pdf_to_text.run_conversions(jobs, 2, timeout=1))
+    assert time.monotonic() - started < 20
+    assert sorted(job[2] for job, _, _ in results) == ['a', 'b', 'c']
+    assert all(error in message for _, _, message in results)
+    for job in jobs:
+        assert os.path.exists(os.path.splitext(job[1])[0] + '.error')
+        assert not os.path.exists(job[1] + '.part')
+
+
+def test_result_sent_before_the_deadline_is_not_a_timeout(tmp_path, monkeypatch):
+    make_pdf(tmp_path / 'a.pdf', 'a')
+    [(path, sha256, title)] = directory_sources(tmp_path)
+    jobs = [(path, str(tmp_path / 'cache' / f'{sha256}.md'), title, 10)]
+    wait = pdf_to_text.multiprocessing.connection.wait
+    waits = []
+
+    def late_wait(connections, timeout=None):
+        waits.append(timeout)
+        if len(waits) == 1:
+            wait(connections, timeout=10)  # the result arrives...
+            return []                      # ...just after the parent stopped waiting, and the deadline passes
+        return wait(connections, timeout)
+
+    monkeypatch.setattr(pdf_to_text.multiprocessing.connection, 'wait', late_wait)
+    monkeypatch.setattr(pdf_to_text, 'KILL_GRACE', -1)
+    [(job, pages, error)] = pdf_to_text.run_conversions(jobs, 1, timeout=0)
+    assert (pages, error) == (1, None)
+    assert os.path.exists(job[1])
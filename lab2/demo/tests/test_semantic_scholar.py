@@ -0,0 +1,77 @@
+"""Tests for the batched Semantic Scholar client, against the bundled mock API."""
+
+import math
+
+import pytest
+import requests
+
+import download_reviews
+from mock_semantic_scholar import MAX_BATCH, MockHandler, make_paper, serve
+from semantic_scholar import SemanticScholar, open_access_pdf
+
+DOIS = [f"10.{1000 + i}/mock.{i}" for i in range(23)]
+
+
+@pytest.fixture(scope='module')
+def api_url():
+    server = serve(0, background=True)
+    yield f"http://127.0.0.1:{server.server_port}/graph/v1"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(api_url):
+    with requests.Session() as session:
+        yield SemanticScholar(session, api_url, batch_size=5)
+
+
+def served():
+    return MockHandler.requests_served
+
+
+def test_dois_are_looked_up_in_batches(client):
+    before = served()
+    assert client.prefetch(DOIS + [DOIS[0].upper(), None]) == math.ceil(len(DOIS) / 5)
+    assert served() - before == math.ceil(len(DOIS) / 5)
+    for doi in DOIS:
+        assert client.by_doi(doi) == make_paper(doi=doi)
+    assert served() - before == math.ceil(len(DOIS) / 5)
+    assert client.stats['memo_hits'] == len(DOIS)
+
+
+def test_misses_are_memoised(client):
+    unknown = next(doi for doi in DOIS if make_paper(doi=doi) is None)
+    before = served()
+    assert client.by_doi(unknown) is None
+    assert client.by_doi(unknown) is None
+    assert client.prefetch([unknown]) == 0
+    assert served() - before == 1
+
+
+def test_title_search_only_after_the_doi_misses(client):
+    known = next(doi for doi in DOIS if make_paper(doi=doi) is not None)
+    unknown = next(doi for doi in DOIS if make_paper(doi=doi) is None)
+
+    assert client.paper(known, "Some title")['externalIds'] == {'DOI': known}
+    assert client.stats['search_requests'] == 0
+    assert client.paper(unknown, "Some title")['title'] == "Some title"
+    assert client.stats['search_requests'] == 1
+    assert client.paper(None, "some  TITLE") is not None  # memoised by normalised title
+    assert client.stats == {'batch_requests': 2, 'search_requests': 1, 'memo_hits': 1}
+
+
+def test_failed_batch_falls_back_to_single_lookups(api_url, monkeypatch):
+    dois = [f"10.5555/oversized.{i}" for i in range(MAX_BATCH + 1)]
+    doi = next(doi for doi in dois if open_access_pdf(make_paper(doi=doi)))
+    with requests.Session() as session:
+        client = SemanticScholar(session, api_url, batch_size=len(dois))
+        with pytest.raises(requests.HTTPError):
+            client.prefetch(dois)  # the mock, like the API, refuses more than MAX_BATCH ids
+        assert not client.memo
+
+        downloaded = []
+        monkeypatch.setattr(download_reviews, 'download_pdf', lambda url, session: downloaded.append(url) or url)
+        assert download_reviews.download_from_semantic_scholar("Title", "", session, doi, client)
+    assert downloaded == [open_access_pdf(make_paper(doi=doi))]
+    assert client.stats['batch_requests'] == 2 and client.stats['search_requests'] == 0
@@ -0,0 +1,51 @@
+"""Tests for learned PDF URL templates."""
+
+import json
+
+import url_templates
+from url_templates import UrlTemplates
+
+DOI = "10.1038/s41576-023-00001-x"
+LANDING = "https://www.nature.com/articles/s41576-023-00001-x"
+PDF = "https://www.nature.com/articles/s41576-023-00001-x.pdf"
+
+
+def saved(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_learned_templates_apply_to_other_dois(tmp_path):
+    templates = UrlTemplates(str(tmp_path / 'templates.json'))
+    templates.learn(DOI, LANDING, PDF)
+    assert templates.doi_url("10.1038/s41586-020-1234-5") == "https://www.nature.com/articles/s41586-020-1234-5.pdf"
+    assert templates.landing_url("https://www.nature.com/articles/abc123") == "https://www.nature.com/articles/abc123.pdf"
+    assert templates.has_hosts()
+    assert saved(tmp_path / 'templates.json')['doi']['10.1038/']['template'].endswith('{suffix}.pdf')
+
+
+def test_uses_are_counted_in_memory_and_saved_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(url_templates, 'SAVE_EVERY', 5)
+    path = str(tmp_path / 'templates.json')
+    templates = UrlTemplates(path)
+    templates.learn(DOI, LANDING, PDF)
+
+    for _ in range(4):
+        templates.record('doi', DOI, True)
+    assert saved(path)['doi']['10.1038/']['hits'] == 0
+    templates.record('doi', DOI, True)
+    assert saved(path)['doi']['10.1038/']['hits'] == 5
+    templates.record('doi', DOI, True)
+    templates.close()
+    assert saved(path)['doi']['10.1038/']['hits'] == 6
+
+
+def test_failing_template_is_dropped_and_saved_at_once(tmp_path):
+    path = str(tmp_path / 'templates.json')
+    templates = UrlTemplates(path)
+    templates.learn(DOI, LANDING, PDF)
+    for _ in range(url_templates.MAX_MISSES):
+        templates.record('host', LANDING, False)
+    assert not templates.has_hosts()
+    assert saved(path)['host'] == {}
+    assert UrlTemplates(path).doi_url(DOI) == PDF
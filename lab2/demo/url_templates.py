@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Learned publisher PDF URL templates.
+
+Once a PDF has been found through the landing page of a DOI, the crawler
+remembers how the PDF URL was built:
+
+    DOI templates   keyed by DOI prefix, with the DOI or its suffix as a
+                    placeholder, e.g. 10.1038/ -> https://www.nature.com/articles/{suffix}.pdf
+                    Later DOIs with that prefix go straight to the PDF, without
+                    the doi.org redirect chain and the landing page.
+    Host templates  keyed by the landing page host, written in terms of the
+                    landing URL {parent}/{section}/{id}, e.g. www.cell.com ->
+                    {parent}/pdf/{id}.pdf (.../cell/fulltext/S0092-... becomes
+                    .../cell/pdf/S0092-....pdf)
+                    Only the redirect chain is followed (HEAD), the landing page
+                    itself is not downloaded.
+
+Every use is counted in memory; a template that keeps failing is forgotten.
+The templates are kept in a small JSON file so later runs start with them. It
+is rewritten when a template is learned or dropped, every ``SAVE_EVERY``
+counted uses, and on close, never on each use.
+"""
+
+import json
+import os
+import threading
+from urllib.parse import urlsplit
+
+MAX_MISSES = 3   # a template failing this often, and more often than it worked, is dropped
+SAVE_EVERY = 100  # counted uses between two saves of the hit and miss counts
+
+
+def doi_prefix(doi):
+    """Return the registrant prefix of a DOI including the slash (e.g. '10.1038/')."""
+    return doi.split('/', 1)[0] + '/'
+
+
+def _landing_parts(url):
+    """Split a landing URL (without query) into parent, section and id: {parent}/{section}/{id}."""
+    parts = urlsplit(url)
+    path = parts.path.rstrip('/')
+    head, _, last = path.rpartition('/')
+    parent_path, _, section = head.rpartition('/')
+    return f"{parts.scheme}://{parts.netloc}{parent_path}", section, last
+
+
+def _replace_ci(text, old, new):
+    """Replace the first case-insensitive occurrence of old in text, or return None."""
+    start = text.lower().find(old.lower())
+    if start < 0 or not old:
+        return None
+    return text[:start] + new + text[start + len(old):]
+
+
+class UrlTemplates:
+    """
+    DOI-prefix and host templates for PDF URLs, shared by the crawl's worker threads.
+
+    Args:
+        path: JSON file the templates are loaded from and saved to (None keeps them in memory)
+    """
+
+    def __init__(self, path=None):
+        self.templates = {'doi': {}, 'host': {}}
+        self.stats = {'direct': 0, 'landing_skipped': 0, 'learned': 0, 'dropped': 0}
+        self.lock = threading.Lock()
+        self.path = None
+        self.unsaved = 0  # uses counted since the last save
+        if path:
+            self.load(path)
+
+    def load(self, path):
+        """Read the templates saved in path (if it exists) and save there from now on."""
+        self.path = path
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            with self.lock:
+                for kind in self.templates:
+                    self.templates[kind].update(saved.get(kind, {}))
+
+    def _save(self):
+        """Write the templates atomically; the caller holds self.lock."""
+        self.unsaved = 0
+        if not self.path:
+            return
+        temp = f"{self.path}.{threading.get_ident()}.tmp"
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(self.templates, f, indent=2, sort_keys=True)
+        os.replace(temp, self.path)
+
+    def doi_url(self, doi):
+        """Return the PDF URL the DOI-prefix template gives for doi, or None."""
+        with self.lock:
+            entry = self.templates['doi'].get(doi_prefix(doi))
+        if entry is None:
+            return None
+        return entry['template'].format(doi=doi, suffix=doi.split('/', 1)[1])
+
+    def has_hosts(self):
+        """Return True if any host template is known."""
+        with self.lock:
+            return bool(self.templates['host'])
+
+    def landing_url(self, landing_url):
+        """Return the PDF URL the host template gives for a landing page URL, or None."""
+        with self.lock:
+            entry = self.templates['host'].get(urlsplit(landing_url).netloc.lower())
+        parent, section, last = _landing_parts(landing_url)
+        if entry is None or not last:
+            return None
+        return entry['template'].format(parent=parent, section=section, id=last)
+
+    def learn(self, doi, landing_url, pdf_url):
+        """Derive and store the templates that turn doi and its landing page into pdf_url."""
+        escaped = pdf_url.replace('{', '{{').replace('}', '}}')
+        suffix = doi.split('/', 1)[1]
+        doi_template = _replace_ci(escaped, doi, '{doi}')
+        if doi_template is None and len(suffix) > 4:
+            doi_template = _replace_ci(escaped, suffix, '{suffix}')
+        host_template = None
+        parent, section, last = _landing_parts(landing_url)
+        if escaped.startswith(parent + '/') and len(last) > 3:
+            rest = _replace_ci(escaped[len(parent):], last, '{id}')
+            if rest is not None:
+                if section:
+                    rest = _replace_ci(rest, f"/{section}/", '/{section}/') or rest
+                host_template = '{parent}' + rest
+
+        with self.lock:
+            changed = False
+            for kind, key, template in (('doi', doi_prefix(doi), doi_template),
+                                        ('host', urlsplit(landing_url).netloc.lower(), host_template)):
+                if template is None:
+                    continue
+                entry = self.templates[kind].get(key)
+                if entry is not None and entry['template'] == template:
+                    continue
+                self.templates[kind][key] = {'template': template, 'hits': 0, 'misses': 0}
+                self.stats['learned'] += 1
+                changed = True
+            if changed:
+                self._save()
+
+    def record(self, kind, key, worked):
+        """
+        Count one use of a template.
+
+        Args:
+            kind: 'doi' or 'host'
+            key: DOI (for 'doi') or landing page URL (for 'host')
+            worked: Whether the templated URL gave a PDF
+        """
+        key = doi_prefix(key) if kind == 'doi' else urlsplit(key).netloc.lower()
+        with self.lock:
+            entry = self.templates[kind].get(key)
+            if entry is None:
+                return
+            if worked:
+                entry['hits'] += 1
+                self.stats['direct' if kind == 'doi' else 'landing_skipped'] += 1
+            else:
+                entry['misses'] += 1
+                if entry['misses'] >= MAX_MISSES and entry['misses'] > entry['hits']:
+                    del self.templates[kind][key]
+                    self.stats['dropped'] += 1
+                    self._save()
+                    return
+            self.unsaved += 1
+            if self.unsaved >= SAVE_EVERY:
+                self._save()
+
+    def close(self):
+        """Save the hit and miss counts not written yet."""
+        with self.lock:
+            if self.unsaved:
+                self._save()
+
+    def report(self):
+        """Return a one-line summary of template use."""
+        stats = self.stats
+        return (f"URL templates: {len(self.templates['doi'])} DOI prefixes, {len(self.templates['host'])} hosts; "
+                f"{stats['direct']} PDFs fetched directly, {stats['landing_skipped']} landing pages skipped, "
+                f"{stats['learned']} learned, {stats['dropped']} dropped")